@@ -1,304 +1,369 @@
-import cv2
-import mediapipe as mp
+import argparse
+import cv2  # Needed first thing by open_camera, so deferring it would not shorten the start-up
 import numpy as np
-import math
-import pyautogui
-import tkinter as tk
+import pyautogui  # Needed at import: the actuator is built on it and load_preferences reads the screen size
+import signal
+import sys
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+from actuator import CursorActuator
+from backends import BACKEND_DEFAULTS, create_backend
+from blink import BlinkDetector
+from calibration import GESTURE_DEFAULTS
+from camera import open_camera
+from cursor_mapping import CURSOR_DEFAULTS, AbsoluteCursorMapper, CursorPosition
+from faces import PrimaryFaceSelector, face_box
+from gestures import EYE_FEATURES, FEATURES, GestureEngine, tilt_features, wink_features
+from head_pose import HeadPoseEstimator
+from idle import IdleMonitor
+from instrumentation import DISABLED, Metrics, MetricsWriter
+from landmark_trace import TraceWriter
+from landmarks import NOSE_INDEX, FaceLandmarks
+from notification import NotificationOverlay
+from pipeline import CaptureThread, InferenceThread, LatestFrameBuffer
+from preferences import load_section
+from preview import Annotation, PreviewRenderer
+from roi import FaceRegion
+from scrolling import SCROLL_DEFAULTS, NodScroller
+from smoothing import SMOOTHING_DEFAULTS, CursorDeadband, PoseSmoother
+from status import StatusPublisher
+from supervisor import STARTED, STOPPED, WorkerControl
+from tilt import TiltDetector
+from tray import TrayControl
 
 pyautogui.FAILSAFE = False
-
-# Global variables initialization
-# Track the last time the mode was toggled
-last_toggle_time = 0
-
-last_back_time = 0
-
-last_blink_time = 0
-
-left_eye_open = True
-
-right_eye_open = True
-
-blink_interval = 0
-
-left_blink_list = []
-right_blink_list = []
-blink_list = []
+pyautogui.PAUSE = 0  # The actuator paces its own events, so pyautogui must not sleep after each call
 
 # Set the scroll sensitivity
 SCROLL_SENSITIVITY = 50
 
-# Track time intervals between blinks
-left_blink_time = 0
-right_blink_time = 0
-
 # Configuration for interaction sensitivity
 SCROLL_SENSITIVITY = 50  # Defines the amount of scroll per scroll event
 MOUSE_SENSITIVITY = 2  # Defines how much the mouse moves in response to head movement
 
-# Fetch the screen dimensions to manage GUI elements appropriately
-screen_width, screen_height = pyautogui.size()
+# Defaults of the [Tracking] section of user_preferences.ini
+TRACKING_DEFAULTS = {
+    'roi_enabled': True,  # Only analyse the region around the face while one is tracked
+    'roi_size': 256,  # Side length in pixels the face region is scaled to before running the face mesh
+    'roi_padding': 0.3,  # Margin around the face, as a fraction of its size
+    'detection_size': 640,  # Longest side in pixels of a full frame searched for a face
+    'idle_timeout': 10.0,  # Seconds without a face before the tracker goes idle
+    'idle_probe_interval': 0.5,  # Seconds between frames checked for a face while idle
+    'idle_probe_size': 320,  # Longest side in pixels of the frames checked while idle
+    'idle_motion_threshold': 6.0,  # Mean change in gray levels that has an idle tracker check a frame at once
+    'headless': False,  # Run without the camera preview window, controlled from the system tray instead
+    'preview_fps': 15.0,  # Maximum frame rate of the camera preview
+    'preview_scale': 1.0,  # Size of the camera preview relative to the camera frame
+    'max_num_faces': 1,  # Faces the landmark backend looks for; read when the backend is built
+    'primary_face': 'largest',  # Face that controls the computer when several are found: "largest" or "central"
+}
+# The landmark backend is chosen by the BACKEND_DEFAULTS settings of backends.py, in the same section
 
 # A global variable to hold the current interaction mode; affects how gestures control the cursor
 current_mode = "MOUSE"  # Can be "MOUSE" or "SCROLL"
 
+# What handle_landmarks wants drawn on the current frame's preview, or None
+last_annotation = None
 
-def toggle_mode():
-    """
-    Toggles the control mode between "MOUSE" and "SCROLL".
+# Per-stage timings and counters; replaced by a Metrics object when started with --metrics
+metrics = DISABLED
 
-    This function switches the operational mode of the application between mouse control and scrolling control,
-    based on the current state. It also triggers a notification to the user about the mode change.
+# Sends live statistics to the launcher's dashboard when started with --status-port
+status = None
 
-    Effects:
-        - Updates the global `current_mode` variable to the next mode.
-        - Calls `show_notification_async` to display a mode change notification on the screen.
-    """
-    global current_mode
-    current_mode = "SCROLL" if current_mode == "MOUSE" else "MOUSE"
-    show_notification_async(f"Switched to {current_mode} mode", duration=1000)
+# The webcam, open while a session runs
+cap = None
 
+# Finds the faces in each frame; built by initialize_face_mesh
+landmark_backend = None
 
-def show_notification(message, duration=3000):
-    """
-    Displays a notification window with a specified message for a given duration.
+# Set from the tray icon, a termination signal or the launcher to end the current session
+quit_requested = threading.Event()
 
-    Args:
-    message (str): The message to display in the notification window.
-    duration (int): How long the notification should stay open, in milliseconds.
+# Set from the tray icon to switch modes; applied by the gesture stage, which owns the detectors a switch resets
+toggle_requested = threading.Event()
 
-    This function creates a simple GUI window using Tkinter to show a temporary message to the user.
-    It sets the window as a topmost window so it stays above all other windows and closes automatically
-    after the specified duration.
-    """
-    root = tk.Tk()
-    root.title("Notification")
-    label = tk.Label(root, text=message, font=('Helvetica', 10))
-    label.pack(side="top", fill="both", expand=True, padx=20, pady=20)
-    root.geometry("+{}+{}".format(100, 100))  # Positions the window at screen coordinates (100, 100)
-    root.lift()
-    root.attributes('-topmost', True)  # Keeps the window above all other windows
-    root.after(duration, root.destroy)  # Automatically closes the window after 'duration' milliseconds
-    root.mainloop()
+# Performs mouse and keyboard actions on its own thread so the tracking loop never waits on the OS input layer
+actuator = CursorActuator(pyautogui)
 
+# The current frame's landmarks as a NumPy array, shared by all gesture handlers
+face_landmarks_array = FaceLandmarks()
 
-def show_notification_async(message, duration=3000):
-    """
-    Displays a notification asynchronously.
+# Solves the head pose with cached camera intrinsics, starting from the previous frame's pose
+head_pose = HeadPoseEstimator()
+
+# One notification window for the whole session, fed through a queue
+notification_overlay = NotificationOverlay()
 
-    Args:
-    message (str): The message to be displayed in the notification.
-    duration (int): Duration in milliseconds for which the notification should be visible.
 
-    This function starts a new thread to display the notification without blocking the main program execution.
-    This is particularly useful for non-blocking UI updates in a multi-threaded application.
+def click_mouse(button):
     """
-    threading.Thread(target=show_notification, args=(message, duration)).start()
+    Clicks the given mouse button and counts the click for the dashboard.
+    """
+    actuator.click(button)
+    if status is not None:
+        status.click()
 
 
-def initialize():
+# What the gesture rules of gestures.py can trigger, by the names used in the rules
+GESTURE_ACTIONS = {
+    'toggle_mode': lambda: toggle_mode(),
+    'left_click': lambda: click_mouse('left'),
+    'right_click': lambda: click_mouse('right'),
+    'back': lambda: actuator.hotkey('alt', 'left'),
+    'forward': lambda: actuator.hotkey('alt', 'right'),
+    'scroll_up': lambda: actuator.scroll(SCROLL_SENSITIVITY),
+    'scroll_down': lambda: actuator.scroll(-SCROLL_SENSITIVITY),
+}
+
+
+def dispatch_gesture(action):
+    GESTURE_ACTIONS[action]()
+
+
+def load_preferences():
     """
-    Initializes necessary components for facial mesh processing and webcam access.
+    Reads the user preferences and builds the objects that depend on them.
 
-    This function sets up the MediaPipe face mesh solution with specified configurations for better landmark detection.
-    It also attempts to connect to a webcam by checking available camera indices. Raises an exception if no camera is found.
+    This runs when the module is imported, and again at the start of every session of a worker kept ready by
+    the launcher, so settings changed in the launcher or by calibration take effect on the next Start without
+    reloading the face mesh. The screen size is read here too, so a worker picks up a change of resolution.
 
     Global Variables:
-    face_mesh (mp.solutions.face_mesh.FaceMesh): A MediaPipe FaceMesh object configured for the application.
-    mp_drawing (mp.solutions.drawing_utils): MediaPipe drawing utilities.
-    drawing_spec (mp.solutions.drawing_utils.DrawingSpec): Drawing specifications for landmarks.
-    cap (cv2.VideoCapture): The OpenCV video capture object linked to the webcam.
+    screen_width, screen_height (int): The size of the screen in pixels, which bounds the cursor.
+    tracking_preferences, gesture_preferences, cursor_preferences (dict): The [Tracking], [Gestures] and [Cursor]
+    sections of user_preferences.ini.
+    show_preview (bool): Whether the annotated camera preview is drawn and shown; off in headless mode.
+    cursor_mapper (AbsoluteCursorMapper): Maps head angles to screen points in absolute mode; None in joystick mode.
+    cursor_position (CursorPosition): The cursor position, read from the OS only every `sync_interval` seconds.
+    face_region (FaceRegion): Picks the region of each frame that is handed to the face mesh.
+    face_selector (PrimaryFaceSelector): Picks the face that controls the computer when several are detected.
+    pose_smoother (PoseSmoother): Filters landmark jitter out of the head pose angles.
+    cursor_deadband (CursorDeadband): Holds back cursor moves shorter than `min_move` pixels.
+    nod_scroller (NodScroller): Turns nods into scroll amounts in SCROLL mode.
+    blink_detector (BlinkDetector): Detects winks for the click gestures.
+    tilt_detector (TiltDetector): Detects sideways head tilts for the back and forward gestures.
+    gesture_engine (GestureEngine): Evaluates the gesture rules of gestures.py on every frame.
+    idle_monitor (IdleMonitor): Slows inference down while nobody is in front of the camera.
     """
-    mp_face_mesh = mp.solutions.face_mesh
-    global face_mesh
-    face_mesh = mp_face_mesh.FaceMesh(refine_landmarks = True, min_detection_confidence=0.5, min_tracking_confidence=0.5)
+    global screen_width, screen_height, tracking_preferences, gesture_preferences, cursor_preferences, show_preview
+    global cursor_mapper, cursor_position, face_region, face_selector, pose_smoother, cursor_deadband, nod_scroller
+    global blink_detector, tilt_detector, gesture_engine, idle_monitor
 
-    global mp_drawing
-    mp_drawing = mp.solutions.drawing_utils
+    screen_width, screen_height = pyautogui.size()
 
-    global drawing_spec
-    drawing_spec = mp_drawing.DrawingSpec(thickness=1, circle_radius=1)
+    tracking_preferences = load_section('Tracking', TRACKING_DEFAULTS)
 
-    global cap
-    cap = None
-    # Iterate over a range of potential camera indices
-    for index in range(10):  # This range might need adjustment depending on the device
-        cap = cv2.VideoCapture(index)
-        if cap.isOpened():  # Successfully connected to a camera
-            break
-        cap.release()
-    if not cap or not cap.isOpened():  # No working camera was found
-        raise Exception("No available cameras found. Check your device connections.")
+    # The [Gestures] section, whose thresholds are written by calibration.py
+    gesture_preferences = load_section('Gestures', GESTURE_DEFAULTS)
 
+    # How head movement drives the cursor: "joystick" moves it while the head is turned, "absolute" points with it
+    cursor_preferences = load_section('Cursor', CURSOR_DEFAULTS)
 
-def process_image():
-    """
-    Captures an image from the webcam, processes it for facial landmark detection, and prepares it for further analysis.
+    show_preview = not tracking_preferences['headless']
 
-    Returns:
-    tuple: A tuple containing the processed image and the results of the facial landmark detection, or
-           None if the webcam fails to capture an image.
+    cursor_mapper = (AbsoluteCursorMapper.from_settings((screen_width, screen_height), cursor_preferences)
+                     if cursor_preferences['mapping'] == 'absolute' else None)
+    cursor_position = CursorPosition(pyautogui.position, (screen_width, screen_height),
+                                     cursor_preferences['sync_interval'])
 
-    This function reads an image from the webcam, flips it for a mirror view, converts the color from BGR to RGB,
-    processes it using MediaPipe's face mesh to detect facial landmarks, and converts it back to BGR for display.
-    The image data is temporarily made non-writable to improve performance during processing.
-    """
-    success, image = cap.read()
-    if not success:
-        return None
+    face_region = FaceRegion(tracking_preferences['roi_size'], tracking_preferences['roi_padding'],
+                             tracking_preferences['detection_size'], tracking_preferences['roi_enabled'])
 
-    image = cv2.cvtColor(cv2.flip(image, 1), cv2.COLOR_BGR2RGB)
-    image.flags.writeable = False
-    results = face_mesh.process(image)
-    image.flags.writeable = True
-    image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+    face_selector = PrimaryFaceSelector(tracking_preferences['primary_face'])
 
-    return image, results
+    smoothing_preferences = load_section('Smoothing', SMOOTHING_DEFAULTS)
+    pose_smoother = PoseSmoother.from_settings(smoothing_preferences)
+    cursor_deadband = CursorDeadband.from_settings(smoothing_preferences)
 
-def check_if_scroll(y):
-    global scroll_queue 
-    scroll_queue = [] 
+    nod_scroller = NodScroller.from_settings(load_section('Scrolling', SCROLL_DEFAULTS))
 
-    if len(scroll_queue) < 30:
-        scroll_queue.append(y)
-    else:
-        scroll_queue.pop(0)
-        scroll_queue.append(y)
+    # Tracks each eye's open / closing / closed / held state
+    blink_detector = BlinkDetector(gesture_preferences['blink_close_threshold'],
+                                   gesture_preferences['blink_open_threshold'], gesture_preferences['wink_hold_time'])
 
+    # Recognises sideways head tilts for going back and forward
+    tilt_detector = TiltDetector(gesture_preferences['tilt_angle'], gesture_preferences['tilt_release_angle'],
+                                 gesture_preferences['tilt_hold_time'], neutral=gesture_preferences['neutral_roll'])
 
-def handle_mouse(x, adjusted_mouse_dx, adjusted_mouse_dy, mode):
+    # The built-in gesture rules with any [Gesture: name] sections of the preferences file applied
+    features = dict(FEATURES, **wink_features(blink_detector), **tilt_features(tilt_detector))
+    gesture_engine = GestureEngine.from_settings(gesture_preferences, features, GESTURE_ACTIONS, dispatch_gesture)
+    if landmark_backend is not None:
+        disable_unseen_gestures()
 
+    idle_monitor = IdleMonitor(tracking_preferences['idle_timeout'], tracking_preferences['idle_probe_interval'],
+                               tracking_preferences['idle_probe_size'], tracking_preferences['idle_motion_threshold'])
+
+
+def disable_unseen_gestures():
     """
-    Specific function for either scrolling up or down or moving the mouse depending
-    on which mode the program is in.
+    Leaves out the gesture rules that read the eyes when `landmark_backend` cannot see the eyelids, so they neither
+    fire on made-up eye landmarks nor fail silently.
     """
+    if not landmark_backend.sees_eyelids:
+        gesture_engine.disable_features(EYE_FEATURES, f"the {landmark_backend.name} backend cannot see the eyelids")
 
-    # Either moves the mouse in the direction of gaze or scrolls depending on vertical gaze
-    if mode == "MOUSE":
-        pyautogui.moveRel(adjusted_mouse_dx, adjusted_mouse_dy, duration=0.1)
-    elif mode == "SCROLL":
-        if(x > 0):
-            pyautogui.scroll(SCROLL_SENSITIVITY)
-        elif(x < 0):
-            pyautogui.scroll(-SCROLL_SENSITIVITY)
 
+load_preferences()
 
 
+def toggle_mode():
+    """
+    Toggles the control mode between "MOUSE" and "SCROLL".
 
+    This function switches the operational mode of the application between mouse control and scrolling control,
+    based on the current state. It also triggers a notification to the user about the mode change. It resets
+    detectors the gesture stage is updating, so it must run on that stage's thread; other threads, like the tray
+    icon's, set `toggle_requested` instead.
 
-def handle_back_forth(image, landmarks):
-        
-    """
-    Calculates the angle of the top and bottom coordinates of the user's head
-    and utilizes a threshold method for determining whether the user tilted their
-    head or not to move back a page and forward a page on a browser.
+    Effects:
+        - Updates the global `current_mode` variable to the next mode.
+        - Calls `show_notification_async` to display a mode change notification on the screen.
     """
+    global current_mode
+    current_mode = "SCROLL" if current_mode == "MOUSE" else "MOUSE"
+    nod_scroller.reset()  # Pitch history from the other mode says nothing about nods
+    # The wink and tilt features are only updated while a rule of the current mode reads them, so their state may
+    # be left over from before the previous mode change
+    blink_detector.reset()
+    tilt_detector.reset()
+    if status is not None:
+        status.toggle(current_mode)
+    show_notification_async(f"Switched to {current_mode} mode", duration=1000)
 
-    global last_back_time
-    
-    interval = 1.5
 
-    top = landmarks[10]
-    bottom = landmarks[152]
+def show_notification_async(message, duration=3000):
+    """
+    Displays a notification asynchronously.
 
-    direction = ''
+    Args:
+    message (str): The message to be displayed in the notification.
+    duration (int): Duration in milliseconds for which the notification should be visible.
 
-    current_time = time.time()
+    The message is handed to the notification overlay, which runs its own event loop on a separate thread, so
+    the tracking loop only pays for a queue put and never creates a window itself.
+    """
+    notification_overlay.show(message, duration)
 
-    t = (top.x * math.ceil(image.shape[1]), top.y * math.ceil(image.shape[0]))
-    b = (bottom.x * math.ceil(image.shape[1]), bottom.y * math.ceil(image.shape[0]))
 
-    angle = np.arctan2(t, b)
+def initialize_face_mesh():
+    """
+    Builds the landmark backend chosen in the [Tracking] preferences without touching the webcam.
 
-    if(angle[0] < 0.7 and (current_time - last_back_time) > interval):
-        direction = 'left'
+    This is the part of `initialize` needed to process frames that come from somewhere other than the webcam,
+    such as a recorded video being replayed. MediaPipe is only imported by the backends that use it: the import
+    alone takes most of a second, which tools that load this module without running the face mesh, like
+    replay.py, then never pay.
 
-    if(angle[0] > 0.86 and (current_time - last_back_time) > interval):
-        direction = 'right'
-    
-    if(direction):
-        pyautogui.keyDown('alt')
-        pyautogui.press(direction)
-        pyautogui.keyUp('alt')
-        last_back_time = current_time
+    Global Variables:
+    landmark_backend (LandmarkBackend): Finds the faces in each frame, see backends.py.
+    """
+    global landmark_backend
+    landmark_backend = create_backend(load_section('Tracking', BACKEND_DEFAULTS), tracking_preferences['max_num_faces'])
+    disable_unseen_gestures()
 
 
+def initialize():
+    """
+    Initializes necessary components for facial mesh processing and webcam access.
 
-# Function for handling left and right eye blinks to clicks
-def handle_click(landmarks):
+    This function sets up the MediaPipe face mesh solution with specified configurations for better landmark detection.
+    It opens the webcam at the same time with `open_camera`, which goes straight to the camera remembered from the
+    previous run, probes the available camera indices in parallel if there is none, and applies the capture
+    resolution, frame rate, pixel format and buffer size from the preferences file. Importing MediaPipe and building
+    the face mesh graph run on a background thread while the camera opens, since both mostly wait, so start-up takes
+    as long as the slower of the two rather than their sum. Raises an exception if no camera is found or the face
+    mesh cannot be built.
 
+    Global Variables:
+    landmark_backend (LandmarkBackend): Finds the faces in each frame, see backends.py.
+    cap (cv2.VideoCapture): The OpenCV video capture object linked to the webcam.
     """
-    Function that uses separate arrays for determining whether the user 
-    deliberatly blinks to use the click function vs when they blink normally.
+    global cap
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="face-mesh") as executor:
+        face_mesh_ready = executor.submit(initialize_face_mesh)
+        cap = open_camera()
+        face_mesh_ready.result()  # Re-raises any error from building the face mesh
 
-    If the program detects the user is blinking for a given frame, data
-    is appended to either the left or right blink array for the left and right 
-    eyes blinking respectively. Once the user has both eyes open after a blink,
-    the function will click the user's left or right mouse button if the left or 
-    right blink array has more than 3 elements filled with data in them.
+
+def process_image(image):
     """
+    Processes a captured webcam frame for facial landmark detection and prepares it for further analysis.
 
-    # Declaring globals
-    global left_eye_open
-    global right_eye_open
+    Args:
+    image (np.array): The raw BGR frame as delivered by the webcam.
 
-    global left_blink_time
-    global right_blink_time
+    Returns:
+    tuple: A tuple containing the mirrored BGR image, the faces found by the landmark backend, and the crop of
+           the image the faces were found in (None for the whole image), or None if the frame is skipped
+           because the tracker is idle.
+
+    This function flips the frame for a mirror view and lets `face_region` pick the part of it to analyse: a
+    small region around the face while one is being tracked, or the whole (downscaled) frame otherwise. Only
+    that region is converted from BGR to RGB and processed by `landmark_backend`, so the full-resolution
+    frame is never converted. The image data is made non-writable to improve performance during processing.
+
+    While nobody has been in front of the camera for a while, `idle_monitor` skips most frames and the ones that
+    are processed are searched at a lower resolution, until a face shows up again. A frame in which the picture
+    has changed is processed straight away.
+    """
+    now = time.monotonic()
+    if not idle_monitor.should_process(now, image):
+        return None
 
-    global left_blink_list
-    global right_blink_list
+    started = metrics.start()
+    image = cv2.flip(image, 1)
+    probe_size = idle_monitor.probe_size if idle_monitor.idle else None
+    mesh_input, crop = face_region.prepare(image, probe_size)
+    if face_region.switched:
+        landmark_backend.reset()  # The face the model tracked was found in the other kind of input
+    mesh_input = cv2.cvtColor(mesh_input, cv2.COLOR_BGR2RGB)
+    mesh_input.flags.writeable = False
+    metrics.stop("preprocess", started)
 
-    
-    left_eye = [landmarks[159], landmarks[145]]
-    right_eye = [landmarks[386], landmarks[374]]
+    started = metrics.start()
+    faces = landmark_backend.process(mesh_input, now)
+    metrics.stop("face_mesh", started)
+    idle_monitor.update(bool(faces), now)
 
-    # Assigning left and right eye landmark current values
-    top_lex, top_ley = (1000 * left_eye[0].x), (1000 * left_eye[0].y)
-    bottom_lex, bottom_ley = (1000 * left_eye[1].x) , (1000 * left_eye[1].y)
+    return image, faces, crop
 
-    top_rex, top_rey = (1000 * right_eye[0].x), (1000 * right_eye[0].y)
-    bottom_rex, bottom_rey = (1000 * right_eye[1].x), (1000 * right_eye[1].y)
+def handle_scroll(x, now):
+    """
+    Scrolls in SCROLL mode by nodding.
 
-    # If statements that append data to an array for every either eye is closed
-    if(abs(top_ley - bottom_ley) < 6 and abs(top_lex - bottom_lex) < 6):
+    Args:
+    x (float): The smoothed head pitch in degrees, positive when looking up.
+    now (float): Timestamp of the frame in seconds.
 
-        left_blink_list.append("left")
-        if(left_eye_open):
-            left_blink_time = time.time()
-            left_eye_open = False
-    else:
-        left_eye_open = True
+    Every frame's pitch goes into the ring buffer of `nod_scroller`, which detects nods from the pitch velocity,
+    range and direction changes over its window and returns an amount proportional to the nod, accumulated
+    until whole units can be sent and rate limited. Nodding up scrolls up and nodding down scrolls down.
+    """
+    amount = nod_scroller.update(x, now)
+    if amount:
+        actuator.scroll(amount)
 
-    if(abs(top_rey - bottom_rey) < 6 and abs(top_rex - bottom_rex) < 6):
 
-        right_blink_list.append("right")
-        if(right_eye_open):
-            right_blink_time = time.time()
-            right_eye_open = False
-    else:
-        right_eye_open = True
+def handle_mouse(x, adjusted_mouse_dx, adjusted_mouse_dy, mode):
 
-    
-    # Statements that empty array and perform click if 
-    # Either list has more than 3 items in them
-    if(left_blink_list.count('left') > 3):
-        pyautogui.click(button = 'left')
-        left_blink_time = time.time()
-        left_blink_list.clear()
-    elif(left_eye_open == True):
-        left_blink_time = time.time()
-        left_blink_list.clear()
-
-    if(right_blink_list.count('right') > 3):
-        pyautogui.click(button = 'right')
-        right_blink_time = time.time()
-        right_blink_list.clear()
-    elif(right_eye_open == True):
-        right_blink_time = time.time()
-        right_blink_list.clear()
+    """
+    Specific function for moving the mouse in the direction the user is looking while in MOUSE mode.
+    Scrolling in SCROLL mode is done by nodding instead, see `handle_scroll`.
+    """
 
+    # Moves the mouse in the direction of gaze
+    if mode == "MOUSE":
+        # In absolute mode the cursor is placed by handle_landmarks instead
+        if cursor_mapper is None:
+            # Moves shorter than `min_move` are held back and added to the next ones
+            move = cursor_deadband.relative(adjusted_mouse_dx, adjusted_mouse_dy)
+            if move is not None:
+                actuator.move(*move)
+                cursor_position.moved(*move)
 
 
 def handle_face_direction(x, y, adjusted_mouse_dx, adjusted_mouse_dy):
@@ -311,7 +376,7 @@ def handle_face_direction(x, y, adjusted_mouse_dx, adjusted_mouse_dy):
     they are looking depending on how much in a given direction they are looking.
     """
 
-    threshold = 7
+    threshold = gesture_preferences['face_direction_threshold']
     
     look_text = "Looking"
 
@@ -339,191 +404,404 @@ def handle_face_direction(x, y, adjusted_mouse_dx, adjusted_mouse_dy):
     return default_text
 
 
-def check_mouth_open(landmarks, threshold=0.01):
+def draw_landmarks(image, faces, crop=None):
     """
-    Checks if the mouth is open beyond a specified threshold and toggles the mode if conditions are met.
+    Runs the gesture logic on the detection results of one frame and prepares its preview annotation.
 
     Args:
-    landmarks (list): A list of facial landmarks detected.
-    threshold (float): The distance threshold at which the mouth is considered open.
+    image (np.array): The frame the landmarks were detected in.
+    faces (list): The faces found by `landmark_backend` in this frame.
+    crop (tuple, optional): The crop returned by `process_image`, used to map the landmarks back to the image.
 
     Returns:
-    bool: True if the mouth is open beyond the threshold and a mode toggle occurs, False otherwise.
-
-    This function checks the vertical distance between the upper and lower lip landmarks to determine
-    if the mouth is open wide enough. If the mouth has been open beyond the threshold for a longer period
-    than the cooldown, the function toggles the current mode and updates the last toggle time.
+    tuple: The head pose angles (x, y, z) of the primary face, or None if no face is tracked in this frame.
+
+    When several faces are detected, `face_selector` picks the primary face from their bounding boxes and the
+    others are ignored. Only the primary face is converted into the shared landmark array by the backend, in
+    full-image coordinates, and handed to `handle_landmarks`, which estimates the head pose, triggers the gesture
+    actions and sets `last_annotation` for the preview. The face's position also decides which region of the next
+    frame is analysed. While the primary face is missing for less than the selector's grace time, its per-face
+    state is kept for its return even if other faces are found; otherwise it is reset by `forget_face`.
     """
-    global last_toggle_time  # Use the global variable to track the last toggle time
-    cooldown_period = 1  # Cooldown period in seconds to prevent rapid toggling
-
-    # Extract the upper and lower lip positions
-    upper_lip = landmarks[13]  # Adjust index as necessary
-    lower_lip = landmarks[14]  # Adjust index as necessary
-
-    # Calculate the vertical distance between the upper and lower lip
-    mouth_open_distance = abs(upper_lip.y - lower_lip.y)
-
-    current_time = time.time()
-    if mouth_open_distance > threshold and (current_time - last_toggle_time) > cooldown_period:
-        # print("Mouth Open")
-        toggle_mode()
-        
-        last_toggle_time = current_time  # Update the last toggle time
-        return True
-
-    # print("Mouth Closed")
-    return False
+    global last_annotation
+    img_h, img_w = image.shape[:2]
+    angles = None
+    last_annotation = None
+    index = None
+    if faces:
+        boxes = [face_box(landmark_backend.box(face), crop, img_w, img_h) for face in faces]
+        index = face_selector.select(boxes, img_w, img_h, time.monotonic())
+        if len(faces) > 1:
+            metrics.count("faces.ignored", len(faces) - 1)
+    if index is not None:
+        if face_selector.new_face:
+            forget_face()  # The state of a previous primary face must not carry over to this one
+        # Convert the landmarks once; every handler reads from this array
+        landmarks, _ = landmark_backend.landmarks(faces[index], face_landmarks_array)
+        face_region.to_frame(landmarks, crop, img_w, img_h)
+        angles = handle_landmarks(image, landmarks)
+        face_region.track(landmarks, img_w, img_h)
+    elif not (faces and face_selector.waiting):
+        forget_face()
+    # Otherwise only other faces were found while the primary face may still come back, so its state is kept
+    return angles
+
+
+def forget_face():
+    """
+    Resets everything that follows the primary face from frame to frame, once it is lost or replaced.
+    """
+    head_pose.reset()  # The previous pose is no longer a useful starting point
+    blink_detector.reset()
+    tilt_detector.reset()
+    gesture_engine.reset()
+    pose_smoother.reset()
+    cursor_deadband.reset()
+    nod_scroller.reset()
+    face_region.lose()  # Search the whole of the next frame
 
 
-def draw_landmarks(image, results):
+def handle_landmarks(image, landmarks):
     """
-    Draws facial landmarks and head pose vectors on the image based on detection results.
+    Estimates the head pose of one face, triggers the matching actions and annotates the head pose vectors.
 
     Args:
-    image (np.array): The image on which landmarks and vectors will be drawn.
-    results (object): The results object containing multi-face landmarks detected by MediaPipe.
+    image (np.array): The frame the landmarks were found in.
+    landmarks (np.array): The face's landmarks as a (478, 3) array of normalized coordinates.
 
-    Processes detected facial landmarks to calculate and display the 2D and 3D positions of significant points
-    like the nose. It also calculates head pose angles and projects these onto the image to visualize the direction
-    the user's head is facing. This function modifies the input image by drawing lines and text indicating head
-    direction and landmark positions.
+    Returns:
+    tuple: The head pose angles (x, y, z) in degrees, or None if the pose could not be solved.
+
+    Processes the facial landmarks to calculate the 2D and 3D positions of significant points like the nose. It
+    also calculates head pose angles and describes the direction the user's head is facing. Nothing is drawn
+    here: the nose line, direction text and angles are stored in `last_annotation`, which the preview renderer
+    draws later on the main thread.
 
     The function integrates several steps:
     - Extracting 2D and 3D coordinates of specific landmarks.
-    - Calculating the head pose using solvePnP.
-    - Projecting head direction as a line on the image.
-    - Displaying text annotations for head pose angles and other diagnostics.
+    - Calculating the head pose using the warm-started solvePnP of `head_pose`, smoothed by `pose_smoother`.
+    - Projecting head direction as a line for the preview.
+    - Collecting text annotations for head pose angles and other diagnostics.
 
-    It adjusts the mouse control based on the head pose and triggers actions based on facial gestures like mouth opening.
+    It adjusts the mouse control based on the head pose and hands the frame's features to `gesture_engine`, whose
+    rules trigger actions based on facial gestures like mouth opening.
     """
     img_h, img_w, _ = image.shape
-    face_3d = []
-    face_2d = []
-
-    if results.multi_face_landmarks:
-        for face_landmarks in results.multi_face_landmarks:
-            for idx, lm in enumerate(face_landmarks.landmark):
-                if idx == 33 or idx == 263 or idx == 1 or idx == 61 or idx == 291 or idx == 199:
-                    if idx == 1:
-                        nose_2d = (lm.x * img_w, lm.y * img_h)
-                        nose_3d = (lm.x * img_w, lm.y * img_h, lm.z * 3000)
-
-                    x, y = int(lm.x * img_w), int(lm.y * img_h)
-
-                    # Get the 2D Coordinates
-                    face_2d.append([x, y])
-
-                    # Get the 3D Coordinates
-                    face_3d.append([x, y, lm.z])
-
-            face_2d = np.array(face_2d, dtype=np.float64)
-            face_3d = np.array(face_3d, dtype=np.float64)
-
-            # The camera matrix
-            focal_length = 1 * img_w
-            cam_matrix = np.array([[focal_length, 0, img_h / 2],
-                                   [0, focal_length, img_w / 2],
-                                   [0, 0, 1]])
-
-            # The distortion parameters
-            dist_matrix = np.zeros((4, 1), dtype=np.float64)
 
-            # Solve PnP
-            success, rot_vec, trans_vec = cv2.solvePnP(face_3d, face_2d, cam_matrix, dist_matrix)
+    nose = landmarks[NOSE_INDEX]
+    nose_2d = (nose[0] * img_w, nose[1] * img_h)
 
-            # Get rotational matrix
-            rmat, jac = cv2.Rodrigues(rot_vec)
-
-            # Get angles
-            angles, mtxR, mtxQ, Qx, Qy, Qz = cv2.RQDecomp3x3(rmat)
-
-            # Get the y rotation degree
-            x = angles[0] * 360
-            y = angles[1] * 360
-            z = angles[2] * 360
+    # Solve the head pose, warm-started from the previous frame
+    started = metrics.start()
+    angles = head_pose.estimate_landmarks(landmarks, img_w, img_h)
+    metrics.stop("solve_pnp", started)
+    if angles is None:
+        return None
 
-            mouse_dx = y * MOUSE_SENSITIVITY
-            mouse_dy = -x * MOUSE_SENSITIVITY  # Inverting x because screen coordinates go from top to bottom
+    # Get the rotation degrees, smoothed to remove frame-to-frame landmark jitter
+    now = time.monotonic()
+    x, y, z = pose_smoother((angles[0] * 360, angles[1] * 360, angles[2] * 360), now)
 
-            # Get current mouse position
-            current_mouse_x, current_mouse_y = pyautogui.position()
+    if current_mode == "SCROLL":
+        handle_scroll(x, now)
 
-            # Calculate new position and adjust if it goes out of bounds
-            new_mouse_x = current_mouse_x + mouse_dx
-            new_mouse_y = current_mouse_y + mouse_dy
+    if cursor_mapper is not None:
+        # Absolute mode: the head angles select the point on the screen directly
+        if current_mode == "MOUSE":
+            target = cursor_deadband.absolute(*cursor_mapper.map(x, y))
+            if target is not None:
+                actuator.move_to(*target)
+        adjusted_mouse_dx = adjusted_mouse_dy = 0
+    else:
+        mouse_dx = y * MOUSE_SENSITIVITY
+        mouse_dy = -x * MOUSE_SENSITIVITY  # Inverting x because screen coordinates go from top to bottom
 
-            # Ensure new mouse position is within screen bounds
-            new_mouse_x = min(max(new_mouse_x, 0), screen_width)
-            new_mouse_y = min(max(new_mouse_y, 0), screen_height)
+        # Get the cursor position as tracked since the last sync with the OS
+        current_mouse_x, current_mouse_y = cursor_position.get(now)
 
-            # Calculate adjusted mouse movement
-            adjusted_mouse_dx = new_mouse_x - current_mouse_x
-            adjusted_mouse_dy = new_mouse_y - current_mouse_y
+        # Calculate new position and adjust if it goes out of bounds
+        new_mouse_x = current_mouse_x + mouse_dx
+        new_mouse_y = current_mouse_y + mouse_dy
 
-            text = handle_face_direction(x, y, adjusted_mouse_dx, adjusted_mouse_dy)
+        # Ensure new mouse position is within screen bounds
+        new_mouse_x = min(max(new_mouse_x, 0), screen_width)
+        new_mouse_y = min(max(new_mouse_y, 0), screen_height)
 
-            if current_mode == "MOUSE":
-                handle_click(face_landmarks.landmark)
+        # Calculate adjusted mouse movement
+        adjusted_mouse_dx = new_mouse_x - current_mouse_x
+        adjusted_mouse_dy = new_mouse_y - current_mouse_y
 
-            check_mouth_open(face_landmarks.landmark)
+    started = metrics.start()
+    text = handle_face_direction(x, y, adjusted_mouse_dx, adjusted_mouse_dy)
 
-            handle_back_forth(image, face_landmarks.landmark)
+    # Clicks, mode toggles and page navigation; only the features read by the rules of this mode are computed
+    features = gesture_engine.features(landmarks, img_w, img_h, (x, y, z), now)
+    gesture_engine.update(features, current_mode)
+    metrics.stop("gesture_handlers", started)
 
-            # Display the nose direction
-            cv2.projectPoints(nose_3d, rot_vec, trans_vec, cam_matrix, dist_matrix)
+    if show_preview:
+        # The nose direction line and the text shown on the preview
+        global last_annotation
+        p1 = (int(nose_2d[0]), int(nose_2d[1]))
+        p2 = (int(nose_2d[0] + y * 10), int(nose_2d[1] - x * 10))
+        last_annotation = Annotation((p1, p2), text, (x, y, z))
 
-            p1 = (int(nose_2d[0]), int(nose_2d[1]))
-            p2 = (int(nose_2d[0] + y * 10), int(nose_2d[1] - x * 10))
+    return x, y, z
 
-            cv2.line(image, p1, p2, (255, 255, 0), 3)
 
-            # for land in face_landmarks.landmark:
-            #     x1 = int(land.x * image.shape[1])
-            #     y1 = int(land.y * image.shape[0])
-            #     cv2.circle(image, (x1, y1), 3, (0, 255, 255))
+def profile_frames(frame_count):
+    """
+    Runs the per-frame path for `frame_count` frames under cProfile and prints the most expensive functions.
 
-        
+    The normal pipeline spreads the work over several threads, which cProfile cannot follow, so here every
+    stage runs in turn on the calling thread: reading the camera, `process_image`, `draw_landmarks` and one
+    actuator tick.
+    """
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    frames = 0
+    profiler.enable()
+    while frames < frame_count:
+        success, frame = cap.read()
+        if not success:
+            break
+        processed = process_image(frame)
+        if processed is not None:
+            draw_landmarks(*processed)
+        actuator.step()
+        frames += 1
+    profiler.disable()
 
-            # Add the text on the image
-            cv2.putText(image, text, (20, 50), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 255, 0), 2)
-            cv2.putText(image, "x: " + str(np.round(x, 2)), (500, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-            cv2.putText(image, "y: " + str(np.round(y, 2)), (500, 100), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-            cv2.putText(image, "z: " + str(np.round(z, 2)), (500, 150), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+    print(f"Profiled {frames} frames")
+    pstats.Stats(profiler).sort_stats("cumulative").print_stats(30)
 
 
-def main():
+def main(argv=None):
     """
     Main function to initialize and run the facial tracking application.
 
     This function encapsulates the primary application loop and is responsible for:
     - Initializing the system resources and camera.
-    - Capturing images from the camera and processing them to detect and visualize facial landmarks.
+    - Running the staged capture / inference / action pipeline.
     - Displaying the processed images with annotations.
     - Handling user input to gracefully exit the application.
 
-    The function tries to initialize the application and handles any exceptions that occur during initialization.
-    If the camera is successfully opened, it enters a loop where it continuously processes the images captured
-    from the camera. It displays these images and checks for a quit command. If an exit is requested or if no more
-    images are received (camera closed), it cleans up by releasing camera resources and closing any GUI windows.
+    The work is split into stages so a slow stage never stalls the others: a capture thread keeps reading the
+    camera at its native rate, an inference thread runs the face mesh on the newest captured frame, a gesture
+    thread applies the gesture logic to the newest results, and an actuator thread merges the requested mouse
+    and keyboard actions into at most one OS event per tick. Frames that arrive while a stage is busy are
+    dropped rather than queued. The main thread only renders the preview, at `preview_fps` at most, and checks
+    for a quit command, so a slow display never delays a gesture. If an exit is requested or the camera stops
+    delivering frames, it stops the stages, releases the camera and closes any GUI windows.
+
+    With `--headless`, or `headless = True` in the [Tracking] preferences, nothing is drawn and no window is
+    shown. ESC is then not available, so the tracker is stopped from its system tray icon, with Ctrl+C or with
+    a termination signal.
+
+    With `--record PATH`, every processed frame is also appended to a landmark trace file together with its head
+    pose angles and the actions it triggered, so gesture tuning can later be replayed without the webcam.
+
+    With `--metrics PATH`, the time spent in each stage, the frames dropped between stages and the actions
+    requested are collected and written to PATH (CSV or JSON) on exit, and every `--metrics-interval` seconds if
+    given. `--profile N` instead runs N frames on a single thread under cProfile and prints the profile. The time
+    from the start until the first frame with a face, when the cursor can first move, is printed as well.
+
+    `--status-port PORT` is set by the launcher: the frame rate, latency, face detection ratio, clicks and mode
+    toggles are then sent to that local UDP port for its dashboard.
     """
+    global metrics, status
+
+    started = time.monotonic()
+    parser = argparse.ArgumentParser(description="Hands-free mouse control with head and face gestures.")
+    parser.add_argument("--record", metavar="PATH", help="Append every processed frame to a landmark trace file")
+    parser.add_argument("--headless", action=argparse.BooleanOptionalAction,
+                        help="Run without the camera preview window (default: the headless preference)")
+    parser.add_argument("--metrics", metavar="PATH", help="Write per-stage timings and counters to a CSV or JSON file")
+    parser.add_argument("--metrics-interval", type=float, metavar="SECONDS",
+                        help="Also write the metrics every SECONDS while running")
+    parser.add_argument("--profile", type=int, metavar="FRAMES", help="Profile FRAMES frames with cProfile and exit")
+    parser.add_argument("--status-port", type=int, metavar="PORT", help="Send live statistics to this local UDP port")
+    parser.add_argument("--paused", action="store_true",
+                        help="Load the model, then wait for start / stop / quit commands on standard input")
+    args = parser.parse_args(argv)
+
+    if args.profile:
+        try:
+            initialize()  # Initialize the camera and face mesh processing
+        except Exception as e:
+            print(e)  # Print any errors that occur during initialization and exit
+            return
+        profile_frames(args.profile)
+        cap.release()
+        return
+
     try:
-        initialize()  # Initialize the camera and face mesh processing
+        if args.paused:
+            initialize_face_mesh()  # The camera is only opened on start
+        else:
+            initialize()  # Initialize the camera and face mesh processing
     except Exception as e:
-        print(e)  # Print any errors that occur during initialization and exit
+        # Print any errors that occur during initialization and exit; a paused worker exits cleanly, so the
+        # launcher does not restart it into the same error
+        print(e)
         return
 
-    while cap.isOpened():  # Continue as long as the camera is open
-        processed_image = process_image()  # Process each image to detect facial features
-        if processed_image is None:  # If no image is returned, exit the loop
-            break
-        image, results = processed_image
-        draw_landmarks(image, results)  # Draw landmarks and other visual elements on the image
-        cv2.imshow('Head Pose Estimation', image)  # Display the annotated image
-        if cv2.waitKey(5) & 0xFF == 27:  # Exit if the ESC key is pressed
-            break
+    metrics_writer = None
+    if args.metrics:
+        metrics = Metrics()
+        actuator.metrics = metrics
+        metrics_writer = MetricsWriter(metrics, args.metrics, args.metrics_interval)
+        metrics_writer.start()
+    if args.status_port:
+        status = StatusPublisher(args.status_port)
+
+    notification_overlay.start()
+    actuator.start()
+
+    if args.paused:
+        # Run one inference now so the model is fully loaded before the first Start
+        landmark_backend.process(np.zeros((256, 256, 3), dtype=np.uint8), time.monotonic())
+        control = WorkerControl(sys.stdin, quit_requested, sys.stdout)
+        control.start()
+        stop_worker = control.quit
+    else:
+        stop_worker = quit_requested.set
+
+    # Ctrl+C and termination signals end the worker cleanly instead of killing it mid-action
+    signal.signal(signal.SIGINT, lambda *_: stop_worker())
+    signal.signal(signal.SIGTERM, lambda *_: stop_worker())
+
+    if args.paused:
+        while True:
+            quit_requested.clear()  # A stop that arrives before the session has started still ends it
+            if not control.wait_for_start():
+                break
+            started = time.monotonic()
+            load_preferences()  # Pick up settings changed while paused
+            control.report(STARTED)
+            run_session(args, started, stop_worker)
+            control.report(STOPPED)  # Also after ESC or a missing camera, so the launcher's Start works again
+    else:
+        run_session(args, started, stop_worker)
+
+    actuator.stop()
+    notification_overlay.stop()
+    if metrics_writer is not None:
+        metrics_writer.stop()
+    if status is not None:
+        status.close()
+
+
+def run_session(args, started, on_quit):
+    """
+    Tracks from opening the camera until the session is stopped, then releases the camera.
 
+    Args:
+    args (argparse.Namespace): The parsed command line of `main`.
+    started (float): The `time.monotonic()` at which the start was requested, for the start-up time.
+    on_quit (callable): Called when "Quit" is chosen from the tray icon; a paused worker exits, not just the
+    session.
+
+    The session ends when ESC is pressed in the preview, `quit_requested` is set (from the tray icon, a signal or
+    the launcher) or the camera stops delivering frames. The face mesh, actuator and notification overlay are
+    set up by `main` and outlive the session, so a paused worker can run many sessions.
+    """
+    global cap, show_preview
+
+    if args.headless is not None:
+        show_preview = not args.headless
+    if cap is None:  # Not yet opened by `initialize`
+        try:
+            cap = open_camera()
+        except Exception as e:
+            print(e)  # No camera; a paused worker waits for the next start
+            return
+
+    head_pose.reset()  # The previous session's pose is no starting point for this one
+
+    recorder = None
+    if args.record:
+        frame_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        recorder = TraceWriter(args.record, frame_size)
+        actuator.observer = recorder.note_action
+
+    face_seen = False
+
+    def track_frame(processed, capture_time):
+        # Gesture stage: act on one frame's landmarks and hand the frame to the preview
+        nonlocal face_seen
+        if toggle_requested.is_set():
+            toggle_requested.clear()
+            toggle_mode()
+        image, faces, crop = processed
+        angles = draw_landmarks(image, faces, crop)
+        if angles is not None and not face_seen:
+            face_seen = True
+            startup = time.monotonic() - started
+            metrics.record("startup", startup)
+            print(f"Tracking a face {startup:.2f} s after the start")
+        if recorder is not None:
+            landmarks = face_landmarks_array.points if angles is not None else None
+            recorder.write(time.time(), landmarks, angles, current_mode)
+        if status is not None:
+            now = time.monotonic()
+            status.frame(angles is not None, now - capture_time, now)
+        return (image, last_annotation) if show_preview else None
+
+    preview = PreviewRenderer(tracking_preferences['preview_fps'], tracking_preferences['preview_scale'],
+                              metrics=metrics)
+    frame_buffer = LatestFrameBuffer()  # Newest raw camera frame
+    result_buffer = LatestFrameBuffer()  # Newest processed frame and its landmark results
+    capture_thread = CaptureThread(cap, frame_buffer, metrics)
+    inference_thread = InferenceThread(frame_buffer, result_buffer, process_image, metrics=metrics)
+    gesture_thread = InferenceThread(result_buffer, preview.frames, track_frame, name="gestures", metrics=metrics,
+                                     pass_time=True)
+
+    # Frames overwritten before the next stage picked them up, and the OS events actually emitted
+    metrics.gauge("dropped.before_inference", lambda: frame_buffer.dropped)
+    metrics.gauge("dropped.before_gestures", lambda: result_buffer.dropped)
+    metrics.gauge("dropped.before_preview", lambda: preview.frames.dropped)
+    metrics.gauge("os_events", lambda: actuator.events)
+
+    tray = None
+    if not show_preview:
+        tray = TrayControl(on_quit, toggle_requested.set)
+        if not tray.start():
+            print("pystray is not installed; stop the headless tracker with Ctrl+C")
+
+    capture_thread.start()
+    inference_thread.start()
+    gesture_thread.start()
+
+    # The gesture stage closes the preview buffer once the camera stops delivering frames
+    while not quit_requested.is_set() and not preview.frames.closed:
+        if show_preview:
+            if not preview.render():  # Exit if the ESC key is pressed
+                break
+        else:
+            # Without a window there are no GUI events to pump, so the main thread only waits for a quit
+            quit_requested.wait(0.1)
+
+    capture_thread.stop()
+    inference_thread.stop()
+    gesture_thread.stop()
+    capture_thread.join()
+    inference_thread.join()
+    gesture_thread.join()
+    if tray is not None:
+        tray.stop()
+    if recorder is not None:
+        actuator.observer = None
+        recorder.close()
+
+    idle_report = idle_monitor.report(time.monotonic())
+    if idle_report["idle_seconds"]:
+        print(f"Idle for {idle_report['idle_seconds']:.0f} s, "
+              f"saving about {idle_report['saved_cpu_seconds']:.1f} s of CPU time")
     cap.release()  # Release the camera
+    cap = None
     cv2.destroyAllWindows()  # Close all OpenCV windows
 
 
@@ -0,0 +1,212 @@
+import math
+import queue
+import threading
+import time
+
+from instrumentation import DISABLED
+
+
+class CursorActuator(threading.Thread):
+    """
+    Performs mouse and keyboard actions on its own thread, merging pending commands into one OS event per tick.
+
+    The tracking loop only puts commands on a queue, so it never waits on the OS input layer. Once per tick the
+    actuator drains the queue, adds every pending relative move and scroll amount together and emits at most one
+    move and one scroll event. Moves are smoothed by releasing a fraction of the outstanding distance on each
+    tick, which replaces the blocking `duration` tween pyautogui would otherwise perform. Clicks and hotkeys are
+    performed in the order they were requested, after the coalesced movement of their tick.
+
+    Absolute moves (`move_to`) are coalesced too: only the newest target of a tick counts, and the cursor is
+    eased towards it the same way, with one `moveTo` event per tick. When both kinds are requested, a target
+    replaces the relative distance still outstanding, and relative moves requested after it shift the target, so
+    a tick never emits both a `moveRel` and a `moveTo`.
+
+    Args:
+    backend (module): Object providing `moveRel`, `moveTo`, `scroll`, `click` and `hotkey`, normally the
+    pyautogui module.
+    rate (float): Maximum number of ticks (and therefore move events) per second.
+    smoothing (float): Time constant in seconds of the move easing; 0 emits every move in full on the next tick.
+    """
+
+    _STOP = ("stop",)
+
+    def __init__(self, backend, rate=60, smoothing=0.03):
+        super().__init__(name="actuator", daemon=True)
+        self.backend = backend
+        self.tick = 1.0 / rate
+        self.smoothing = smoothing
+        self._queue = queue.Queue()
+        self._pending_dx = 0.0  # Distance requested but not moved yet
+        self._pending_dy = 0.0
+        self._pending_scroll = 0.0
+        self._target = None  # Absolute position requested but not reached yet
+        self._position = None  # Last absolute position moved to, if the cursor has not been moved relatively since
+        self.events = 0  # Number of OS events emitted so far
+        self.observer = None  # Optional callable that is shown every command as it is requested
+        self.metrics = DISABLED  # Receives the "actuate" timing of each tick and a count per requested command
+
+    # ~~~~~~~~~~~~~~~~~~~ Commands ~~~~~~~~~~~~~~~~~~~ #
+    def _put(self, command):
+        if self.observer is not None:
+            self.observer(command)
+        self.metrics.count(f"actions.{command[0]}")
+        self._queue.put(command)
+
+    def move(self, dx, dy):
+        """
+        Requests a relative cursor move. Moves requested within the same tick are merged.
+        """
+        self._put(("move", dx, dy))
+
+    def move_to(self, x, y):
+        """
+        Requests an absolute cursor move. Only the newest target requested within a tick is used.
+        """
+        self._put(("move_to", int(round(x)), int(round(y))))
+
+    def scroll(self, amount):
+        """
+        Requests a scroll by `amount` ticks. Scrolls requested within the same tick are merged.
+        """
+        self._put(("scroll", amount))
+
+    def click(self, button='left'):
+        """
+        Requests a mouse click with the given button.
+        """
+        self._put(("click", button))
+
+    def hotkey(self, *keys):
+        """
+        Requests a key combination such as `hotkey('alt', 'left')`.
+        """
+        self._put(("hotkey", keys))
+
+    def stop(self):
+        """
+        Asks the actuator thread to exit after its current tick.
+        """
+        self._queue.put(self._STOP)
+
+    # ~~~~~~~~~~~~~~~~~~~ Actuation ~~~~~~~~~~~~~~~~~~~ #
+    def _is_idle(self):
+        return (self._pending_dx == 0 and self._pending_dy == 0 and self._pending_scroll == 0
+                and self._target is None)
+
+    def _take_step(self, pending, alpha):
+        """
+        Returns the whole number of pixels to move this tick and the distance that remains afterwards.
+        """
+        step = pending if abs(pending) <= 1 else pending * alpha
+        pixels = int(round(step))
+        remaining = pending - pixels
+        if pixels == 0 and abs(remaining) < 0.5:
+            remaining = 0.0  # Sub-pixel leftovers are not worth an event
+        return pixels, remaining
+
+    def _emit(self, discrete):
+        alpha = 1.0 if self.smoothing <= 0 else 1.0 - math.exp(-self.tick / self.smoothing)
+        dx, self._pending_dx = self._take_step(self._pending_dx, alpha)
+        dy, self._pending_dy = self._take_step(self._pending_dy, alpha)
+        if dx or dy:
+            self.backend.moveRel(dx, dy)
+            self._position = None
+            self.events += 1
+
+        if self._target is not None:
+            if self._position is None:
+                position = self._target  # Nothing to ease from, go straight to the target
+            else:
+                step_x, _ = self._take_step(self._target[0] - self._position[0], alpha)
+                step_y, _ = self._take_step(self._target[1] - self._position[1], alpha)
+                position = (self._position[0] + step_x, self._position[1] + step_y)
+            if position != self._position:
+                self.backend.moveTo(*position)
+                self._position = position
+                self.events += 1
+            if position == self._target:
+                self._target = None
+
+        scroll = int(self._pending_scroll)
+        if scroll:
+            self.backend.scroll(scroll)
+            self._pending_scroll -= scroll
+            self.events += 1
+        elif abs(self._pending_scroll) < 1:
+            self._pending_scroll = 0.0
+
+        for command in discrete:
+            if command[0] == "click":
+                self.backend.click(button=command[1])
+            else:
+                self.backend.hotkey(*command[1])
+            self.events += 1
+
+    def _drain(self, first=None):
+        """
+        Takes every queued command and adds it to the pending movement.
+
+        Returns:
+        tuple: The clicks and hotkeys to perform, and whether a stop was requested.
+        """
+        commands = [] if first is None else [first]
+        while True:
+            try:
+                commands.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        discrete = []
+        stopping = False
+        for command in commands:
+            if command is self._STOP:
+                stopping = True
+            elif command[0] == "move":
+                if self._target is not None:
+                    # Moving relative to a target that is not reached yet moves the target
+                    self._target = (self._target[0] + int(round(command[1])), self._target[1] + int(round(command[2])))
+                else:
+                    self._pending_dx += command[1]
+                    self._pending_dy += command[2]
+            elif command[0] == "move_to":
+                self._target = (command[1], command[2])
+                self._pending_dx = self._pending_dy = 0.0  # Superseded by the absolute position
+            elif command[0] == "scroll":
+                self._pending_scroll += command[1]
+            else:
+                discrete.append(command)
+        return discrete, stopping
+
+    def step(self):
+        """
+        Runs a single tick on the calling thread: drains the queue and emits the merged events.
+
+        This is what the actuator thread does once per tick. It is exposed so that offline replays can drive the
+        actuator deterministically, one tick per frame, without starting the thread.
+        """
+        discrete, _ = self._drain()
+        self._emit(discrete)
+
+    def run(self):
+        next_tick = time.monotonic()
+        stopping = False
+        while not stopping:
+            # Block while there is nothing left to ease out, otherwise wake up for the next tick
+            try:
+                first = self._queue.get(timeout=None if self._is_idle() else self.tick)
+            except queue.Empty:
+                first = None
+
+            # Let the rest of the tick's commands arrive so they can be merged into one event
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            next_tick = max(next_tick, time.monotonic()) + self.tick
+
+            discrete, stopping = self._drain(first)
+            started = self.metrics.start()
+            try:
+                self._emit(discrete)
+            except Exception as e:
+                print(f"Action failed: {e}")
+            self.metrics.stop("actuate", started)
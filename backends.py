@@ -0,0 +1,405 @@
+"""
+Landmark backends: what finds faces in a frame and turns them into the shared landmark array.
+
+The tracker only talks to the LandmarkBackend interface, so the model behind it can be chosen per machine with
+the `backend` setting of the [Tracking] section:
+- face_mesh: the MediaPipe Face Mesh solution the tracker has always used. Recent MediaPipe releases no longer
+  include it.
+- face_landmarker: the MediaPipe Tasks FaceLandmarker in VIDEO mode, which tracks the face from frame to frame
+  like the Face Mesh does. Its model is loaded from the `landmark_model` file.
+- opencv: OpenCV's Haar cascades, without MediaPipe. Only the face and the eyes are found, from which the head
+  pose is estimated. Much cheaper and much coarser; winks and the mouth are not seen.
+- auto: the first of the MediaPipe backends that can be loaded. The opencv backend is never picked
+  automatically, since it cannot do everything the others do; it has to be chosen.
+"""
+import math
+import os
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from landmarks import EYE_INDICES, FACE_EDGE_INDICES, NOSE_INDEX
+from preferences import resource
+
+# Settings of the [Tracking] section that choose and configure the backend
+BACKEND_DEFAULTS = {
+    'backend': 'auto',  # "face_mesh", "face_landmarker", "opencv", or "auto" for the first MediaPipe one that loads
+    'landmark_model': 'face_landmarker.task',  # Model file of the face_landmarker backend
+    'min_detection_confidence': 0.5,  # Detection score needed to start tracking a face
+    'min_tracking_confidence': 0.5,  # Tracking score below which the face is searched for again
+}
+
+MODEL_URL = ("https://storage.googleapis.com/mediapipe-models/face_landmarker/face_landmarker/float16/1/"
+             "face_landmarker.task")
+
+
+def edge_box(landmark):
+    """
+    Returns the (left, top, right, bottom) box of a face mesh face, normalized to the image it was found in.
+
+    Only the four landmarks on the edge of the face are read, so sizing up a face that will not be tracked
+    costs next to nothing compared to converting all of its landmarks.
+    """
+    xs = [landmark[index].x for index in FACE_EDGE_INDICES]
+    ys = [landmark[index].y for index in FACE_EDGE_INDICES]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+class LandmarkBackend:
+    """
+    Finds faces in the mesh input and converts them into the shared landmark array.
+
+    `process` runs the model on one image and returns the faces found, in whatever form the backend keeps
+    them. Nothing is converted yet: the tracker sizes up every face with `box`, picks the primary one, and
+    only converts that one with `landmarks`.
+    """
+
+    name = None
+
+    # Whether the eyelid landmarks follow the eyes; the tracker leaves out eye gestures when they do not
+    sees_eyelids = True
+
+    def process(self, image, timestamp):
+        """
+        Finds the faces in one image.
+
+        Args:
+        image (np.array): The RGB image to search.
+        timestamp (float): The frame's time in seconds. Must increase from one call to the next.
+
+        Returns:
+        list: The faces found, in the backend's own form; empty if there are none.
+        """
+        raise NotImplementedError
+
+    def box(self, face):
+        """
+        Returns the (left, top, right, bottom) box of a face returned by `process`, normalized to the image.
+        """
+        raise NotImplementedError
+
+    def landmarks(self, face, target):
+        """
+        Converts a face returned by `process` into landmarks.
+
+        Args:
+        face (object): One of the faces returned by the last call to `process`.
+        target (FaceLandmarks): The landmark array to fill.
+
+        Returns:
+        tuple: The filled (478, 3) array of landmarks normalized to the image, and the confidence that the
+        face is a face, between 0 and 1.
+        """
+        raise NotImplementedError
+
+    def reset(self):
+        """
+        Makes the model search the next image afresh instead of following the face it tracked in the last one.
+
+        The MediaPipe models carry the region of the face over to the next frame, in coordinates of the last
+        image. When the tracker switches between the full frame and a crop around the face, that region points at
+        the wrong part of the next image, so the tracker calls this on every such switch.
+        """
+
+    def close(self):
+        pass
+
+
+class FaceMeshBackend(LandmarkBackend):
+    """
+    The MediaPipe Face Mesh solution, with refined iris landmarks.
+
+    Face Mesh only reports faces whose tracking score passed `min_tracking_confidence` and does not expose the
+    score itself, so every face it returns has a confidence of 1.
+
+    Args:
+    max_num_faces (int): Most faces to find per frame.
+    min_detection_confidence (float): Detection score needed to start tracking a face.
+    min_tracking_confidence (float): Tracking score below which the face is searched for again.
+    """
+
+    name = "face_mesh"
+
+    def __init__(self, max_num_faces=1, min_detection_confidence=0.5, min_tracking_confidence=0.5):
+        import mediapipe as mp
+
+        if not hasattr(mp, "solutions"):
+            raise ImportError(f"MediaPipe {mp.__version__} no longer includes the Face Mesh solution")
+        self.face_mesh = mp.solutions.face_mesh.FaceMesh(max_num_faces=max_num_faces, refine_landmarks=True,
+                                                         min_detection_confidence=min_detection_confidence,
+                                                         min_tracking_confidence=min_tracking_confidence)
+
+    @classmethod
+    def from_settings(cls, settings, max_num_faces=1):
+        return cls(max_num_faces, settings['min_detection_confidence'], settings['min_tracking_confidence'])
+
+    def process(self, image, timestamp):
+        return self.face_mesh.process(image).multi_face_landmarks or []
+
+    def box(self, face):
+        return edge_box(face.landmark)
+
+    def landmarks(self, face, target):
+        return target.update(face.landmark), 1.0
+
+    def reset(self):
+        self.face_mesh.reset()
+
+    def close(self):
+        self.face_mesh.close()
+
+
+class FaceLandmarkerBackend(LandmarkBackend):
+    """
+    The MediaPipe Tasks FaceLandmarker in VIDEO mode.
+
+    The model file is read into memory and handed over as a buffer, which also works inside a packaged app
+    where MediaPipe cannot open the file itself. VIDEO mode needs strictly increasing whole-millisecond
+    timestamps, so two frames within the same millisecond are spread apart. Like Face Mesh, the landmarker
+    only reports faces that passed its presence and tracking thresholds, so their confidence is 1.
+
+    Args:
+    model_path (str): Path of the face_landmarker.task model.
+    max_num_faces (int): Most faces to find per frame.
+    min_detection_confidence (float): Detection score needed to start tracking a face.
+    min_tracking_confidence (float): Presence and tracking score below which the face is searched for again.
+    """
+
+    name = "face_landmarker"
+
+    def __init__(self, model_path, max_num_faces=1, min_detection_confidence=0.5, min_tracking_confidence=0.5):
+        import mediapipe as mp
+
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"FaceLandmarker model {model_path} not found, download it from {MODEL_URL}")
+        with open(model_path, "rb") as model_file:
+            model = model_file.read()
+        vision = mp.tasks.vision
+        self._options = vision.FaceLandmarkerOptions(base_options=mp.tasks.BaseOptions(model_asset_buffer=model),
+                                               running_mode=vision.RunningMode.VIDEO, num_faces=max_num_faces,
+                                               min_face_detection_confidence=min_detection_confidence,
+                                               min_face_presence_confidence=min_tracking_confidence,
+                                               min_tracking_confidence=min_tracking_confidence)
+        self._create = vision.FaceLandmarker.create_from_options
+        self.landmarker = self._create(self._options)
+        self._image = lambda data: mp.Image(image_format=mp.ImageFormat.SRGB, data=data)
+        self._last_timestamp = -1
+
+    @classmethod
+    def from_settings(cls, settings, max_num_faces=1):
+        return cls(resource(settings['landmark_model']), max_num_faces, settings['min_detection_confidence'],
+                   settings['min_tracking_confidence'])
+
+    def process(self, image, timestamp):
+        self._last_timestamp = max(int(timestamp * 1000), self._last_timestamp + 1)
+        return self.landmarker.detect_for_video(self._image(image), self._last_timestamp).face_landmarks
+
+    def box(self, face):
+        return edge_box(face)
+
+    def landmarks(self, face, target):
+        return target.update(face), 1.0
+
+    def reset(self):
+        # The landmarker cannot be told to forget its face, so a new one is built from the model in memory
+        self.landmarker.close()
+        self.landmarker = self._create(self._options)
+
+    def close(self):
+        self.landmarker.close()
+
+
+# A face found by the OpenCV backend: the grey image it was found in, its (x, y, w, h) rectangle in pixels, and
+# the cascade's score for it
+CascadeFace = namedtuple("CascadeFace", ["gray", "rect", "score"])
+
+# A head model in face widths: x to the right, y down and z towards the camera from the centre of the face
+# rectangle found by the cascade. Eyes are given by their outer and inner corners.
+FACE_MODEL = {
+    NOSE_INDEX: (0.0, 0.08, -0.30),
+    33: (-0.30, -0.12, -0.12), 133: (-0.10, -0.12, -0.12),  # Eye on the left of the image
+    263: (0.30, -0.12, -0.12), 362: (0.10, -0.12, -0.12),  # Eye on the right of the image
+    61: (-0.16, 0.26, -0.14), 291: (0.16, 0.26, -0.14),  # Mouth corners
+    13: (0.0, 0.24, -0.16), 14: (0.0, 0.245, -0.16),  # Inner lips, closed
+    199: (0.0, 0.42, -0.14),  # Chin
+    10: (0.0, -0.50, -0.10), 152: (0.0, 0.52, -0.10),  # Top of the forehead and bottom of the chin
+    234: (-0.46, 0.0, 0.05), 454: (0.46, 0.0, 0.05),  # Cheek edges
+}
+MODEL_INDICES = np.array(list(FACE_MODEL))
+MODEL_POINTS = np.array(list(FACE_MODEL.values()))
+
+# Where the cascade's eye centres sit in a frontal face rectangle, as fractions of its width and height
+EYE_CENTRES = ((0.3, 0.38), (0.7, 0.38))
+
+# How far the eyes move within the face rectangle, in face widths, per radian the head turns or nods
+EYE_SHIFT_PER_RADIAN = 0.25
+
+# Eye aspect ratio given to both eyes, that of an open eye
+OPEN_EYE_RATIO = 0.3
+
+
+def rotation_matrix(pitch, yaw, roll):
+    """
+    Returns the matrix that nods the head model by `pitch`, turns it by `yaw` and then tilts it by `roll`,
+    all in radians. Positive angles move the front of the face down, to the right and clockwise in the image.
+    """
+    sx, cx = math.sin(pitch), math.cos(pitch)
+    sy, cy = math.sin(yaw), math.cos(yaw)
+    sz, cz = math.sin(roll), math.cos(roll)
+    nod = np.array([[1, 0, 0], [0, cx, -sx], [0, sx, cx]])
+    turn = np.array([[cy, 0, -sy], [0, 1, 0], [sy, 0, cy]])
+    tilt = np.array([[cz, -sz, 0], [sz, cz, 0], [0, 0, 1]])
+    return tilt @ nod @ turn
+
+
+class OpenCVBackend(LandmarkBackend):
+    """
+    Finds the face and eyes with OpenCV's Haar cascades and estimates the landmarks the tracker reads from them.
+
+    The eye line gives the roll, and where the eyes sit within the face rectangle gives the yaw and pitch. A
+    head model turned by those angles is projected onto the face rectangle to fill the pose, eye, lip and face
+    edge landmarks, so head pose, smoothing and gestures run unchanged. An eye the cascade does not find is
+    placed where it was last seen. Every other landmark is set to the nose tip.
+
+    The eye cascade misses open eyes too, behind glasses, in side light or during quick movements, so a missing
+    eye says nothing about whether it is closed. Both eyes are therefore always reported open, and the tracker
+    leaves out the gesture rules that read the eyes while this backend is active. The mouth is not detected
+    either, so the lips always stay closed.
+
+    Eyes are only searched for in the face that is converted with `landmarks`. The confidence is the cascade's
+    score of the face squashed into 0 to 1; it orders faces, but is not a probability.
+
+    Args:
+    max_num_faces (int): Most faces to find per frame.
+    min_neighbors (int): Overlapping detections a face needs, higher to reject more false faces.
+    """
+
+    name = "opencv"
+    sees_eyelids = False
+
+    def __init__(self, max_num_faces=1, min_neighbors=5):
+        self.face_cascade = self._load_cascade("haarcascade_frontalface_default.xml")
+        self.eye_cascade = self._load_cascade("haarcascade_eye.xml")
+        self.max_num_faces = max_num_faces
+        self.min_neighbors = min_neighbors
+        self._eyes = list(EYE_CENTRES)  # Where each eye was last seen within the face rectangle
+
+    @staticmethod
+    def _load_cascade(name):
+        path = os.path.join(cv2.data.haarcascades, name)
+        cascade = cv2.CascadeClassifier(path)
+        if cascade.empty():
+            raise FileNotFoundError(f"OpenCV cascade {path} not found")
+        return cascade
+
+    @classmethod
+    def from_settings(cls, settings, max_num_faces=1):
+        return cls(max_num_faces)
+
+    def process(self, image, timestamp):
+        gray = cv2.equalizeHist(cv2.cvtColor(image, cv2.COLOR_RGB2GRAY))
+        min_size = max(min(gray.shape) // 6, 24)
+        rects, _, scores = self.face_cascade.detectMultiScale3(gray, scaleFactor=1.1, minNeighbors=self.min_neighbors,
+                                                               minSize=(min_size, min_size), outputRejectLevels=True)
+        order = np.argsort(-np.asarray(scores).reshape(-1))[:self.max_num_faces]
+        return [CascadeFace(gray, tuple(int(value) for value in rects[index]), float(np.ravel(scores)[index]))
+                for index in order]
+
+    def box(self, face):
+        img_h, img_w = face.gray.shape
+        x, y, w, h = face.rect
+        return x / img_w, y / img_h, (x + w) / img_w, (y + h) / img_h
+
+    def find_eyes(self, face):
+        """
+        Returns the centre of each eye as fractions of the face rectangle, the last known one for an eye that
+        was not found.
+        """
+        x, y, w, h = face.rect
+        upper_face = face.gray[y:y + int(h * 0.6), x:x + w]
+        min_size = max(w // 8, 8)
+        found = [False, False]
+        for ex, ey, ew, eh in self.eye_cascade.detectMultiScale(upper_face, scaleFactor=1.1, minNeighbors=5,
+                                                                 minSize=(min_size, min_size)):
+            centre = ((ex + ew / 2) / w, (ey + eh / 2) / h)
+            side = 0 if centre[0] < 0.5 else 1
+            if not found[side]:
+                self._eyes[side] = centre
+                found[side] = True
+        return self._eyes
+
+    def landmarks(self, face, target):
+        img_h, img_w = face.gray.shape
+        x, y, w, h = face.rect
+        (left_u, left_v), (right_u, right_v) = self.find_eyes(face)
+
+        roll = math.atan2((right_v - left_v) * h, (right_u - left_u) * w)
+        # How far the point between the eyes has moved from its frontal position, in face widths, with the
+        # roll undone
+        mid_x, mid_y = (left_u + right_u) / 2 - 0.5, ((left_v + right_v) / 2 - 0.5) * h / w
+        shift_x = mid_x * math.cos(roll) + mid_y * math.sin(roll)
+        shift_y = -mid_x * math.sin(roll) + mid_y * math.cos(roll) - (EYE_CENTRES[0][1] - 0.5)
+        yaw = float(np.clip(shift_x / EYE_SHIFT_PER_RADIAN, -1.0, 1.0))
+        pitch = float(np.clip(shift_y / EYE_SHIFT_PER_RADIAN, -1.0, 1.0))
+
+        model = MODEL_POINTS @ rotation_matrix(pitch, yaw, roll).T * w
+        model += (x + w / 2, y + h / 2, 0.0)
+        model /= (img_w, img_h, img_w)  # Depth is normalized like the x axis, as in the face mesh
+        points = target.points
+        points[:] = model[0]  # The nose tip
+        points[MODEL_INDICES] = model
+
+        # Eyelids above and below the points a third of the way along each eye line, as far apart as the eye
+        # aspect ratio of an open eye asks for. The ratio is measured in normalized coordinates, as
+        # `eye_aspect_ratios` does.
+        for indices in EYE_INDICES:
+            outer, inner = points[indices[[0, 3]], :2]
+            along = inner - outer
+            across = np.array([-along[1], along[0]]) * OPEN_EYE_RATIO / 2
+            lids = outer + np.outer((1 / 3, 2 / 3, 2 / 3, 1 / 3), along) + np.outer((-1, -1, 1, 1), across)
+            points[indices[[1, 2, 4, 5]], :2] = lids
+            points[indices[[1, 2, 4, 5]], 2] = points[indices[0], 2]
+        return points, 1 / (1 + math.exp(-face.score))
+
+
+BACKENDS = {backend.name: backend for backend in (FaceMeshBackend, FaceLandmarkerBackend, OpenCVBackend)}
+
+# The backends `auto` tries, in order
+AUTO_BACKENDS = (FaceMeshBackend, FaceLandmarkerBackend)
+
+
+def create_backend(settings, max_num_faces=1):
+    """
+    Builds the landmark backend chosen in the preferences.
+
+    Args:
+    settings (dict): The backend settings of the [Tracking] section, see BACKEND_DEFAULTS.
+    max_num_faces (int): Most faces to find per frame.
+
+    Returns:
+    LandmarkBackend: The backend, ready to process frames.
+
+    Raises:
+    ValueError: If the backend name is unknown.
+    RuntimeError: With `auto`, if none of the MediaPipe backends can be loaded. A backend chosen by name raises whatever
+    stopped it from loading.
+    """
+    name = settings['backend']
+    if name != 'auto':
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown landmark backend {name!r}, expected auto or one of {', '.join(BACKENDS)}")
+        return BACKENDS[name].from_settings(settings, max_num_faces)
+
+    errors = []
+    for backend in AUTO_BACKENDS:
+        try:
+            landmark_backend = backend.from_settings(settings, max_num_faces)
+        except (ImportError, OSError, RuntimeError) as e:
+            errors.append(f"{backend.name}: {e}")
+            continue
+        if errors:
+            print(f"Using the {backend.name} landmark backend ({'; '.join(errors)})")
+        return landmark_backend
+    raise RuntimeError(f"No MediaPipe landmark backend could be loaded ({'; '.join(errors)}); "
+                       f"set backend = opencv in the [Tracking] preferences to track without MediaPipe")
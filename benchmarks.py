@@ -0,0 +1,965 @@
+"""
+Micro-benchmarks for the tracker's per-frame building blocks.
+
+Each benchmark runs the code under test on recorded landmarks when a trace file is given, or on a synthetic
+head that slowly turns with a little landmark noise otherwise, and prints the per-frame cost.
+
+Usage:
+    python benchmarks.py pose
+    python benchmarks.py pose --trace session.trace --frames 5000
+    python benchmarks.py roi --video recording.mp4
+    python benchmarks.py smoothing --trace session.trace
+    python benchmarks.py preview --trace session.trace
+    python benchmarks.py scroll
+    python benchmarks.py tilt --save tilt_traces
+    python benchmarks.py startup --source camera
+    python benchmarks.py backends --video recording.mp4
+"""
+import argparse
+import json
+import os
+import queue
+import re
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from backends import BACKEND_DEFAULTS, BACKENDS, create_backend
+from head_pose import HeadPoseEstimator
+from landmark_trace import TraceReader, TraceWriter
+from landmarks import HEAD_AXIS_INDICES, LIP_INDICES, NUM_LANDMARKS, POSE_INDICES, FaceLandmarks, head_roll
+from preferences import load_section
+from roi import FaceRegion
+from scrolling import SCROLL_DEFAULTS, NodScroller
+from smoothing import SMOOTHING_DEFAULTS, CursorDeadband, PoseSmoother
+from tilt import TiltDetector
+
+
+def synthetic_landmarks(frames, seed=0):
+    """
+    Generates a landmark sequence of a head slowly turning left and right and nodding, with per-frame noise.
+
+    Args:
+    frames (int): Number of frames to generate.
+    seed (int): Seed of the noise generator.
+
+    Returns:
+    np.array: A (frames, 478, 3) float32 array of normalized landmarks.
+    """
+    rng = np.random.default_rng(seed)
+    base = np.zeros((NUM_LANDMARKS, 3), dtype=np.float32)
+    base[:, :2] = rng.normal(0.5, 0.08, (NUM_LANDMARKS, 2))
+    base[:, 2] = rng.normal(0.0, 0.02, NUM_LANDMARKS)
+    # Nose tip, eye corners, mouth corners and chin in a roughly face-shaped layout
+    base[POSE_INDICES] = [[0.50, 0.50, -0.05], [0.42, 0.42, 0.0], [0.45, 0.60, 0.0],
+                          [0.50, 0.70, 0.0], [0.58, 0.42, 0.0], [0.55, 0.60, 0.0]]
+
+    t = np.arange(frames, dtype=np.float32)[:, None]
+    sequence = np.repeat(base[None], frames, axis=0)
+    sequence[:, :, 0] += 0.03 * np.sin(t / 40) * (base[:, 2] * -10 + 1)
+    sequence[:, :, 1] += 0.02 * np.sin(t / 55)
+    sequence[:, :, :2] += rng.normal(0, 0.001, (frames, NUM_LANDMARKS, 2)).astype(np.float32)
+    return sequence
+
+
+def load_landmarks(trace_path, frames, with_times=False):
+    """
+    Returns up to `frames` landmark frames with a face from a trace, or synthetic ones if no trace is given.
+
+    With `with_times`, the frames' timestamps in seconds are returned as well (30 FPS for synthetic frames).
+    """
+    if trace_path is None:
+        landmarks, frame_size = synthetic_landmarks(frames), (640, 480)
+        times = np.arange(len(landmarks)) / 30.0
+    else:
+        reader = TraceReader(trace_path)
+        records = reader.records[:frames]
+        with_face = records[records["face"] == 1]
+        landmarks, frame_size, times = with_face["landmarks"], reader.frame_size, with_face["time"]
+    if with_times:
+        return landmarks, frame_size, times
+    return landmarks, frame_size
+
+
+def pose_inputs(landmarks, img_w, img_h):
+    pose = landmarks[POSE_INDICES]
+    face_2d = (pose[:, :2] * (img_w, img_h)).astype(np.int32).astype(np.float64)
+    face_3d = np.column_stack((face_2d, pose[:, 2]))
+    return face_2d, face_3d
+
+
+def legacy_pose(landmarks, img_w, img_h):
+    """
+    The head pose computation as `draw_landmarks` used to do it: everything rebuilt and solved from scratch.
+    """
+    face_2d, face_3d = pose_inputs(landmarks, img_w, img_h)
+    nose_3d = (float(landmarks[1, 0]) * img_w, float(landmarks[1, 1]) * img_h, float(landmarks[1, 2]) * 3000)
+    focal_length = 1 * img_w
+    cam_matrix = np.array([[focal_length, 0, img_h / 2],
+                           [0, focal_length, img_w / 2],
+                           [0, 0, 1]])
+    dist_matrix = np.zeros((4, 1), dtype=np.float64)
+    success, rot_vec, trans_vec = cv2.solvePnP(face_3d, face_2d, cam_matrix, dist_matrix)
+    rmat, jac = cv2.Rodrigues(rot_vec)
+    angles, mtxR, mtxQ, Qx, Qy, Qz = cv2.RQDecomp3x3(rmat)
+    cv2.projectPoints(nose_3d, rot_vec, trans_vec, cam_matrix, dist_matrix)
+    return angles
+
+
+def time_per_frame(function, frames):
+    """
+    Calls `function` once per frame and returns the mean and 99th percentile cost in microseconds.
+    """
+    samples = np.empty(len(frames))
+    for index, frame in enumerate(frames):
+        start = time.perf_counter()
+        function(frame)
+        samples[index] = time.perf_counter() - start
+    samples *= 1e6
+    return samples.mean(), np.percentile(samples, 99)
+
+
+def bench_pose(args):
+    landmarks, (img_w, img_h) = load_landmarks(args.trace, args.frames)
+    estimator = HeadPoseEstimator()
+
+    results = {
+        "solvePnP from scratch": time_per_frame(lambda frame: legacy_pose(frame, img_w, img_h), landmarks),
+        "HeadPoseEstimator": time_per_frame(
+            lambda frame: estimator.estimate(*pose_inputs(frame, img_w, img_h), img_w, img_h), landmarks),
+    }
+    print(f"Head pose, {len(landmarks)} frames at {img_w}x{img_h}")
+    for name, (mean, p99) in results.items():
+        print(f"  {name:<24}{mean:>9.1f} us/frame  (p99 {p99:.1f} us)")
+
+
+def run_tracker(tracker, clock, image, landmarks, times, after_frame=None):
+    """
+    Runs the gesture logic of the tracker loaded by replay.py's `load_tracker` on a sequence of landmark frames.
+
+    The per-face state is reset first, as if the face had been lost, and the mode set to MOUSE. The clock carries
+    on from the previous run, so no cooldown is left over from it. The actuator is stepped after every frame.
+
+    Args:
+    after_frame (callable, optional): Called with each frame's timestamp after its landmarks were handled.
+    """
+    tracker.draw_landmarks(image, [])
+    tracker.current_mode = "MOUSE"
+    offset = clock.now + 10 - times[0]
+    for frame, now in zip(landmarks, times):
+        clock.now = offset + now
+        tracker.handle_landmarks(image, frame)
+        tracker.actuator.step()
+        if after_frame is not None:
+            after_frame(clock.now)
+
+
+def bench_smoothing(args):
+    """
+    Compares the head pose smoothing filters on the same sequence of raw head pose angles.
+
+    Reports the remaining jitter of the filtered angles (from their second difference, which cancels the
+    steady turning of the head), their lag behind the raw angles (from the peak of their cross-correlation), the
+    filter's cost per frame, and the cursor moves per second that reach the `CursorActuator`. The moves are
+    counted by running the gesture logic of Scroll.py on each frame, with pyautogui replaced by the recording
+    stub of replay.py, once with joystick and once with absolute cursor mapping. The first row is the tracker
+    without smoothing and without either deadband.
+    """
+    from cursor_mapping import CURSOR_DEFAULTS, AbsoluteCursorMapper, CursorPosition
+    from replay import RecordingPyAutoGUI, ReplayClock, load_tracker
+
+    landmarks, (img_w, img_h), times = load_landmarks(args.trace, args.frames, with_times=True)
+    estimator = HeadPoseEstimator()
+    raw = []
+    for frame in landmarks:
+        angles = estimator.estimate(*pose_inputs(frame, img_w, img_h), img_w, img_h)
+        raw.append(angles if angles is not None else raw[-1])
+    raw = np.asarray(raw)[:, :2] * 360  # The x and y angles in the units the cursor code uses
+    duration = times[-1] - times[0]
+    frame_time = duration / (len(times) - 1)
+
+    clock = ReplayClock()
+    stub = RecordingPyAutoGUI(clock)
+    tracker = load_tracker(stub, clock)
+    image = np.zeros((img_h, img_w, 3), dtype=np.uint8)
+    screen_size = (stub.width, stub.height)
+    absolute = AbsoluteCursorMapper.from_settings(screen_size, CURSOR_DEFAULTS)
+    moves = []
+    tracker.actuator.observer = lambda command: moves.append(command) if command[0] in ("move", "move_to") else None
+
+    def cursor_moves(settings):
+        # Cursor moves per second requested from the actuator, with joystick and with absolute mapping
+        rates = []
+        for mapper in (None, absolute):
+            tracker.cursor_mapper = mapper
+            tracker.pose_smoother = PoseSmoother.from_settings(settings)
+            tracker.cursor_deadband = CursorDeadband.from_settings(settings)
+            # Every run starts with the cursor in the middle of the screen
+            stub.x, stub.y = stub.width // 2, stub.height // 2
+            tracker.cursor_position = CursorPosition(stub.position, screen_size, CURSOR_DEFAULTS['sync_interval'])
+            moves.clear()
+            run_tracker(tracker, clock, image, landmarks, times)
+            rates.append(len(moves) / duration)
+        return rates
+
+    settings = dict(SMOOTHING_DEFAULTS, deadband=args.deadband, min_move=args.min_move)
+    print(f"Head pose smoothing, {len(raw)} frames over {duration:.1f} s, "
+          f"deadband {args.deadband}, min_move {args.min_move} px")
+    print(f"  {'filter':<12}{'jitter':>10}{'lag (ms)':>10}{'us/frame':>10}{'joystick/s':>12}{'absolute/s':>12}")
+    rows = [("unfiltered", dict(settings, filter="none", deadband=0.0, min_move=0.0))]
+    rows += [(kind, dict(settings, filter=kind)) for kind in ("none", "one_euro", "kalman")]
+    for label, row_settings in rows:
+        # Jitter and lag are those of the filter alone; the deadband's steps would hide them
+        smoother = PoseSmoother.from_settings(dict(row_settings, deadband=0.0))
+        output = np.empty_like(raw)
+        start = time.perf_counter()
+        for index, (angles, now) in enumerate(zip(raw, times)):
+            output[index] = smoother(angles, now)
+        cost = (time.perf_counter() - start) / len(raw) * 1e6
+
+        centred_raw = raw[:, 1] - raw[:, 1].mean()
+        centred_output = output[:, 1] - output[:, 1].mean()
+        correlation = np.correlate(centred_output, centred_raw, mode="full")
+        lag = (np.argmax(correlation) - (len(raw) - 1)) * frame_time * 1000
+        joystick, pointing = cursor_moves(row_settings)
+        print(f"  {label:<12}{jitter(output):>10.3f}{lag:>10.0f}{cost:>10.1f}{joystick:>12.1f}{pointing:>12.1f}")
+
+
+def synthetic_nods(seconds, fps=30, seed=0):
+    """
+    Generates the head pitch of a user who holds still and nods now and then, at `fps` frames per second.
+
+    Returns:
+    tuple: The frame timestamps, the pitch in degrees with a little noise, and the direction of the nod each
+    frame belongs to (1 up, -1 down, 0 while holding still).
+    """
+    rng = np.random.default_rng(seed)
+    times = np.arange(0, seconds, 1 / fps)
+    pitch = rng.normal(0, 0.3, len(times))
+    nods = np.zeros(len(times), dtype=int)
+    start = 1.0
+    while start < seconds - 2:
+        direction = rng.choice([-1, 1])
+        amplitude = rng.uniform(6, 15)
+        stroke, back = rng.uniform(0.15, 0.35), rng.uniform(0.25, 0.45)
+        down = (times >= start) & (times < start + stroke)
+        up = (times >= start + stroke) & (times < start + stroke + back)
+        pitch[down] += direction * amplitude * (times[down] - start) / stroke
+        pitch[up] += direction * amplitude * (1 - (times[up] - start - stroke) / back)
+        nods[down | up] = direction
+        start += stroke + back + rng.uniform(0.5, 2.5)
+    return times, pitch, nods
+
+
+def bench_scroll(args):
+    """
+    Compares the nod scroller with the previous per-frame scrolling on a synthetic sequence of nods.
+
+    The previous SCROLL mode sent a scroll of 50 in the direction of the pitch on every frame the head was turned
+    past the face direction threshold (or down at all), so it scrolled whenever the head was not level. Reported
+    are the scroll events per nod, the scroll sent in the direction of a nod and against it, and the scroll sent
+    while the head was held still.
+    """
+    times, pitch, nods = synthetic_nods(args.seconds)
+    nod_count = np.count_nonzero(np.diff(np.abs(nods)) == 1)
+    print(f"Scrolling, {nod_count} nods over {args.seconds:.0f} s at 30 fps")
+    print(f"  {'method':<10}{'events':>8}{'per nod':>9}{'with nod':>10}{'against':>9}{'while still':>13}"
+          f"{'us/frame':>10}")
+
+    def legacy(x, now):
+        if x > 7.0 or x < 0:
+            return 50 if x > 0 else -50
+        return 0
+
+    scroller = NodScroller.from_settings(SCROLL_DEFAULTS)
+    for label, update in (("legacy", legacy), ("nod", scroller.update)):
+        amounts = np.zeros(len(times))
+        start = time.perf_counter()
+        for index, (now, x) in enumerate(zip(times, pitch)):
+            amounts[index] = update(x, now)
+        cost = (time.perf_counter() - start) / len(times) * 1e6
+
+        events = np.count_nonzero(amounts)
+        with_nod = np.abs(amounts[(nods != 0) & (np.sign(amounts) == nods)]).sum()
+        against = np.abs(amounts[(nods != 0) & (np.sign(amounts) == -nods)]).sum()
+        still = np.abs(amounts[nods == 0]).sum()
+        print(f"  {label:<10}{events:>8}{events / max(nod_count, 1):>9.1f}{with_nod:>10.0f}{against:>9.0f}"
+              f"{still:>13.0f}{cost:>10.1f}")
+
+
+def tilt_sequence(seconds, roll, x=0.5, y=0.5, scale=1.0, width=0.0, seed=0, frame_size=(640, 480)):
+    """
+    Generates the landmarks of a face that rolls, moves and turns as described by per-frame functions.
+
+    Args:
+    seconds (float): Length of the sequence; frames are 1/30 s apart.
+    roll (callable): Maps the frame times to the roll of the head in degrees.
+    x, y (callable or float): Position of the face centre in normalized image coordinates.
+    scale (callable or float): Size of the face relative to its normal size.
+    width (callable or float): Horizontal squash from turning the head, 0 for facing the camera.
+    seed (int): Seed of the landmark noise.
+
+    Returns:
+    tuple: The frame times and a (frames, 478, 3) float32 array of normalized landmarks.
+    """
+    rng = np.random.default_rng(seed)
+    times = np.arange(0, seconds, 1 / 30)
+    value = lambda parameter: parameter(times) if callable(parameter) else np.full(len(times), parameter)
+    img_w, img_h = frame_size
+
+    # A face about 200 pixels tall, with the top of the forehead and the chin on its vertical axis
+    face = rng.normal(0, 60, (NUM_LANDMARKS, 2))
+    face[HEAD_AXIS_INDICES] = [[0, -110], [0, 100]]
+    face[LIP_INDICES] = [[0, 50], [0, 51]]  # A closed mouth, so the sequences do not toggle the mode
+    angle = np.radians(value(roll))[:, None]
+    squash = 1 - value(width)[:, None]
+    px = face[None, :, 0] * squash
+    py = face[None, :, 1]
+    rotated_x = px * np.cos(angle) - py * np.sin(angle)
+    rotated_y = px * np.sin(angle) + py * np.cos(angle)
+    size = value(scale)[:, None]
+
+    landmarks = np.zeros((len(times), NUM_LANDMARKS, 3), dtype=np.float32)
+    landmarks[:, :, 0] = value(x)[:, None] + rotated_x * size / img_w
+    landmarks[:, :, 1] = value(y)[:, None] + rotated_y * size / img_h
+    landmarks[:, :, :2] += rng.normal(0, 0.001, (len(times), NUM_LANDMARKS, 2)).astype(np.float32)
+    return times, landmarks
+
+
+def tilt_scenarios():
+    """
+    Builds the labelled tilt test set: deliberate tilts, and head movements that are not tilts.
+
+    Returns:
+    dict: Scenario names mapped to (times, landmarks, frame size, tilts), where tilts lists the (onset time,
+    side) of every deliberate tilt, side being -1 for left and 1 for right. Non-tilt scenarios have none.
+    """
+    def tilt(onsets, angle, ramp=0.3, hold=0.8):
+        # Roll up to `angle` over `ramp` seconds at each onset, hold it, and return upright
+        def roll(t):
+            out = np.zeros_like(t)
+            for onset in onsets:
+                rise = np.clip((t - onset) / ramp, 0, 1)
+                fall = np.clip((t - onset - ramp - hold) / ramp, 0, 1)
+                out += angle * (rise - fall)
+            return out
+        return roll
+
+    scenarios = {
+        "tilt_left": (dict(roll=tilt([1.5], -20)), [(1.5, -1)]),
+        "tilt_right": (dict(roll=tilt([1.5], 20)), [(1.5, 1)]),
+        "tilt_left_at_edge": (dict(roll=tilt([1.5], -15), x=0.8), [(1.5, -1)]),
+        "tilt_right_at_edge": (dict(roll=tilt([1.5], 15), x=0.2), [(1.5, 1)]),
+        "tilt_right_twice": (dict(roll=tilt([1.0, 3.5], 18)), [(1.0, 1), (3.5, 1)]),
+        "tilt_quick": (dict(roll=tilt([1.5], -18, ramp=0.15, hold=0.3)), [(1.5, -1)]),
+        "still": (dict(roll=0.0), []),
+        "move_across": (dict(roll=lambda t: 4 * np.sin(t), x=lambda t: 0.2 + 0.6 * t / 5), []),
+        "slouch_at_edge": (dict(roll=-7.0, x=0.15), []),
+        "nod": (dict(roll=0.0, y=lambda t: 0.5 + 0.05 * np.sin(t * 6), scale=lambda t: 1 + 0.1 * np.sin(t * 6)), []),
+        "turn": (dict(roll=lambda t: 3 * np.sin(t * 2), width=lambda t: 0.4 * np.abs(np.sin(t * 1.5))), []),
+        "lean_in": (dict(roll=lambda t: 5 * np.sin(t * 1.3), scale=lambda t: 1 + 0.5 * t / 5), []),
+    }
+
+    built = {}
+    for seed, (name, (motion, tilts)) in enumerate(scenarios.items()):
+        times, landmarks = tilt_sequence(5.0, seed=seed, **motion)
+        if name == "still":
+            # A few single frames with a misplaced forehead landmark
+            for frame in (40, 80, 120):
+                landmarks[frame, HEAD_AXIS_INDICES[0], 0] += 0.15
+        built[name] = (times, landmarks, (640, 480), tilts)
+    return built
+
+
+def save_tilt_scenarios(scenarios, directory):
+    """
+    Writes each scenario as a landmark trace, plus their labels in labels.json, so the set can be replayed with
+    replay.py and extended with recorded traces.
+    """
+    os.makedirs(directory, exist_ok=True)
+    labels = {}
+    for name, (times, landmarks, frame_size, tilts) in scenarios.items():
+        path = os.path.join(directory, f"{name}.trace")
+        if os.path.exists(path):
+            os.remove(path)  # Traces are appended to, so start from an empty file
+        with TraceWriter(path, frame_size) as writer:
+            for now, frame in zip(times, landmarks):
+                writer.write(now, frame)
+        labels[name] = tilts
+    with open(os.path.join(directory, "labels.json"), "w") as labels_file:
+        json.dump(labels, labels_file, indent=2)
+
+
+def load_tilt_scenarios(directory):
+    """
+    Reads a tilt test set written by `save_tilt_scenarios`, or laid out the same way by hand.
+
+    Onset times in labels.json are relative to the first frame of each trace.
+    """
+    with open(os.path.join(directory, "labels.json")) as labels_file:
+        labels = json.load(labels_file)
+    scenarios = {}
+    for name, tilts in labels.items():
+        reader = TraceReader(os.path.join(directory, f"{name}.trace"))
+        records = reader.records[reader.records["face"] == 1]
+        times = records["time"] - reader.records["time"][0]
+        scenarios[name] = (times, records["landmarks"], reader.frame_size, [tuple(tilt) for tilt in tilts])
+    return scenarios
+
+
+def legacy_tilt(landmarks, img_w, img_h):
+    # The angle of the (forehead x, chin x) pair that back / forward used before, upright at about 0.79
+    t, b = landmarks[HEAD_AXIS_INDICES, :2] * (img_w, img_h)
+    return np.arctan2(t, b)[0]
+
+
+def bench_tilt(args):
+    """
+    Runs the previous and the current back / forward detector over the labelled tilt test set.
+
+    The previous detector fired whenever its tilt measure was past a fixed threshold; the current one uses the
+    roll of `TiltDetector`. Both get the 1.5 s cooldown of the back / forward rules. A detection on the right
+    side within a second of a labelled tilt's onset counts as a hit, and its latency is measured from the onset.
+    Every other detection is a false positive.
+    """
+    scenarios = load_tilt_scenarios(args.load) if args.load else tilt_scenarios()
+    if args.save:
+        save_tilt_scenarios(scenarios, args.save)
+        print(f"Saved {len(scenarios)} scenarios to {args.save}")
+
+    def legacy_detector():
+        def update(landmarks, img_w, img_h, now):
+            tilt = legacy_tilt(landmarks, img_w, img_h)
+            return -1 if tilt < 0.7 else 1 if tilt > 0.86 else 0
+        return update
+
+    def roll_detector():
+        detector = TiltDetector()
+        return lambda landmarks, img_w, img_h, now: detector.update(head_roll(landmarks, img_w, img_h), now)
+
+    tilt_count = sum(len(tilts) for _, _, _, tilts in scenarios.values())
+    print(f"Tilt detection, {len(scenarios)} scenarios with {tilt_count} tilts")
+    print(f"  {'detector':<10}{'hits':>8}{'false pos.':>12}{'median ms':>11}{'max ms':>8}   false positives in")
+    for label, make_detector in (("legacy", legacy_detector), ("roll", roll_detector)):
+        hits, false_positives, latencies, noisy = 0, 0, [], []
+        for name, (times, landmarks, (img_w, img_h), tilts) in scenarios.items():
+            update = make_detector()
+            detections = []
+            last = float("-inf")
+            for now, frame in zip(times, landmarks):
+                side = update(frame, img_w, img_h, now)
+                if side and now - last >= 1.5:
+                    detections.append((now, side))
+                    last = now
+            unmatched = list(tilts)
+            for now, side in detections:
+                match = next(((onset, expected) for onset, expected in unmatched
+                              if expected == side and 0 <= now - onset <= 1.0), None)
+                if match is None:
+                    false_positives += 1
+                    noisy.append(name)
+                else:
+                    unmatched.remove(match)
+                    hits += 1
+                    latencies.append((now - match[0]) * 1000)
+        median = np.median(latencies) if latencies else float("nan")
+        worst = np.max(latencies) if latencies else float("nan")
+        print(f"  {label:<10}{f'{hits}/{tilt_count}':>8}{false_positives:>12}{median:>11.0f}{worst:>8.0f}   "
+              f"{', '.join(sorted(set(noisy))) or '-'}")
+
+
+def load_frames(video_path, frames):
+    """
+    Reads up to `frames` frames from a video file.
+    """
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise IOError(f"Could not open video file {video_path}")
+    images = []
+    while len(images) < frames:
+        success, frame = capture.read()
+        if not success:
+            break
+        images.append(frame)
+    capture.release()
+    return images
+
+
+def bench_roi(args):
+    """
+    Compares full-frame and face-region mesh input at 720p and 1080p.
+
+    With a video, each frame is scaled to the camera resolution under test and run through the configured
+    landmark backend, so both the preprocessing and the inference cost are measured. Without one, random frames
+    with a fixed face region in the middle are used and only the preprocessing (flip, crop, scale, colour
+    conversion) is timed.
+    """
+    if args.video:
+        frames = load_frames(args.video, args.frames)
+    else:
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 255, (480, 640, 3), dtype=np.uint8) for _ in range(min(args.frames, 100))]
+
+    print(f"Mesh input, {len(frames)} frames, face region scaled to {args.size} px")
+    if not args.video:
+        print("  Noise frames without a face: only preprocessing is timed, pass --video for the inference")
+    print(f"  {'input':<8}{'mode':<14}{'preprocess':>14}{'inference':>14}{'total':>14}  (ms/frame)")
+    for label, size in (("720p", (1280, 720)), ("1080p", (1920, 1080))):
+        scaled = [cv2.resize(frame, size) for frame in frames]
+        for mode in ("full frame", "face region"):
+            region = FaceRegion(target_size=args.size, enabled=mode == "face region")
+            mesh = None
+            if args.video:
+                mesh = create_backend(load_section('Tracking', BACKEND_DEFAULTS))
+            face = FaceLandmarks()
+
+            preprocess, inference = [], []
+            for frame in scaled:
+                if mesh is None and region.enabled:
+                    side = size[1] // 3
+                    region.crop = ((size[0] - side) // 2, side, side)
+
+                start = time.perf_counter()
+                image = cv2.flip(frame, 1)
+                mesh_input, crop = region.prepare(image)
+                mesh_input = cv2.cvtColor(mesh_input, cv2.COLOR_BGR2RGB)
+                preprocess.append(time.perf_counter() - start)
+
+                if mesh is not None:
+                    start = time.perf_counter()
+                    if region.switched:
+                        mesh.reset()  # As process_image does, so the rebuilds count towards the inference time
+                    faces = mesh.process(mesh_input, len(inference) / 30.0)
+                    inference.append(time.perf_counter() - start)
+                    if faces:
+                        landmarks, _ = mesh.landmarks(faces[0], face)
+                        region.to_frame(landmarks, crop, size[0], size[1])
+                        region.track(landmarks, size[0], size[1])
+                    else:
+                        region.lose()
+
+            pre_ms = np.mean(preprocess) * 1000
+            inf_ms = np.mean(inference) * 1000 if inference else float("nan")
+            print(f"  {label:<8}{mode:<14}{pre_ms:>14.2f}{inf_ms:>14.2f}{pre_ms + inf_ms:>14.2f}")
+
+
+def display_available():
+    """
+    Returns whether an OpenCV window can be opened. On Linux without a display server some OpenCV builds abort
+    the process instead of raising, so the environment is checked first.
+    """
+    if sys.platform.startswith("linux") and not (os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY")):
+        return False
+    try:
+        cv2.namedWindow("benchmark")
+    except cv2.error:
+        return False
+    return True
+
+
+def bench_preview(args):
+    """
+    Measures the CPU time headless mode saves, on the tracking path and in the preview renderer.
+
+    The gesture logic of Scroll.py runs on each frame's landmarks with pyautogui replaced by the recording stub
+    of replay.py, either headless or preparing the preview annotation and handing the frame to the renderer's
+    buffer, as the gesture stage does. After one warm-up run of each, the two modes alternate for `--repeats`
+    rounds and the median of each is reported, so neither mode profits from caches the other warmed up or
+    suffers from a slowdown of the machine that only lasted part of the run.
+
+    The renderer's work is what headless mode skips on the main thread: scaling the frame to `preview_scale`,
+    drawing its annotation and, when a display is available, showing it with `PreviewRenderer.render`, including
+    the `waitKey` event pump. It is timed per rendered frame and added up with the tracking path's difference
+    at the trace's frame rate and `preview_fps`. CPU time is measured with `time.process_time`, so the time
+    `waitKey` spends sleeping does not count, only the work it does.
+    """
+    from pipeline import LatestFrameBuffer
+    from preview import PreviewRenderer, draw_annotation
+    from replay import RecordingPyAutoGUI, ReplayClock, load_tracker
+
+    landmarks, (img_w, img_h), times = load_landmarks(args.trace, args.frames, with_times=True)
+    clock = ReplayClock()
+    tracker = load_tracker(RecordingPyAutoGUI(clock), clock)
+    image = np.zeros((img_h, img_w, 3), dtype=np.uint8)
+    frame_rate = (len(times) - 1) / (times[-1] - times[0])
+    preview_fps = tracker.tracking_preferences['preview_fps']
+    scale = tracker.tracking_preferences['preview_scale']
+
+    frames = LatestFrameBuffer()
+    annotations = []
+
+    def hand_to_renderer(now):
+        frames.put((now, (image, tracker.last_annotation)))
+        annotations.append(tracker.last_annotation)
+
+    def track(preview):
+        # CPU and wall time per frame of one run
+        tracker.show_preview = preview
+        annotations.clear()
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        run_tracker(tracker, clock, image, landmarks, times, hand_to_renderer if preview else None)
+        return ((time.process_time() - cpu_start) / len(landmarks) * 1e6,
+                (time.perf_counter() - wall_start) / len(landmarks) * 1e6)
+
+    track(False)
+    track(True)  # Warm-up
+    samples = {False: [], True: []}
+    for _ in range(args.repeats):
+        for preview in (False, True):
+            samples[preview].append(track(preview))
+
+    print(f"Tracking path, {len(landmarks)} frames at {img_w}x{img_h}, median of {args.repeats} rounds")
+    print(f"  {'mode':<12}{'cpu us/frame':>14}{'wall us/frame':>15}")
+    medians = {}
+    for label, preview in (("headless", False), ("preview", True)):
+        medians[preview] = np.median(samples[preview], axis=0)
+        print(f"  {label:<12}{medians[preview][0]:>14.1f}{medians[preview][1]:>15.1f}")
+
+    window = display_available()
+    annotations = [annotation for annotation in annotations if annotation is not None]  # Of the last run
+    renderer = PreviewRenderer(fps=1e6, scale=scale, window="benchmark")
+
+    def render(annotation):
+        if window:
+            renderer.frames.put((0.0, (image, annotation)))
+            renderer.render()
+        else:
+            # What `PreviewRenderer.render` does before showing the frame
+            shown = image if scale == 1.0 else cv2.resize(image, None, fx=scale, fy=scale,
+                                                          interpolation=cv2.INTER_AREA)
+            draw_annotation(shown, annotation, scale)
+
+    for annotation in annotations[:30]:  # Warm-up
+        render(annotation)
+    cpu_start = time.process_time()
+    for annotation in annotations:
+        render(annotation)
+    render_cpu = (time.process_time() - cpu_start) / len(annotations) * 1e6
+    if window:
+        cv2.destroyAllWindows()
+    print(f"Preview renderer at scale {scale}, {len(annotations)} frames")
+    print(f"  {render_cpu:>14.1f} cpu us/rendered frame{'' if window else ' (drawing only, no display)'}")
+
+    rendered_rate = min(preview_fps, frame_rate)
+    saved = (medians[True][0] - medians[False][0]) * frame_rate + render_cpu * rendered_rate
+    print(f"Headless saves {saved / 1000:.2f} ms of CPU per second at {frame_rate:.0f} fps, "
+          f"with the preview shown at {rendered_rate:.0f} fps")
+
+
+def startup_child(args):
+    """
+    Runs one start-up in this fresh interpreter and prints the time of each step as JSON.
+
+    Mirrors `Scroll.initialize` followed by the first processed frame: importing MediaPipe and building the
+    configured landmark backend, opening the frame source and reading and processing the first frame. With
+    `--parallel` the backend is built on a background thread while the source opens, as the tracker does.
+    """
+    steps = {}
+
+    def build_face_mesh():
+        settings = load_section('Tracking', BACKEND_DEFAULTS)
+        started = time.perf_counter()
+        if settings['backend'] != 'opencv':
+            import mediapipe
+        steps["import_mediapipe"] = time.perf_counter() - started
+        started = time.perf_counter()
+        mesh = create_backend(settings)
+        steps["build_face_mesh"] = time.perf_counter() - started
+        return mesh
+
+    def open_source():
+        started = time.perf_counter()
+        if args.source == "camera":
+            from camera import open_camera
+            capture = open_camera()
+        elif args.source:
+            capture = cv2.VideoCapture(args.source)
+        else:
+            capture = None
+        steps["open_source"] = time.perf_counter() - started
+        return capture
+
+    if args.parallel:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            face_mesh_ready = executor.submit(build_face_mesh)
+            capture = open_source()
+            face_mesh = face_mesh_ready.result()
+    else:
+        face_mesh = build_face_mesh()
+        capture = open_source()
+
+    started = time.perf_counter()
+    frame = None
+    if capture is not None:
+        success, frame = capture.read()
+        capture.release()
+    if frame is None:
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    steps["first_frame"] = time.perf_counter() - started
+    started = time.perf_counter()
+    face_mesh.process(cv2.cvtColor(cv2.flip(frame, 1), cv2.COLOR_BGR2RGB), 0.0)
+    steps["first_inference"] = time.perf_counter() - started
+    steps["finished"] = time.time()
+    print(json.dumps(steps))
+
+
+def time_entry_point(timeout):
+    """
+    Launches `Scroll.py --headless` and waits for it to report that it is tracking a face.
+
+    Args:
+    timeout (float): Seconds to wait before giving up.
+
+    Returns:
+    tuple: The seconds from launching the interpreter to the report, the start-up time the tracker reports
+    itself, which starts after its imports, and the lines it printed. The times are None if the tracker
+    exited or timed out before tracking a face.
+    """
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Scroll.py")
+    lines = queue.Queue()
+
+    def read_output(stream):
+        for line in stream:
+            lines.put(line)
+        lines.put(None)
+
+    launched = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-u", script, "--headless"], stdout=subprocess.PIPE,
+                               stderr=subprocess.STDOUT, text=True)
+    threading.Thread(target=read_output, args=(process.stdout,), daemon=True).start()
+    output = []
+    try:
+        while True:
+            line = lines.get(timeout=max(launched + timeout - time.perf_counter(), 0.001))
+            if line is None:
+                break
+            output.append(line.rstrip())
+            match = re.match(r"Tracking a face ([0-9.]+) s after the start", line)
+            if match:
+                return time.perf_counter() - launched, float(match.group(1)), output
+    except queue.Empty:
+        output.append(f"No face tracked within {timeout:.0f} s")
+    finally:
+        process.terminate()  # Handled like Ctrl+C, so the camera is released
+        process.wait()
+    return None, None, output
+
+
+def print_failure(label, output):
+    print(f"  {label}: run failed, skipped")
+    for line in output[-5:]:
+        print(f"    {line}")
+
+
+def bench_startup(args):
+    """
+    Measures the time from launching the tracker to its first processed frame, with the face mesh built before
+    or while the frame source opens, and the start-up of Scroll.py itself.
+
+    Every run starts a fresh interpreter, so imports are paid in full each time, and the time is taken from just
+    before the interpreter is launched until the first frame has been through the face mesh. The median of
+    `--runs` runs is shown per step. Without `--source` no frame source is opened and a blank frame is processed,
+    so there is nothing for the face mesh build to overlap with; use `--source camera` to include the webcam, or
+    a video file as a stand-in for it.
+
+    With `--source camera` the real entry point is timed as well: `Scroll.py --headless` is launched and timed
+    until it prints that it is tracking a face, so someone has to sit in front of the camera. The time it reports
+    itself starts after its imports, which gives the import time as the difference.
+
+    A run that fails is reported with the end of its output and left out. Returns 1 if a mode had no successful
+    run.
+    """
+    failed = False
+    print(f"Start-up to first processed frame, median of {args.runs} runs, source: {args.source or 'none'}")
+    steps = ["import_mediapipe", "build_face_mesh", "open_source", "first_frame", "first_inference"]
+    print(f"  {'mode':<12}" + "".join(f"{step:>18}" for step in steps) + f"{'total':>10}  (s)")
+    for label, parallel in (("sequential", False), ("parallel", True)):
+        runs = []
+        for _ in range(args.runs):
+            command = [sys.executable, os.path.abspath(__file__), "startup", "--child"]
+            command += ["--source", args.source] if args.source else []
+            command += ["--parallel"] if parallel else []
+            launched = time.time()
+            try:
+                output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+            except subprocess.CalledProcessError as e:
+                print_failure(label, (e.stdout + e.stderr).splitlines())
+                continue
+            result = json.loads(output.strip().splitlines()[-1])
+            result["total"] = result.pop("finished") - launched
+            runs.append(result)
+        if not runs:
+            failed = True
+            continue
+        medians = {step: float(np.median([run[step] for run in runs])) for step in steps + ["total"]}
+        print(f"  {label:<12}" + "".join(f"{medians[step]:>18.3f}" for step in steps) + f"{medians['total']:>10.3f}")
+
+    if args.source != "camera":
+        print("Scroll.py itself is only timed with --source camera")
+        return 1 if failed else None
+    print(f"Scroll.py --headless until it tracks a face, median of {args.runs} runs")
+    print(f"  {'imports':>10}{'to face':>10}{'total':>10}  (s)")
+    runs = []
+    for _ in range(args.runs):
+        total, reported, output = time_entry_point(args.timeout)
+        if total is None:
+            print_failure("Scroll.py", output)
+            continue
+        runs.append((total - reported, reported, total))
+    if not runs:
+        return 1
+    imports, to_face, total = np.median(runs, axis=0)
+    print(f"  {imports:>10.3f}{to_face:>10.3f}{total:>10.3f}")
+    return 1 if failed else None
+
+
+def jitter(samples):
+    """
+    Estimates the frame-to-frame noise of a signal that also moves smoothly.
+
+    Args:
+    samples (np.array): One row per frame, NaN in frames without a face.
+
+    Returns:
+    float: The standard deviation of the noise, or NaN without three consecutive frames with a face.
+
+    The second difference of three consecutive frames cancels out movement at a steady speed, and for
+    independent noise of standard deviation s it has a standard deviation of s * sqrt(6).
+    """
+    second = samples[2:] - 2 * samples[1:-1] + samples[:-2]
+    second = second[~np.isnan(second).any(axis=1)]
+    if not len(second):
+        return float("nan")
+    return float(np.sqrt(np.mean(second ** 2) / 6))
+
+
+def bench_backends(args):
+    """
+    Compares the landmark backends on the same recorded video: frame rate, CPU time per frame, the share of
+    frames with a face, the backend's confidence and the jitter of the landmarks and the head pose.
+
+    Every frame goes through the tracker's per-frame path: mirroring, the face region of roi.py, the colour
+    conversion, the backend, converting the first face into the landmark array and solving the head pose. Frames
+    are fed as fast as the backend takes them, with the video's timestamps. CPU time is measured with
+    `time.process_time`, which includes the threads MediaPipe runs its graph on. Jitter is given for the pose
+    landmarks in pixels and for the pitch and yaw in the units the cursor code uses. Backends that cannot be
+    loaded on this machine are listed with the reason.
+    """
+    frames = load_frames(args.video, args.frames)
+    capture = cv2.VideoCapture(args.video)
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    capture.release()
+    img_h, img_w = frames[0].shape[:2]
+    settings = load_section('Tracking', BACKEND_DEFAULTS)
+
+    print(f"Landmark backends, {len(frames)} frames at {img_w}x{img_h}")
+    print(f"  {'backend':<17}{'fps':>8}{'cpu ms/frame':>14}{'faces':>8}{'confidence':>12}"
+          f"{'jitter px':>11}{'jitter pose':>13}")
+    for name in args.backends:
+        try:
+            backend = create_backend(dict(settings, backend=name))
+        except (ImportError, OSError, RuntimeError) as e:
+            print(f"  {name:<17}unavailable: {e}")
+            continue
+        region = FaceRegion()
+        face = FaceLandmarks()
+        head_pose = HeadPoseEstimator()
+        points = np.full((len(frames), len(POSE_INDICES) * 2), np.nan)
+        angles = np.full((len(frames), 2), np.nan)
+        confidences = []
+
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        for index, frame in enumerate(frames):
+            image = cv2.flip(frame, 1)
+            mesh_input, crop = region.prepare(image)
+            if region.switched:
+                backend.reset()
+            faces = backend.process(cv2.cvtColor(mesh_input, cv2.COLOR_BGR2RGB), index / fps)
+            if not faces:
+                region.lose()
+                head_pose.reset()
+                continue
+            landmarks, confidence = backend.landmarks(faces[0], face)
+            region.to_frame(landmarks, crop, img_w, img_h)
+            region.track(landmarks, img_w, img_h)
+            pose = head_pose.estimate_landmarks(landmarks, img_w, img_h)
+            confidences.append(confidence)
+            points[index] = (landmarks[POSE_INDICES, :2] * (img_w, img_h)).reshape(-1)
+            if pose is not None:
+                angles[index] = pose[:2]
+        cpu = (time.process_time() - cpu_start) / len(frames) * 1000
+        wall = time.perf_counter() - wall_start
+        backend.close()
+
+        angles *= 360  # The x and y angles in the units the cursor code uses
+        confidence = np.mean(confidences) if confidences else float("nan")
+        print(f"  {name:<17}{len(frames) / wall:>8.1f}{cpu:>14.2f}{len(confidences) / len(frames):>8.0%}"
+              f"{confidence:>12.2f}{jitter(points):>11.2f}{jitter(angles):>13.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the tracker's per-frame building blocks.")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    pose = subparsers.add_parser("pose", help="Head pose estimation per frame, before and after caching")
+    pose.add_argument("--trace", help="Landmark trace to use instead of synthetic landmarks")
+    pose.add_argument("--frames", type=int, default=3000, help="Maximum number of frames to run")
+    pose.set_defaults(run=bench_pose)
+
+    roi = subparsers.add_parser("roi", help="Full-frame versus face-region mesh input at 720p and 1080p")
+    roi.add_argument("--video", help="Video of a face; without it only preprocessing is timed")
+    roi.add_argument("--frames", type=int, default=300, help="Maximum number of frames to run")
+    roi.add_argument("--size", type=int, default=256, help="Side length the face region is scaled to")
+    roi.set_defaults(run=bench_roi)
+
+    smoothing = subparsers.add_parser("smoothing", help="Jitter, lag and cursor moves of the pose filters")
+    smoothing.add_argument("--trace", help="Landmark trace to use instead of synthetic landmarks")
+    smoothing.add_argument("--frames", type=int, default=3000, help="Maximum number of frames to run")
+    smoothing.add_argument("--deadband", type=float, default=SMOOTHING_DEFAULTS['deadband'],
+                           help="Deadband applied after every filter")
+    smoothing.add_argument("--min-move", type=float, default=SMOOTHING_DEFAULTS['min_move'],
+                           help="Shortest cursor move in pixels that is sent to the actuator")
+    smoothing.set_defaults(run=bench_smoothing)
+
+    preview = subparsers.add_parser("preview", help="Tracking CPU per frame with and without the preview")
+    preview.add_argument("--trace", help="Landmark trace to use instead of synthetic landmarks")
+    preview.add_argument("--frames", type=int, default=3000, help="Maximum number of frames to run")
+    preview.add_argument("--repeats", type=int, default=5, help="Rounds of each mode after the warm-up")
+    preview.set_defaults(run=bench_preview)
+
+    scroll = subparsers.add_parser("scroll", help="Scroll events of the nod scroller versus per-frame scrolling")
+    scroll.add_argument("--seconds", type=float, default=120.0, help="Length of the synthetic nod sequence")
+    scroll.set_defaults(run=bench_scroll)
+
+    tilt = subparsers.add_parser("tilt", help="False positives and latency of back / forward tilt detection")
+    tilt.add_argument("--save", metavar="DIR", help="Also write the test set as landmark traces to DIR")
+    tilt.add_argument("--load", metavar="DIR", help="Run a test set saved with --save instead of generating it")
+    tilt.set_defaults(run=bench_tilt)
+
+    startup = subparsers.add_parser("startup", help="Time from launch to the first processed frame")
+    startup.add_argument("--source", help="'camera', or a video file standing in for the camera")
+    startup.add_argument("--runs", type=int, default=5, help="Number of start-ups per mode")
+    startup.add_argument("--timeout", type=float, default=30.0,
+                         help="Seconds Scroll.py may take to track a face before the run counts as failed")
+    startup.add_argument("--parallel", action="store_true", help=argparse.SUPPRESS)
+    startup.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    startup.set_defaults(run=lambda args: startup_child(args) if args.child else bench_startup(args))
+
+    backends = subparsers.add_parser("backends", help="Frame rate, CPU and jitter of each landmark backend")
+    backends.add_argument("--video", required=True, help="Video of a face, run through every backend")
+    backends.add_argument("--frames", type=int, default=600, help="Maximum number of frames to run")
+    backends.add_argument("--backends", nargs="+", choices=list(BACKENDS), default=list(BACKENDS),
+                          help="Backends to compare")
+    backends.set_defaults(run=bench_backends)
+
+    args = parser.parse_args(argv)
+    sys.exit(args.run(args))
+
+
+if __name__ == "__main__":
+    main()
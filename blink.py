@@ -0,0 +1,98 @@
+import numpy as np
+
+from landmarks import EYE_INDICES
+
+# States an eye can be in
+OPEN = "open"
+CLOSING = "closing"
+CLOSED = "closed"
+HELD = "held"
+
+EYES = ("left", "right")
+
+
+def eye_aspect_ratios(landmarks):
+    """
+    Computes the eye aspect ratio (EAR) of both eyes.
+
+    Args:
+    landmarks (np.array): The face's landmarks as a (478, 3) array of normalized coordinates.
+
+    Returns:
+    np.array: The left and right eye's ratio of eyelid opening to eye width, about 0.3 for an open eye and
+    close to 0 for a closed one. It does not depend on the size of the face in the frame.
+    """
+    eyes = landmarks[EYE_INDICES, :2]  # (eye, point, xy)
+    vertical = (np.linalg.norm(eyes[:, 1] - eyes[:, 5], axis=1) +
+                np.linalg.norm(eyes[:, 2] - eyes[:, 4], axis=1))
+    horizontal = np.linalg.norm(eyes[:, 0] - eyes[:, 3], axis=1)
+    return vertical / (2 * np.maximum(horizontal, 1e-6))
+
+
+class BlinkDetector:
+    """
+    Tracks the state of each eye over time to tell deliberate winks from ordinary blinks.
+
+    Each eye moves between four states based on its eye aspect ratio:
+    - open: the ratio is above `open_threshold`.
+    - closing: the ratio is between the two thresholds, on its way down (or back up).
+    - closed: the ratio has dropped below `close_threshold`.
+    - held: the eye has stayed closed for `hold_time` seconds while the other eye stayed open.
+
+    A wink is reported once, when an eye enters the held state, and the eye has to open again before it can be
+    reported again. Blinking with both eyes never reaches the held state. Every decision is based on
+    timestamps, so a wink needs the same duration however many frames per second the tracker runs at, and
+    each update costs the same whatever the history.
+
+    Args:
+    close_threshold (float): Eye aspect ratio below which an eye counts as closed.
+    open_threshold (float): Eye aspect ratio above which a closed eye counts as open again.
+    hold_time (float): Seconds an eye must stay closed for a wink.
+    """
+
+    def __init__(self, close_threshold=0.18, open_threshold=0.22, hold_time=0.25):
+        self.close_threshold = close_threshold
+        self.open_threshold = open_threshold
+        self.hold_time = hold_time
+        self.states = [OPEN, OPEN]
+        self.closed_since = [None, None]  # When each eye last entered the closed state
+
+    def update(self, landmarks, now):
+        """
+        Advances both eyes' state machines with the current frame.
+
+        Args:
+        landmarks (np.array): The face's landmarks as a (478, 3) array of normalized coordinates.
+        now (float): Timestamp of the frame in seconds.
+
+        Returns:
+        list: The eyes ("left" and/or "right") whose wink was completed in this frame.
+        """
+        ratios = eye_aspect_ratios(landmarks)
+        for eye in (0, 1):
+            ratio = ratios[eye]
+            state = self.states[eye]
+            if ratio >= self.open_threshold:
+                state = OPEN
+            elif ratio <= self.close_threshold:
+                if state in (OPEN, CLOSING):
+                    state = CLOSED
+                    self.closed_since[eye] = now
+            elif state == OPEN:
+                state = CLOSING
+            self.states[eye] = state
+
+        winks = []
+        for eye in (0, 1):
+            other_closed = self.states[1 - eye] in (CLOSED, HELD)
+            if self.states[eye] == CLOSED and not other_closed and now - self.closed_since[eye] >= self.hold_time:
+                self.states[eye] = HELD
+                winks.append(EYES[eye])
+        return winks
+
+    def reset(self):
+        """
+        Forgets both eyes' state, e.g. when the face is lost.
+        """
+        self.states = [OPEN, OPEN]
+        self.closed_since = [None, None]
@@ -0,0 +1,299 @@
+"""
+Guided calibration of the gesture thresholds.
+
+The user is asked to hold a neutral face, wink with each eye, open their mouth, tilt their head both ways and
+point their nose at the corners of the screen, 25 seconds in total. Every frame is reduced to a small feature
+vector that is folded into running statistics, so no samples are kept. The thresholds derived from those
+statistics are saved to the [Gestures] and [Cursor] sections of user_preferences.ini, where Scroll.py picks them
+up at startup.
+
+Run it with `python calibration.py`; press ESC to cancel without saving.
+"""
+import time
+
+import cv2
+import numpy as np
+
+from backends import BACKEND_DEFAULTS, create_backend
+from blink import eye_aspect_ratios
+from camera import open_camera
+from head_pose import HeadPoseEstimator
+from landmarks import FaceLandmarks, head_roll, mouth_opening
+from preferences import load_section, save_section
+
+# Defaults of the [Gestures] section of user_preferences.ini, used until the user has calibrated
+GESTURE_DEFAULTS = {
+    'blink_close_threshold': 0.18,  # Eye aspect ratio below which an eye counts as closed
+    'blink_open_threshold': 0.22,  # Eye aspect ratio above which a closed eye counts as open again
+    'wink_hold_time': 0.25,  # Seconds an eye must stay closed, with the other one open, to click
+    'mouth_open_threshold': 0.01,  # Lip gap, in normalized image coordinates, that toggles the mode
+    'neutral_roll': 0.0,  # Head roll in degrees when the head is held upright
+    'tilt_angle': 10.0,  # Roll away from upright, in degrees, that counts as a tilt to go back or forward
+    'tilt_release_angle': 5.0,  # Roll away from upright below which the head counts as upright again
+    'tilt_hold_time': 0.1,  # Seconds a tilt must be held before the browser goes back or forward
+    'face_direction_threshold': 7.0,  # Head angle beyond which the head counts as turned
+}
+
+# Columns of the feature vector computed for each frame
+EAR_LEFT, EAR_RIGHT, MOUTH, ROLL, PITCH, YAW = range(6)
+
+# Steps of the session: name, prompt, seconds, the feature the step is about and the direction it should move
+# in compared to the neutral face (0 when every sample counts)
+STEPS = [
+    ("neutral", "Look at the screen and relax your face", 4.0, None, 0),
+    ("wink_left", "Close your LEFT eye, keep the right one open", 3.0, EAR_LEFT, -1),
+    ("wink_right", "Close your RIGHT eye, keep the left one open", 3.0, EAR_RIGHT, -1),
+    ("mouth", "Open your mouth", 3.0, MOUTH, 1),
+    ("tilt_back", "Tilt your head to the LEFT", 3.0, ROLL, -1),
+    ("tilt_forward", "Tilt your head to the RIGHT", 3.0, ROLL, 1),
+    ("range", "Slowly point your nose at each corner of the screen", 6.0, None, 0),
+]
+
+SETTLE_TIME = 0.75  # Seconds at the start of each step in which the user is still following the prompt
+GATE_SIGMAS = 3.0  # Deviation from neutral, in standard deviations, a gesture sample needs to be counted
+MIN_SAMPLES = 5  # Samples a step needs before its statistics are trusted
+
+
+class RunningStats:
+    """
+    Running mean, variance, minimum and maximum of a stream of values, using Welford's algorithm.
+
+    Values can be scalars or arrays, which are tracked element-wise. Each update is constant time and memory.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = None
+        self._m2 = None
+        self.minimum = None
+        self.maximum = None
+
+    def update(self, value):
+        value = np.asarray(value, dtype=np.float64)
+        self.count += 1
+        if self.count == 1:
+            self.mean = value.copy()
+            self._m2 = np.zeros_like(value)
+            self.minimum = value.copy()
+            self.maximum = value.copy()
+            return
+        delta = value - self.mean
+        self.mean = self.mean + delta / self.count
+        self._m2 = self._m2 + delta * (value - self.mean)
+        self.minimum = np.minimum(self.minimum, value)
+        self.maximum = np.maximum(self.maximum, value)
+
+    @property
+    def std(self):
+        return np.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else np.zeros_like(self.mean)
+
+
+def frame_features(landmarks, head_pose, img_w, img_h):
+    """
+    Reduces one frame's landmarks to the values the gesture thresholds apply to.
+
+    Args:
+    landmarks (np.array): The face's landmarks as a (478, 3) array of normalized coordinates.
+    head_pose (HeadPoseEstimator): Estimator used for the head angles.
+    img_w (int): Width of the frame in pixels.
+    img_h (int): Height of the frame in pixels.
+
+    Returns:
+    np.array: The left and right eye aspect ratio, mouth opening, head roll, pitch and yaw, indexed by the
+    EAR_LEFT ... YAW constants, or None if the head pose could not be solved.
+    """
+    angles = head_pose.estimate_landmarks(landmarks, img_w, img_h)
+    if angles is None:
+        return None
+    ears = eye_aspect_ratios(landmarks)
+    # Head angles in the same units as Scroll.py
+    return np.array([ears[0], ears[1], mouth_opening(landmarks), head_roll(landmarks, img_w, img_h),
+                     angles[0] * 360, angles[1] * 360])
+
+
+class CalibrationSession:
+    """
+    Steps through the calibration prompts and collects statistics for each of them.
+
+    The neutral step is recorded in full. In the gesture steps only the samples whose feature has moved more
+    than GATE_SIGMAS standard deviations away from neutral, in the expected direction, are counted, so the
+    moments spent getting into and out of the gesture do not dilute its statistics.
+
+    Args:
+    steps (list): The steps to run, see STEPS.
+    settle_time (float): Seconds ignored at the start of each step.
+    """
+
+    def __init__(self, steps=STEPS, settle_time=SETTLE_TIME):
+        self.steps = steps
+        self.settle_time = settle_time
+        self.stats = {step[0]: RunningStats() for step in steps}
+        self.index = 0
+        self._step_start = None
+
+    @property
+    def finished(self):
+        return self.index >= len(self.steps)
+
+    @property
+    def prompt(self):
+        return self.steps[self.index][1] if not self.finished else "Done"
+
+    def progress(self, now):
+        """
+        Returns how far the current step is, from 0 to 1.
+        """
+        if self.finished or self._step_start is None:
+            return 1.0 if self.finished else 0.0
+        return min((now - self._step_start) / self.steps[self.index][2], 1.0)
+
+    def update(self, features, now):
+        """
+        Adds one frame to the current step and moves on to the next step when its time is up.
+
+        Args:
+        features (np.array): The frame's features from `frame_features`, or None if no face was found.
+        now (float): Timestamp of the frame in seconds.
+        """
+        if self.finished:
+            return
+        if self._step_start is None:
+            self._step_start = now
+        elapsed = now - self._step_start
+        name, _, duration, feature, direction = self.steps[self.index]
+        if elapsed >= duration:
+            self.index += 1
+            self._step_start = now
+            return
+        if elapsed < self.settle_time or features is None:
+            return
+
+        if feature is None:
+            self.stats[name].update(features)
+            return
+        neutral = self.stats["neutral"]
+        if neutral.count < MIN_SAMPLES:
+            return
+        deviation = (features[feature] - neutral.mean[feature]) * direction
+        if deviation > GATE_SIGMAS * neutral.std[feature]:
+            self.stats[name].update(features[feature])
+
+    def _learned(self, name):
+        stats = self.stats[name]
+        return stats.mean if stats.count >= MIN_SAMPLES else None
+
+    def thresholds(self):
+        """
+        Derives the thresholds from the collected statistics.
+
+        Each threshold is placed between the neutral value and the gesture value, but never closer to neutral than
+        four standard deviations of its noise. Thresholds whose steps did not collect enough samples are left out.
+
+        Returns:
+        dict: Preferences section names mapped to the settings learned for them.
+        """
+        neutral = self.stats["neutral"]
+        if neutral.count < MIN_SAMPLES:
+            return {}
+        mean, margin = neutral.mean, 4 * neutral.std
+        gestures = {}
+
+        closed = [value for value in (self._learned("wink_left"), self._learned("wink_right")) if value is not None]
+        if closed:
+            open_ratio, closed_ratio = mean[[EAR_LEFT, EAR_RIGHT]].mean(), float(np.mean(closed))
+            gestures['blink_close_threshold'] = round(closed_ratio + 0.4 * (open_ratio - closed_ratio), 4)
+            gestures['blink_open_threshold'] = round(closed_ratio + 0.6 * (open_ratio - closed_ratio), 4)
+
+        opened = self._learned("mouth")
+        if opened is not None:
+            gestures['mouth_open_threshold'] = round(max((mean[MOUTH] + opened) / 2, mean[MOUTH] + margin[MOUTH]), 4)
+
+        # One tilt angle for both sides, halfway to the smaller of the two tilts the user made
+        tilts = [abs(value - mean[ROLL]) for value in (self._learned("tilt_back"), self._learned("tilt_forward"))
+                 if value is not None]
+        gestures['neutral_roll'] = round(float(mean[ROLL]), 2)
+        if tilts:
+            angle = max(min(tilts) / 2, margin[ROLL], 3.0)
+            gestures['tilt_angle'] = round(angle, 2)
+            gestures['tilt_release_angle'] = round(angle / 2, 2)
+
+        # The head counts as turned once it leaves the neutral pose by more than its usual wobble
+        wobble = np.abs(mean[[PITCH, YAW]]) + margin[[PITCH, YAW]]
+        gestures['face_direction_threshold'] = round(max(float(wobble.max()), 2.0), 2)
+
+        learned = {'Gestures': gestures}
+
+        sweep = self.stats["range"]
+        if sweep.count >= MIN_SAMPLES:
+            # Keep the screen edges a little inside the extremes so they can be reached comfortably
+            low = mean + 0.85 * (sweep.minimum - mean)
+            high = mean + 0.85 * (sweep.maximum - mean)
+            if high[YAW] - low[YAW] > 4 and high[PITCH] - low[PITCH] > 4:
+                learned['Cursor'] = {'yaw_min': round(low[YAW], 2), 'yaw_max': round(high[YAW], 2),
+                                     'pitch_min': round(low[PITCH], 2), 'pitch_max': round(high[PITCH], 2)}
+        return learned
+
+
+def draw_prompt(image, session, now):
+    """
+    Draws the current prompt and a progress bar for the current step.
+    """
+    img_h, img_w, _ = image.shape
+    cv2.putText(image, session.prompt, (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+    cv2.putText(image, f"Step {min(session.index + 1, len(session.steps))} of {len(session.steps)}",
+                (20, 75), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 1)
+    cv2.rectangle(image, (20, img_h - 40), (img_w - 20, img_h - 20), (255, 255, 255), 1)
+    filled = int(20 + (img_w - 40) * session.progress(now))
+    cv2.rectangle(image, (20, img_h - 40), (filled, img_h - 20), (69, 65, 182), -1)
+
+
+def main():
+    """
+    Runs the calibration session on the webcam and saves the learned thresholds.
+    """
+    cap = open_camera()
+    landmark_backend = create_backend(load_section('Tracking', BACKEND_DEFAULTS))
+    face = FaceLandmarks()
+    head_pose = HeadPoseEstimator()
+    session = CalibrationSession()
+
+    while cap.isOpened() and not session.finished:
+        success, image = cap.read()
+        if not success:
+            break
+        now = time.monotonic()
+        image = cv2.flip(image, 1)
+        img_h, img_w, _ = image.shape
+        faces = landmark_backend.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB), now)
+
+        features = None
+        if faces:
+            landmarks, _ = landmark_backend.landmarks(faces[0], face)
+            features = frame_features(landmarks, head_pose, img_w, img_h)
+        else:
+            head_pose.reset()
+        session.update(features, now)
+
+        draw_prompt(image, session, now)
+        cv2.imshow('Calibration', image)
+        if cv2.waitKey(1) & 0xFF == 27:
+            break
+
+    cap.release()
+    cv2.destroyAllWindows()
+
+    if not session.finished:
+        print("Calibration cancelled, nothing was saved.")
+        return
+
+    learned = session.thresholds()
+    for section, values in learned.items():
+        save_section(section, values)
+        for key, value in values.items():
+            print(f"{section}.{key} = {value}")
+    if not learned.get('Gestures'):
+        print("No face was seen during calibration, nothing was saved.")
+
+
+if __name__ == "__main__":
+    main()
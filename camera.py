@@ -0,0 +1,120 @@
+import threading
+
+import cv2
+
+from preferences import load_section, save_section
+
+# Defaults of the [Camera] section of user_preferences.ini
+CAMERA_DEFAULTS = {
+    'index': -1,  # Device index of the camera found on a previous run; -1 if none is known yet
+    'probe_count': 10,  # Number of device indices to probe when the known camera cannot be opened
+    'probe_timeout': 3.0,  # Seconds to wait for the probes before giving up
+    'width': 640,  # Requested capture width in pixels; 0 keeps the camera's default
+    'height': 480,  # Requested capture height in pixels; 0 keeps the camera's default
+    'fps': 30,  # Requested frame rate; 0 keeps the camera's default
+    'fourcc': 'MJPG',  # Requested pixel format, e.g. MJPG or YUYV; empty keeps the camera's default
+    'buffer_size': 1,  # Frames buffered by the driver; 1 keeps only the newest frame. 0 keeps the default
+}
+
+
+def probe_cameras(count, timeout):
+    """
+    Tries to open the first `count` camera indices in parallel and returns the lowest one that opens.
+
+    Args:
+    count (int): Number of device indices to try, starting at 0.
+    timeout (float): Seconds to wait for the probes. Devices still opening after that are ignored.
+
+    Returns:
+    tuple: The index and opened `cv2.VideoCapture` of the camera, or (None, None) if none opened in time.
+
+    Opening a device index that has no camera behind it can take seconds, so the indices are probed on separate
+    threads instead of one after the other. The wait ends as soon as a camera has opened and every lower index
+    has been ruled out. Every capture that ends up unused is released, including those of probes that only
+    finish after the timeout.
+    """
+    lock = threading.Lock()
+    opened = {}
+    finished = set()
+    done = threading.Event()
+    state = {'closed': False}
+
+    def probe(index):
+        capture = cv2.VideoCapture(index)
+        with lock:
+            finished.add(index)
+            if capture.isOpened() and not state['closed']:
+                opened[index] = capture
+            else:
+                capture.release()
+            if len(finished) == count or (opened and finished.issuperset(range(min(opened)))):
+                done.set()
+
+    for index in range(count):
+        threading.Thread(target=probe, args=(index,), name=f"camera-probe-{index}", daemon=True).start()
+    done.wait(timeout)
+
+    with lock:
+        state['closed'] = True
+        if not opened:
+            return None, None
+        index = min(opened)
+        for other, capture in opened.items():
+            if other != index:
+                capture.release()
+        return index, opened[index]
+
+
+def configure_capture(capture, settings):
+    """
+    Applies the requested pixel format, resolution, frame rate and buffer size to an opened capture.
+
+    Settings left at 0 (or an empty pixel format) keep the camera's default. Cameras silently ignore values they
+    do not support, so the capture's actual properties should be read back where they matter.
+    """
+    # The pixel format has to be set first, some drivers only offer higher resolutions in compressed formats
+    if settings['fourcc']:
+        capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*settings['fourcc'][:4].ljust(4)))
+    if settings['width']:
+        capture.set(cv2.CAP_PROP_FRAME_WIDTH, settings['width'])
+    if settings['height']:
+        capture.set(cv2.CAP_PROP_FRAME_HEIGHT, settings['height'])
+    if settings['fps']:
+        capture.set(cv2.CAP_PROP_FPS, settings['fps'])
+    if settings['buffer_size']:
+        capture.set(cv2.CAP_PROP_BUFFERSIZE, settings['buffer_size'])
+
+
+def open_camera(settings=None):
+    """
+    Opens and configures the webcam, preferring the device that worked on the previous run.
+
+    Args:
+    settings (dict, optional): The camera settings; loaded from the [Camera] preferences section if omitted.
+
+    Returns:
+    cv2.VideoCapture: The opened, configured capture.
+
+    The index of the camera that was found is remembered in the preferences file, so later starts open it
+    directly instead of probing every device again. Probing only happens when there is no remembered camera or
+    it can no longer be opened. Raises an exception if no camera is found.
+    """
+    if settings is None:
+        settings = load_section('Camera', CAMERA_DEFAULTS)
+
+    capture = None
+    if settings['index'] >= 0:
+        capture = cv2.VideoCapture(settings['index'])
+        if not capture.isOpened():
+            capture.release()
+            capture = None
+
+    if capture is None:
+        index, capture = probe_cameras(settings['probe_count'], settings['probe_timeout'])
+        if capture is None:  # No working camera was found
+            raise Exception("No available cameras found. Check your device connections.")
+        if index != settings['index']:
+            save_section('Camera', {'index': index})
+
+    configure_capture(capture, settings)
+    return capture
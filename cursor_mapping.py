@@ -0,0 +1,89 @@
+import numpy as np
+
+# Defaults of the [Cursor] section of user_preferences.ini
+CURSOR_DEFAULTS = {
+    'mapping': 'joystick',  # "joystick" moves the cursor while the head is turned, "absolute" points with it
+    'yaw_min': -20.0,  # Head turn (y angle) that reaches the left edge of the screen
+    'yaw_max': 20.0,  # Head turn (y angle) that reaches the right edge of the screen
+    'pitch_min': -12.0,  # Head tilt (x angle) that reaches the bottom edge of the screen
+    'pitch_max': 12.0,  # Head tilt (x angle) that reaches the top edge of the screen
+    'sync_interval': 1.0,  # Seconds between reads of the real cursor position
+}
+
+
+class AbsoluteCursorMapper:
+    """
+    Maps head angles straight to a point on the screen.
+
+    The calibrated yaw range is stretched over the width of the screen and the pitch range over its height, so
+    the user can reach any point with a single head movement instead of steering the cursor there. The linear
+    transform is computed once, leaving a multiply, an add and a clip per frame.
+
+    Args:
+    screen_size (tuple): Width and height of the screen in pixels.
+    yaw_range (tuple): The y angles that map to the left and right screen edges.
+    pitch_range (tuple): The x angles that map to the bottom and top screen edges.
+    """
+
+    def __init__(self, screen_size, yaw_range, pitch_range):
+        width, height = screen_size
+        yaw_min, yaw_max = yaw_range
+        pitch_min, pitch_max = pitch_range
+        # Looking up (a larger pitch) moves the cursor towards the top, where screen y is smallest
+        self._scale = np.array([(width - 1) / (yaw_max - yaw_min), -(height - 1) / (pitch_max - pitch_min)])
+        self._offset = np.array([-yaw_min * self._scale[0], (height - 1) - pitch_min * self._scale[1]])
+        self._limit = np.array([width - 1, height - 1])
+
+    @classmethod
+    def from_settings(cls, screen_size, settings):
+        """
+        Creates a mapper from the [Cursor] preferences section.
+        """
+        return cls(screen_size, (settings['yaw_min'], settings['yaw_max']),
+                   (settings['pitch_min'], settings['pitch_max']))
+
+    def map(self, x, y):
+        """
+        Returns the screen point for the head pose angles `x` (pitch) and `y` (yaw), as integer pixels.
+        """
+        point = np.clip(self._scale * (y, x) + self._offset, 0, self._limit)
+        return int(round(point[0])), int(round(point[1]))
+
+
+class CursorPosition:
+    """
+    Keeps track of the cursor position without asking the OS for it on every frame.
+
+    The position is read from the OS once every `sync_interval` seconds, and in between it is advanced by the
+    relative moves the tracker requests. This removes a blocking round trip to the windowing system from
+    almost every frame while still picking up moves made with a real mouse.
+
+    Args:
+    query (callable): Returns the real cursor position, normally `pyautogui.position`.
+    screen_size (tuple): Width and height of the screen in pixels.
+    sync_interval (float): Seconds between reads of the real cursor position.
+    """
+
+    def __init__(self, query, screen_size, sync_interval=1.0):
+        self.query = query
+        self.width, self.height = screen_size
+        self.sync_interval = sync_interval
+        self._position = None
+        self._last_sync = None
+
+    def get(self, now):
+        """
+        Returns the cursor position, syncing with the OS if the last sync is older than `sync_interval`.
+        """
+        if self._last_sync is None or now - self._last_sync >= self.sync_interval:
+            self._position = tuple(self.query())
+            self._last_sync = now
+        return self._position
+
+    def moved(self, dx, dy):
+        """
+        Records a relative move requested by the tracker.
+        """
+        if self._position is not None:
+            x, y = self._position
+            self._position = (min(max(x + dx, 0), self.width), min(max(y + dy, 0), self.height))
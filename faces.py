@@ -0,0 +1,105 @@
+POLICIES = ("largest", "central")
+
+
+def face_box(box, crop, img_w, img_h):
+    """
+    Maps the bounding box of a detected face from the mesh input to frame pixels.
+
+    Args:
+    box (tuple): (left, top, right, bottom) normalized to the mesh input, as returned by `LandmarkBackend.box`.
+    crop (tuple): The crop the face was found in, as returned by `FaceRegion.prepare`, or None for the full frame.
+    img_w (int): Width of the full frame in pixels.
+    img_h (int): Height of the full frame in pixels.
+
+    Returns:
+    tuple: (left, top, right, bottom) in pixels.
+    """
+    left, top, right, bottom = box
+    if crop is None:
+        return left * img_w, top * img_h, right * img_w, bottom * img_h
+    x, y, side = crop
+    return x + left * side, y + top * side, x + right * side, y + bottom * side
+
+
+def box_shift(box, previous):
+    """
+    Returns how far a box's centre is from a previous box's centre, in widths of the previous box.
+    """
+    dx = (box[0] + box[2] - previous[0] - previous[2]) / 2
+    dy = (box[1] + box[3] - previous[1] - previous[3]) / 2
+    return (dx * dx + dy * dy) ** 0.5 / max(previous[2] - previous[0], 1.0)
+
+
+class PrimaryFaceSelector:
+    """
+    Decides which of the detected faces controls the computer, so people passing behind the user cannot.
+
+    The selector locks onto one face and follows it from frame to frame: the face whose centre is nearest to
+    the primary face's previous position, at most `max_shift` face widths away, is the primary face again. Without a
+    lock, the largest face (closest to the camera) or the one nearest the centre of the frame is chosen,
+    depending on `policy`. When the primary face is missing, the other faces are ignored for `grace_time`
+    seconds, so a coworker does not take over while the user's face is briefly not detected. After that the lock
+    is dropped and the next face is chosen afresh.
+
+    Args:
+    policy (str): "largest" or "central".
+    max_shift (float): Distance in face widths a face can move between frames and still count as the same one.
+    grace_time (float): Seconds other faces are ignored after the primary face was last seen.
+    """
+
+    def __init__(self, policy="largest", max_shift=1.0, grace_time=0.5):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown primary face policy {policy!r}, expected one of {', '.join(POLICIES)}")
+        self.policy = policy
+        self.max_shift = max_shift
+        self.grace_time = grace_time
+        self.reset()
+
+    def reset(self):
+        self.box = None  # The primary face's box in the frame it was last seen in
+        self.last_seen = None
+        self.waiting = False  # Whether the last call ignored faces while waiting for the primary face
+        self.new_face = False  # Whether the last call chose a face instead of following the primary face
+
+    def select(self, boxes, img_w, img_h, now):
+        """
+        Picks the primary face among this frame's faces.
+
+        Args:
+        boxes (list): The (left, top, right, bottom) box of every detected face, see `face_box`.
+        img_w (int): Width of the frame in pixels.
+        img_h (int): Height of the frame in pixels.
+        now (float): Timestamp of the frame in seconds.
+
+        Returns:
+        int: The index of the primary face in `boxes`, or None if no face should be tracked in this frame.
+
+        Afterwards `waiting` tells whether faces were ignored because the primary face was seen less than
+        `grace_time` ago, and `new_face` whether the returned face was newly chosen rather than followed.
+        """
+        if self.last_seen is not None and now - self.last_seen >= self.grace_time:
+            self.reset()  # The primary face is gone, so it no longer holds the lock
+        self.waiting = self.new_face = False
+        index = None
+        if self.box is not None and boxes:
+            shifts = [box_shift(box, self.box) for box in boxes]
+            nearest = min(range(len(boxes)), key=shifts.__getitem__)
+            if shifts[nearest] <= self.max_shift:
+                index = nearest
+
+        if index is None:
+            if not boxes:
+                return None
+            if self.box is not None:
+                self.waiting = True
+                return None
+            self.new_face = True
+            if self.policy == "largest":
+                index = max(range(len(boxes)), key=lambda i: (boxes[i][2] - boxes[i][0]) * (boxes[i][3] - boxes[i][1]))
+            else:
+                index = min(range(len(boxes)), key=lambda i: ((boxes[i][0] + boxes[i][2]) / img_w - 1) ** 2 +
+                                                             ((boxes[i][1] + boxes[i][3]) / img_h - 1) ** 2)
+
+        self.box = boxes[index]
+        self.last_seen = now
+        return index
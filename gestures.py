@@ -0,0 +1,315 @@
+"""
+Declarative gesture rules: which facial gesture triggers which action, and when.
+
+Each frame's measurements are offered as named features, such as the head angles, each eye's openness or the
+gap between the lips. A rule fires its action when all of its conditions on these features are met:
+
+    [Gesture: toggle_mode]
+    when = mouth_gap > mouth_open_threshold
+    action = toggle_mode
+    cooldown = 1.0
+
+The built-in rules in DEFAULT_RULES can be changed or switched off, and new ones added, with `[Gesture: name]`
+sections in user_preferences.ini, so gestures can be remapped without editing code. A condition compares a
+feature with a number or with the name of a setting of the [Gestures] section, so rules follow the thresholds
+learned by calibration.py. A feature on its own, like `left_wink`, is true when it is not zero.
+
+Features are only computed when a rule that is active in the current mode reads them, and each at most once
+per frame, so a rule that is switched off or belongs to another mode costs nothing.
+"""
+import operator
+
+from blink import eye_aspect_ratios
+from landmarks import head_roll, mouth_opening
+from preferences import read_preferences, read_section
+
+MODES = ("MOUSE", "SCROLL")
+
+# Settings of a `[Gesture: name]` section
+RULE_DEFAULTS = {
+    'when': '',  # Conditions joined by "and", e.g. "mouth_gap > mouth_open_threshold"
+    'action': '',  # Action to trigger, see the actions passed to GestureEngine
+    'hold': 0.0,  # Seconds the conditions must be met before the action fires
+    'cooldown': 0.0,  # Seconds after firing before the rule (or its group) can fire again
+    'group': '',  # Rules in the same group share their cooldown
+    'repeat': True,  # Fire again after the cooldown while the conditions stay met; False waits for a release
+    'modes': 'MOUSE, SCROLL',  # Modes in which the rule is active
+    'enabled': True,
+}
+
+# The gestures of the tracker, as it has always behaved
+DEFAULT_RULES = {
+    'toggle_mode': dict(RULE_DEFAULTS, when='mouth_gap > mouth_open_threshold', action='toggle_mode', cooldown=1.0),
+    'left_click': dict(RULE_DEFAULTS, when='left_wink', action='left_click', modes='MOUSE'),
+    'right_click': dict(RULE_DEFAULTS, when='right_wink', action='right_click', modes='MOUSE'),
+    'back': dict(RULE_DEFAULTS, when='tilt_left', action='back', cooldown=1.5, group='navigate'),
+    'forward': dict(RULE_DEFAULTS, when='tilt_right', action='forward', cooldown=1.5, group='navigate'),
+}
+
+OPERATORS = {'<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge}
+
+
+class FrameFeatures:
+    """
+    The features of one frame, each computed on first access and then reused.
+
+    Args:
+    extractors (dict): Feature names mapped to functions that compute the feature from this object.
+    landmarks (np.array): The face's landmarks as a (478, 3) array of normalized coordinates.
+    img_w (int): The width of the frame in pixels.
+    img_h (int): The height of the frame in pixels.
+    angles (tuple): The smoothed head pose angles (x, y, z) in degrees.
+    now (float): The frame's timestamp in seconds.
+    """
+
+    def __init__(self, extractors, landmarks, img_w, img_h, angles, now):
+        self.extractors = extractors
+        self.landmarks = landmarks
+        self.img_w = img_w
+        self.img_h = img_h
+        self.angles = angles
+        self.now = now
+        self._values = {}
+
+    def __getitem__(self, name):
+        value = self._values.get(name)
+        if value is None:
+            value = self._values[name] = self.extractors[name](self)
+        return value
+
+
+# Features that only need the frame; eye openness is the eye aspect ratio of blink.py
+FEATURES = {
+    'pitch': lambda frame: frame.angles[0],
+    'yaw': lambda frame: frame.angles[1],
+    'roll': lambda frame: head_roll(frame.landmarks, frame.img_w, frame.img_h),
+    'eyes': lambda frame: eye_aspect_ratios(frame.landmarks),
+    'left_eye': lambda frame: float(frame['eyes'][0]),
+    'right_eye': lambda frame: float(frame['eyes'][1]),
+    'mouth_gap': lambda frame: mouth_opening(frame.landmarks),
+}
+
+# Features read from the eyelids, meaningless with a landmark backend that does not see them
+EYE_FEATURES = ('eyes', 'left_eye', 'right_eye', 'winks', 'left_wink', 'right_wink')
+
+
+def wink_features(blink_detector):
+    """
+    Returns the features reporting completed winks, detected by `blink_detector`.
+
+    The detector follows each eye over time, so it has to see every frame while a wink rule is active. Rule
+    conditions are therefore all evaluated, never cut short.
+    """
+    return {
+        'winks': lambda frame: blink_detector.update(frame.landmarks, frame.now),
+        'left_wink': lambda frame: float('left' in frame['winks']),
+        'right_wink': lambda frame: float('right' in frame['winks']),
+    }
+
+
+def tilt_features(tilt_detector):
+    """
+    Returns the features reporting sideways head tilts, recognised by `tilt_detector` from the head roll.
+    """
+    return {
+        'tilt': lambda frame: tilt_detector.update(frame['roll'], frame.now),
+        'tilt_left': lambda frame: float(frame['tilt'] < 0),
+        'tilt_right': lambda frame: float(frame['tilt'] > 0),
+    }
+
+
+def parse_condition(text, settings):
+    """
+    Parses a rule's conditions into (feature, comparison, threshold) triples.
+
+    Args:
+    text (str): Conditions joined by "and", each either "feature" or "feature <op> value", where value is a
+    number or the name of a setting in `settings`.
+    settings (dict): Named thresholds, normally the [Gestures] section.
+
+    Returns:
+    list: One (feature, comparison, threshold) triple per condition.
+
+    Raises:
+    ValueError: If a condition cannot be parsed.
+    """
+    conditions = []
+    for term in text.split(" and "):
+        parts = term.split()
+        if len(parts) == 1:
+            conditions.append((parts[0], operator.ne, 0.0))
+        elif len(parts) == 3 and parts[1] in OPERATORS:
+            feature, comparison, value = parts
+            if value in settings:
+                threshold = float(settings[value])
+            else:
+                try:
+                    threshold = float(value)
+                except ValueError:
+                    raise ValueError(f"unknown threshold {value!r}") from None
+            conditions.append((feature, OPERATORS[comparison], threshold))
+        else:
+            raise ValueError(f"cannot parse condition {term.strip()!r}")
+    return conditions
+
+
+class GestureRule:
+    """
+    One gesture rule with its debounce and cooldown state.
+
+    Args:
+    name (str): The rule's name.
+    conditions (list): (feature, comparison, threshold) triples that must all be met.
+    action (str): The action to trigger.
+    hold (float): Seconds the conditions must be met before the action fires.
+    cooldown (float): Seconds after firing before the rule can fire again.
+    group (str): Rules in the same group share their cooldown; empty for a cooldown of its own.
+    repeat (bool): Whether to fire again after the cooldown while the conditions stay met.
+    modes (tuple): The modes in which the rule is active.
+    """
+
+    def __init__(self, name, conditions, action, hold=0.0, cooldown=0.0, group='', repeat=True, modes=MODES):
+        self.name = name
+        self.conditions = conditions
+        self.action = action
+        self.hold = hold
+        self.cooldown = cooldown
+        self.group = group or name
+        self.repeat = repeat
+        self.modes = modes
+        self.reset()
+
+    def reset(self):
+        self._met_since = None  # When the conditions were first met in the current activation
+        self._fired = False  # Whether the rule fired during the current activation
+
+    def matches(self, features):
+        # Every condition is evaluated so stateful features see every frame
+        results = [compare(features[feature], threshold) for feature, compare, threshold in self.conditions]
+        return all(results)
+
+
+class GestureEngine:
+    """
+    Evaluates the gesture rules that are active in the current mode and dispatches the actions they trigger.
+
+    The rules active in each mode are sorted out once when the engine is built, so each frame only looks at
+    those. Actions fire in rule order through the single `dispatch` callable, which in the tracker hands mouse and
+    keyboard events to the actuator queue.
+
+    Args:
+    rules (list): The GestureRule objects to evaluate.
+    extractors (dict): Feature names mapped to the functions computing them, see FrameFeatures.
+    dispatch (callable): Called with the action name of every rule that fires.
+    """
+
+    def __init__(self, rules, extractors, dispatch):
+        self.rules = rules
+        self.extractors = extractors
+        self.dispatch = dispatch
+        self.active = {mode: [rule for rule in rules if mode in rule.modes] for mode in MODES}
+        self._cooldown_until = {}  # Group name mapped to the time its rules may fire again
+        self._mode = None
+
+    @classmethod
+    def from_settings(cls, settings, extractors, actions, dispatch):
+        """
+        Builds the engine from the built-in rules and the `[Gesture: name]` sections of the preferences file.
+
+        Args:
+        settings (dict): Named thresholds the conditions may refer to, normally the [Gestures] section.
+        extractors (dict): The features rules may read.
+        actions (collection): The action names rules may trigger.
+        dispatch (callable): Called with the action name of every rule that fires.
+
+        Rules that refer to an unknown feature, action or mode, or whose conditions cannot be parsed, are reported
+        and left out, so a typo in the preferences file disables one gesture rather than the tracker. The rule name
+        is whatever follows "Gesture:", so `[Gesture:blink]` and `[Gesture: blink]` both define the rule `blink`.
+        """
+        config = read_preferences()
+        # Rule names mapped to the section that configures them, read once from the same parsed file
+        sections = {name: f"Gesture: {name}" for name in DEFAULT_RULES}
+        for section in config.sections():
+            if section.startswith("Gesture:"):
+                sections[section.split(":", 1)[1].strip()] = section
+
+        rules = []
+        for name, section in sections.items():
+            try:
+                values = read_section(config, section, DEFAULT_RULES.get(name, RULE_DEFAULTS))
+                if not values['enabled']:
+                    continue
+                conditions = parse_condition(values['when'], settings)
+                for feature, _, _ in conditions:
+                    if feature not in extractors:
+                        raise ValueError(f"unknown feature {feature!r}")
+                if values['action'] not in actions:
+                    raise ValueError(f"unknown action {values['action']!r}")
+                modes = tuple(mode.strip().upper() for mode in values['modes'].split(",") if mode.strip())
+                for mode in modes:
+                    if mode not in MODES:
+                        raise ValueError(f"unknown mode {mode!r}")
+            except ValueError as e:
+                print(f"Ignoring gesture rule {name!r}: {e}")
+                continue
+            rules.append(GestureRule(name, conditions, values['action'], values['hold'], values['cooldown'],
+                                     values['group'], values['repeat'], modes))
+        return cls(rules, extractors, dispatch)
+
+    def disable_features(self, names, reason):
+        """
+        Leaves out the rules that read any of the features `names`, reporting each one with `reason`.
+        """
+        kept = []
+        for rule in self.rules:
+            if any(feature in names for feature, _, _ in rule.conditions):
+                print(f"Ignoring gesture rule {rule.name!r}: {reason}")
+            else:
+                kept.append(rule)
+        self.rules = kept
+        self.active = {mode: [rule for rule in self.rules if mode in rule.modes] for mode in MODES}
+
+    def features(self, landmarks, img_w, img_h, angles, now):
+        """
+        Returns the lazily computed features of one frame.
+        """
+        return FrameFeatures(self.extractors, landmarks, img_w, img_h, angles, now)
+
+    def update(self, features, mode):
+        """
+        Evaluates the rules active in `mode` on one frame and dispatches the actions that fire.
+
+        Args:
+        features (FrameFeatures): The frame's features.
+        mode (str): The current mode, "MOUSE" or "SCROLL".
+
+        Returns:
+        list: The names of the actions dispatched in this frame.
+        """
+        if mode != self._mode:
+            self.reset()  # Conditions met before the mode changed do not count towards a hold
+            self._mode = mode
+        now = features.now
+        fired = []
+        for rule in self.active[mode]:
+            if not rule.matches(features):
+                rule.reset()
+                continue
+            if rule._met_since is None:
+                rule._met_since = now
+            if now - rule._met_since < rule.hold or (rule._fired and not rule.repeat):
+                continue
+            if now < self._cooldown_until.get(rule.group, float("-inf")):
+                continue
+            rule._fired = True
+            self._cooldown_until[rule.group] = now + rule.cooldown
+            self.dispatch(rule.action)
+            fired.append(rule.action)
+        return fired
+
+    def reset(self):
+        """
+        Forgets conditions in progress, e.g. when the face is lost. Cooldowns keep running.
+        """
+        for rule in self.rules:
+            rule.reset()
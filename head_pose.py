@@ -0,0 +1,106 @@
+import math
+
+import cv2
+import numpy as np
+
+from landmarks import POSE_INDICES
+
+
+class HeadPoseEstimator:
+    """
+    Estimates the head pose from the pose landmarks of consecutive frames.
+
+    The camera intrinsics only depend on the frame size, so the camera matrix and distortion coefficients are
+    built once and reused until the frame size changes. Each solve starts from the previous frame's rotation and
+    translation (`useExtrinsicGuess`), which lets the iterative solver converge in a few steps because the head
+    moves very little between frames. The Euler angles are read straight from the rotation matrix instead of
+    going through `RQDecomp3x3`.
+
+    Call `reset` whenever the face is lost so the next solve does not start from a stale pose.
+    """
+
+    def __init__(self):
+        self._frame_size = None
+        self.cam_matrix = None
+        self.dist_matrix = np.zeros((4, 1), dtype=np.float64)
+        self.rot_vec = None
+        self.trans_vec = None
+
+    def _update_intrinsics(self, img_w, img_h):
+        if self._frame_size != (img_w, img_h):
+            # A focal length of one frame width and the principal point in the centre of the frame
+            focal_length = 1 * img_w
+            self.cam_matrix = np.array([[focal_length, 0, img_w / 2],
+                                        [0, focal_length, img_h / 2],
+                                        [0, 0, 1]], dtype=np.float64)
+            self._frame_size = (img_w, img_h)
+            self.reset()
+
+    def reset(self):
+        """
+        Forgets the previous pose so the next solve starts from scratch.
+        """
+        self.rot_vec = None
+        self.trans_vec = None
+
+    def estimate(self, face_2d, face_3d, img_w, img_h):
+        """
+        Solves the head pose for one frame.
+
+        Args:
+        face_2d (np.array): The (N, 2) pixel coordinates of the pose landmarks, as float64.
+        face_3d (np.array): The (N, 3) model coordinates of the same landmarks, as float64.
+        img_w (int): Width of the frame in pixels.
+        img_h (int): Height of the frame in pixels.
+
+        Returns:
+        tuple: The rotation angles (x, y, z) about each axis in degrees, or None if the pose could not be solved.
+        """
+        self._update_intrinsics(img_w, img_h)
+
+        if self.rot_vec is None:
+            success, self.rot_vec, self.trans_vec = cv2.solvePnP(face_3d, face_2d, self.cam_matrix,
+                                                                 self.dist_matrix)
+        else:
+            success, self.rot_vec, self.trans_vec = cv2.solvePnP(face_3d, face_2d, self.cam_matrix,
+                                                                 self.dist_matrix, self.rot_vec, self.trans_vec,
+                                                                 useExtrinsicGuess=True)
+        if not success:
+            self.reset()
+            return None
+
+        return self.euler_angles(cv2.Rodrigues(self.rot_vec)[0])
+
+    def estimate_landmarks(self, landmarks, img_w, img_h):
+        """
+        Solves the head pose from a face's full set of landmarks.
+
+        Args:
+        landmarks (np.array): The face's landmarks as a (478, 3) array of normalized coordinates.
+        img_w (int): Width of the frame in pixels.
+        img_h (int): Height of the frame in pixels.
+
+        Returns:
+        tuple: The rotation angles (x, y, z) about each axis in degrees, or None if the pose could not be solved.
+        """
+        # Get the 2D pixel coordinates and the 3D coordinates of the pose landmarks
+        pose = landmarks[POSE_INDICES]
+        face_2d = (pose[:, :2] * (img_w, img_h)).astype(np.int32).astype(np.float64)
+        face_3d = np.column_stack((face_2d, pose[:, 2]))
+        return self.estimate(face_2d, face_3d, img_w, img_h)
+
+    @staticmethod
+    def euler_angles(rmat):
+        """
+        Decomposes a rotation matrix into rotations about the x, y and z axes, matching `cv2.RQDecomp3x3`.
+
+        Args:
+        rmat (np.array): A 3x3 rotation matrix.
+
+        Returns:
+        tuple: The angles (x, y, z) in degrees.
+        """
+        x = math.degrees(math.atan2(rmat[2, 1], rmat[2, 2]))
+        y = math.degrees(math.asin(max(-1.0, min(1.0, -rmat[2, 0]))))
+        z = math.degrees(math.atan2(rmat[1, 0], rmat[0, 0]))
+        return x, y, z
@@ -1,31 +1,38 @@
 # Made by Jacob Davis
 import configparser
-import os
 import sys
 import subprocess
+import time
+from functools import lru_cache
 
 from PIL import Image, ImageTk
 from customtkinter import *
-from pystray import MenuItem as item, Icon as tray_icon
+
+from preferences import PREFERENCES_FILE, load_section, resource, save_section
+from status import StatusListener
+from supervisor import TrackerSupervisor
 
 
 # ~~~~~~~~~~~~~~~~~~~ Handle Script ~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
-def start_other_script():
+def start_other_script(script_name):
     """
     Attempts to start an external Python script located in a specified directory.
     If successful, the script is launched as a separate process, allowing it to run independently.
     The main application window is minimized to the system tray upon launching the script.
 
     This function uses the 'resource' function to resolve the path to the script, then attempts to
-    execute it as a new process. If there are any issues in starting the script, it catches the exception
-    and prints an error message. Regardless of success or failure in launching the script,
-    the application window is minimized.
+    execute it as a new process with the interpreter running the launcher. If there are any issues in starting
+    the script, it catches the exception and prints an error message. Regardless of success or failure in
+    launching the script, the application window is minimized.
+
+    Args:
+    script_name (str): The script to launch, e.g. 'calibration.py'.
     """
     try:
         # Determine the full path to the script that needs to be launched
-        script_path = resource('Scroll.py')
+        script_path = resource(script_name)
         # Launch the script as a separate process to allow it to run independently
-        subprocess.Popen(['python', script_path], start_new_session=True)
+        subprocess.Popen([sys.executable, script_path], start_new_session=True)
     except Exception as e:
         # Log an error message if the script fails to start
         print(f"Failed to start script: {e}")
@@ -34,28 +41,101 @@ def start_other_script():
     app.iconify()
 
 
-# ~~~~~~~~~~~~~~~~~~~ Configuration Handling ~~~~~~~~~~~~~~~~~~~ #
-def resource(relative_path):
+def start_tracking():
     """
-    Resolves the absolute path for a given resource, accommodating both development and deployment environments.
+    Starts tracking in the tracker worker and minimizes the main window.
 
-    Args:
-    relative_path (str): The relative path to the resource.
+    The worker was started paused when the launcher opened, so tracking starts as soon as the camera is open.
+    """
+    tracker.start()
+    app.iconify()
+
+
+def stop_tracking():
+    """
+    Stops tracking but keeps the worker loaded for the next Start.
+    """
+    tracker.stop()
+
+
+def calibrate():
+    """
+    Stops tracking, since the calibration needs the camera, and starts the calibration session once the tracker
+    has released the camera.
+    """
+    if not tracker.stop(timeout=CAMERA_RELEASE_TIMEOUT):
+        print(f"The tracker did not release the camera within {CAMERA_RELEASE_TIMEOUT:.0f} s, closing it")
+        tracker.shutdown()
+    start_other_script('calibration.py')
+
+
+def change_landmark_backend(backend):
+    """
+    Saves the chosen landmark backend and reloads the tracker worker, which only builds its backend when it starts.
+    """
+    save_section('Tracking', {'backend': backend})
+    tracker.reload()
 
-    Returns:
-    str: The absolute path to the resource.
 
-    This function identifies the base path of the application, accounting for whether the application
-    is running in a development environment or as a bundled application (e.g., using PyInstaller).
-    It then returns the absolute path by combining the base path with the provided relative path.
+def supervise_tracker():
     """
-    # Identify the base path, accommodating situations where the application is frozen (bundled)
-    base_path = getattr(
-        sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
-    # Combine the base path with the relative path to form the absolute path
-    return os.path.join(base_path, relative_path)
+    Restarts the tracker worker if it has crashed and schedules the next check.
+    """
+    tracker.supervise()
+    app.after(TRACKER_CHECK, supervise_tracker)
+
+
+def close_app():
+    """
+    Ends the tracker worker together with the launcher.
+    """
+    tracker.shutdown()
+    app.destroy()
+
 
+# ~~~~~~~~~~~~~~~~~~~ Live Status ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+# Receives the statistics the tracker sends while it runs
+status_listener = StatusListener()
 
+# Statistics shown on the dashboard: message key, label and format
+STATUS_FIELDS = [
+    ("fps", "Frame Rate", "{:.1f} FPS"),
+    ("latency_ms", "Latency", "{:.0f} ms"),
+    ("face_ratio", "Face Detected", "{:.0%}"),
+    ("clicks", "Clicks", "{}"),
+    ("toggles", "Mode Toggles", "{}"),
+    ("mode", "Mode", "{}"),
+]
+STATUS_TIMEOUT = 3.0  # Seconds without a message after which the tracker is shown as not running
+STATUS_REFRESH = 500  # Milliseconds between dashboard refreshes
+
+status_labels = {}  # Value label of each statistic, rebuilt with the dashboard
+
+TRACKER_CHECK = 1000  # Milliseconds between checks that the tracker worker is still running
+CAMERA_RELEASE_TIMEOUT = 5.0  # Seconds to wait for the tracker to release the camera before calibrating
+
+
+def refresh_dashboard():
+    """
+    Shows the newest statistics from the tracker on the dashboard and schedules the next refresh.
+
+    This runs on the Tk main loop every STATUS_REFRESH milliseconds through `after`. Reading the status socket
+    never blocks, so the interface stays responsive whether or not the tracker is running.
+    """
+    status_listener.poll()
+    message = status_listener.last_message
+    running = (status_listener.last_time is not None
+               and time.monotonic() - status_listener.last_time < STATUS_TIMEOUT)
+    for key, _, value_format in STATUS_FIELDS:
+        label = status_labels.get(key)
+        if label is not None and label.winfo_exists():
+            label.configure(text=value_format.format(message[key]) if running else "-")
+    if "state" in status_labels and status_labels["state"].winfo_exists():
+        status_labels["state"].configure(text="Running" if running else "Not running")
+    app.after(STATUS_REFRESH, refresh_dashboard)
+
+
+# ~~~~~~~~~~~~~~~~~~~ Configuration Handling ~~~~~~~~~~~~~~~~~~~ #
 def save_preferences(theme=None, ui_scale=None):
     """
     Saves user preferences such as theme and UI scale to a configuration file for future sessions.
@@ -69,7 +149,7 @@ def save_preferences(theme=None, ui_scale=None):
     back to the file, ensuring user settings are persisted across sessions.
     """
     config = configparser.ConfigParser()
-    config.read(resource('user_preferences.ini'))  # Load the existing configuration file
+    config.read(resource(PREFERENCES_FILE))  # Load the existing configuration file
 
     # Create a new section if it doesn't exist
     if not config.has_section('Preferences'):
@@ -84,7 +164,7 @@ def save_preferences(theme=None, ui_scale=None):
         config.set('Preferences', 'UI_Scale', str(ui_scale))
 
     # Save the updated configuration back to file
-    with open(resource('user_preferences.ini'), 'w') as configfile:
+    with open(resource(PREFERENCES_FILE), 'w') as configfile:
         config.write(configfile)
 
 
@@ -100,7 +180,7 @@ def load_preferences():
     ensuring the application has sensible defaults.
     """
     config = configparser.ConfigParser()
-    config.read(resource('user_preferences.ini'))
+    config.read(resource(PREFERENCES_FILE))
     # Retrieve the theme setting, defaulting to 'Dark' if not specified
     theme = config.get('Preferences', 'Theme', fallback='Dark')
     # Retrieve the UI scale setting, defaulting to 1.0 if not specified
@@ -156,6 +236,9 @@ def initialize_app():
 
 # ~~~~~~~~~~~~~~~~~~~ Frame Setup ~~~~~~~~~~~~~~~~~~~ #
 def show_frame(frame_to_show):
+    # The instruction images are only decoded the first time the instructions are shown
+    if frame_to_show is instruction_frame and not instruction_frame.winfo_children():
+        setup_instruction_content()
     # Hide all currently displayed frames
     dashboard_frame.pack_forget()
     instruction_frame.pack_forget()
@@ -234,9 +317,8 @@ def update_ui_elements():
     clear_frame(instruction_frame)
     clear_frame(settings_frame)
 
-    # Repopulate the frames with updated content
+    # Repopulate the frames with updated content; the instructions are rebuilt when they are next shown
     setup_dashboard_content()
-    setup_instruction_content()
     setup_settings_content()
     # Additional frames or content can be updated here as necessary
 
@@ -347,10 +429,25 @@ def setup_dashboard_content():
                                  wraplength=650, justify="left")
     description_label.pack(pady=10)
 
-    # Button to initiate a key application function
+    # Live statistics of the running tracker, filled in by refresh_dashboard
+    global status_labels
+    status_labels = {}
+    status_frame = CTkFrame(master=dashboard_frame, corner_radius=10)
+    status_frame.pack(pady=10)
+    rows = [("state", "Tracker")] + [(key, text) for key, text, _ in STATUS_FIELDS]
+    for row, (key, text) in enumerate(rows):
+        CTkLabel(master=status_frame, text=f"{text}:", font=("Arial", info_font_size),
+                 text_color="#6862E4").grid(row=row, column=0, padx=(20, 10), pady=2, sticky="w")
+        status_labels[key] = CTkLabel(master=status_frame, text="-", font=("Arial", info_font_size))
+        status_labels[key].grid(row=row, column=1, padx=(10, 20), pady=2, sticky="e")
+
+    # Buttons to start and stop tracking
     start_button = CTkButton(master=dashboard_frame, text="Start", fg_color="#4541B6",
-                             command=start_other_script)
-    start_button.pack(pady=(10, 20))
+                             command=start_tracking)
+    start_button.pack(pady=(10, 5))
+    stop_button = CTkButton(master=dashboard_frame, text="Stop", fg_color="#4541B6",
+                            command=stop_tracking)
+    stop_button.pack(pady=(5, 20))
 
 
 # ~~~~~~~~~~~~~~~~~~~ Instructions Content ~~~~~~~~~~~~~~~~~~~ #
@@ -377,12 +474,8 @@ def image_and_labels(labels, images):
                               justify="left")
         text_label.pack(pady=(10, 0))  # Add padding above the label
 
-        # Load the image from the specified path, resize it, and ensure high quality with LANCZOS filtering
-        original_image = Image.open(resource(img_path))
-        resized_image = original_image.resize(standard_size, Image.LANCZOS)
-
         # Create a photo image object to be used with CustomTkinter
-        photo = ImageTk.PhotoImage(image=resized_image)
+        photo = ImageTk.PhotoImage(image=load_instruction_image(img_path, standard_size))
 
         # Create and pack the image label with the image
         image_label = CTkLabel(master=instruction_frame, image=photo, text=" ")
@@ -390,13 +483,29 @@ def image_and_labels(labels, images):
         image_label.pack(pady=(0, 10))  # Add padding below the image
 
 
+@lru_cache(maxsize=None)
+def load_instruction_image(img_path, size):
+    """
+    Loads an instruction image and resizes it with high quality LANCZOS filtering.
+
+    Args:
+    img_path (str): The image file, relative to the application directory.
+    size (tuple): The (width, height) to resize the image to.
+
+    Returns:
+    PIL.Image.Image: The resized image, kept so the instructions can be rebuilt without decoding it again.
+    """
+    return Image.open(resource(img_path)).resize(size, Image.LANCZOS)
+
+
 def setup_instruction_content():
     """
     Initializes and populates the instruction frame with structured content, including steps and visuals.
 
     This function sets up the instructional content for the application, detailing the operational steps
     and associated imagery. It organizes content into a coherent sequence of instructions and images that
-    guide the user through the application's usage.
+    guide the user through the application's usage. It runs when the instructions are first shown rather than at
+    start-up, so the launcher window does not wait for the instruction images to be decoded.
     """
     global title_font_size, info_font_size, heading_font_size  # Access global variables for font sizes
     # Add a title label to the instruction frame
@@ -478,16 +587,47 @@ def setup_settings_content():
                                       command=lambda: apply_new_ui_scale(ui_scale_slider.get()))
     apply_ui_scale_button.pack(pady=(10, 20))
 
+    # Add a label and switch for running the tracker without its camera preview window
+    CTkLabel(master=settings_left_column, text="Headless Mode:", font=("Arial", info_font_size),
+             text_color="#6862E4").pack(pady=(10, 20))
+    headless_switch = CTkSwitch(master=settings_right_column, text="",
+                                command=lambda: save_section('Tracking', {'headless': bool(headless_switch.get())}))
+    if load_section('Tracking', {'headless': False})['headless']:
+        headless_switch.select()
+    headless_switch.pack(pady=(10, 20))
+
+    # Add a label and menu for choosing the model that finds the face landmarks, see backends.py
+    CTkLabel(master=settings_left_column, text="Landmark Backend:", font=("Arial", info_font_size),
+             text_color="#6862E4").pack(pady=(10, 20))
+    backend_menu = CTkOptionMenu(master=settings_right_column,
+                                 values=["auto", "face_mesh", "face_landmarker", "opencv"], fg_color="#4541B6",
+                                 command=change_landmark_backend)
+    backend_menu.set(load_section('Tracking', {'backend': 'auto'})['backend'])
+    backend_menu.pack(pady=(10, 20))
+
+    # Add a label and button for learning the gesture thresholds of the current user
+    CTkLabel(master=settings_left_column, text="Calibrate Gestures:", font=("Arial", info_font_size),
+             text_color="#6862E4").pack(pady=(10, 20))
+    CTkButton(master=settings_right_column, text="Calibrate", fg_color="#4541B6",
+              command=calibrate).pack(pady=(10, 20))
+
 
 # ~~~~~~~~~~~~~~~~~~~ Main ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
 if __name__ == "__main__":
+    # One paused tracker worker, started with the launcher so Start does not wait for the imports and the model
+    tracker = TrackerSupervisor(resource('Scroll.py'), ['--status-port', str(status_listener.port)])
+    tracker.prewarm()  # Load the tracker in the background while the launcher builds its window
+
     # Execute the application setup functions when the script is run directly
     initialize_app()  # Initialize the main application window and settings
     setup_sidebar()  # Configure the sidebar with navigation buttons and logos
     setup_main_view()  # Prepare the main view area with various frames for content
     setup_sidebar_buttons()  # Populate the sidebar with buttons linking to different frames
     setup_dashboard_content()  # Set up initial content within the dashboard frame
-    setup_instruction_content()  # Prepare the instruction frame with step-by-step guides
     setup_settings_content()  # Load the settings frame with configurable options
+    app.after(STATUS_REFRESH, refresh_dashboard)  # Start showing the tracker's live statistics
+
+    app.after(TRACKER_CHECK, supervise_tracker)
+    app.protocol("WM_DELETE_WINDOW", close_app)  # Do not leave the worker running after the window is closed
 
     app.mainloop()  # Start the main loop to keep the application running
@@ -0,0 +1,122 @@
+import time
+
+import cv2
+import numpy as np
+
+# Size of the thumbnails compared to notice movement while idle, and of the pixel sample they average. Sampling
+# first keeps the thumbnail at about a tenth of a millisecond for an HD frame, rather than over one to average it.
+THUMBNAIL_SIZE = (32, 24)
+SAMPLE_SIZE = (160, 120)
+
+
+class IdleMonitor:
+    """
+    Puts the tracker into a low-power idle state while nobody is in front of the camera.
+
+    The tracker starts out active and processes every frame. Once no face has been seen for `timeout` seconds it
+    goes idle: only one frame every `probe_interval` seconds is processed, downscaled so its longer side is
+    `probe_size` pixels, which is enough to notice a face coming back. Every skipped frame is still shrunk to a
+    tiny grayscale thumbnail and compared with the one of the last probe, and when the picture has changed by
+    more than `motion_threshold` the frame is probed right away, so someone sitting down is found on the frame
+    they appear in rather than up to `probe_interval` later. As soon as a probe finds a face the tracker is active
+    again and the very next frame is processed at full rate.
+
+    Wall-clock and CPU time are accumulated separately for both states, so `report` can estimate how much CPU
+    time the idle state saved compared to staying active.
+
+    Args:
+    timeout (float): Seconds without a face before going idle.
+    probe_interval (float): Seconds between processed frames while idle.
+    probe_size (int): Longest side in pixels of the frames processed while idle.
+    motion_threshold (float): Mean change in gray levels (0 to 255) of the thumbnail that triggers a probe.
+    """
+
+    def __init__(self, timeout=10.0, probe_interval=0.5, probe_size=320, motion_threshold=6.0):
+        self.timeout = timeout
+        self.probe_interval = probe_interval
+        self.probe_size = probe_size
+        self.motion_threshold = motion_threshold
+        self.idle = False
+        self._last_face = None
+        self._last_probe = None
+        self._probe_thumbnail = None  # The thumbnail of the last frame probed while idle
+        self._state_start = None
+        self._cpu_start = None
+        self.seconds = {False: 0.0, True: 0.0}  # Wall-clock time spent active (False) and idle (True)
+        self.cpu_seconds = {False: 0.0, True: 0.0}  # Process CPU time spent in each state
+
+    def should_process(self, now, frame=None):
+        """
+        Decides whether the frame captured at `now` should be processed.
+
+        Args:
+        now (float): The frame's capture time in seconds.
+        frame (np.array, optional): The BGR frame, compared with the last probe to probe early on movement.
+        Without it, frames are only probed every `probe_interval` seconds while idle.
+        """
+        if self._state_start is None:
+            self._state_start, self._cpu_start, self._last_face = now, time.process_time(), now
+        if not self.idle:
+            return True
+        thumbnail = None
+        if frame is not None:
+            sample = cv2.resize(frame, SAMPLE_SIZE, interpolation=cv2.INTER_NEAREST)
+            thumbnail = cv2.cvtColor(cv2.resize(sample, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA),
+                                     cv2.COLOR_BGR2GRAY).astype(np.int16)
+        if (self._last_probe is None or now - self._last_probe >= self.probe_interval or
+                self._moved(thumbnail)):
+            self._last_probe = now
+            self._probe_thumbnail = thumbnail
+            return True
+        return False
+
+    def _moved(self, thumbnail):
+        if thumbnail is None or self._probe_thumbnail is None:
+            return False
+        return float(np.mean(np.abs(thumbnail - self._probe_thumbnail))) > self.motion_threshold
+
+    def update(self, face_found, now):
+        """
+        Records whether the frame processed at `now` contained a face, switching state if needed.
+        """
+        if face_found:
+            self._last_face = now
+            if self.idle:
+                self._switch(False, now)
+        elif not self.idle and now - self._last_face >= self.timeout:
+            self._switch(True, now)
+
+    def _switch(self, idle, now):
+        cpu_now = time.process_time()
+        self.seconds[self.idle] += now - self._state_start
+        self.cpu_seconds[self.idle] += cpu_now - self._cpu_start
+        self._state_start, self._cpu_start = now, cpu_now
+        self.idle = idle
+        self._last_probe = None
+        self._probe_thumbnail = None
+
+    def report(self, now):
+        """
+        Summarizes the time spent in each state and the CPU time the idle state saved.
+
+        Args:
+        now (float): The current time, on the same clock as the timestamps given to `update`.
+
+        Returns:
+        dict: Seconds and CPU seconds spent active and idle, and `saved_cpu_seconds`: the CPU time the idle
+        period would have cost at the active CPU rate, minus what it actually cost.
+        """
+        seconds = dict(self.seconds)
+        cpu_seconds = dict(self.cpu_seconds)
+        if self._state_start is not None:
+            seconds[self.idle] += now - self._state_start
+            cpu_seconds[self.idle] += time.process_time() - self._cpu_start
+
+        active_rate = cpu_seconds[False] / seconds[False] if seconds[False] else 0.0
+        return {
+            "active_seconds": seconds[False],
+            "idle_seconds": seconds[True],
+            "active_cpu_seconds": cpu_seconds[False],
+            "idle_cpu_seconds": cpu_seconds[True],
+            "saved_cpu_seconds": max(active_rate * seconds[True] - cpu_seconds[True], 0.0),
+        }
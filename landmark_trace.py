@@ -0,0 +1,195 @@
+"""
+Compact binary landmark trace format.
+
+A trace file starts with a fixed-size header followed by one fixed-size record per frame, holding the frame's
+timestamp, its 478 x 3 float32 landmarks, the head pose angles, the interaction mode and the actions requested
+during that frame. Because every record has the same size, the file can be appended to while recording and
+memory-mapped as a NumPy structured array for playback, so even a session of several hours is read lazily
+instead of being loaded into RAM.
+"""
+import os
+import struct
+
+import numpy as np
+
+from landmarks import NUM_LANDMARKS
+
+MAGIC = b"EBTRACE1"
+VERSION = 1
+
+# Magic, version, frame width, frame height, landmarks per frame, record size; padded to HEADER_SIZE bytes
+HEADER_FORMAT = "<8sIIIII"
+HEADER_SIZE = 64
+
+# Bit flags stored in the `actions` field of a record
+ACTION_MOVE = 1
+ACTION_SCROLL = 2
+ACTION_LEFT_CLICK = 4
+ACTION_RIGHT_CLICK = 8
+ACTION_BACK = 16
+ACTION_FORWARD = 32
+ACTION_MOVE_TO = 64
+
+# Values stored in the `mode` field of a record
+MODES = ("MOUSE", "SCROLL")
+
+RECORD_DTYPE = np.dtype([
+    ("time", "<f8"),  # Seconds since the epoch
+    ("face", "u1"),  # 1 if a face was detected, in which case `landmarks` and `pose` are valid
+    ("mode", "u1"),  # Index into MODES
+    ("actions", "<u2"),  # ACTION_* flags requested during the frame
+    ("pose", "<f4", (3,)),  # Head pose angles x, y, z in degrees
+    ("move", "<f4", (2,)),  # Sum of the relative moves, or the last absolute target, requested during the frame
+    ("scroll", "<f4"),  # Sum of the scroll amounts requested during the frame
+    ("landmarks", "<f4", (NUM_LANDMARKS, 3)),  # Normalized landmark coordinates
+])
+
+
+def _read_header(trace_file):
+    magic, version, width, height, landmarks, record_size = struct.unpack(
+        HEADER_FORMAT, trace_file.read(struct.calcsize(HEADER_FORMAT)))
+    if magic != MAGIC:
+        raise ValueError("Not a landmark trace file")
+    if version != VERSION or landmarks != NUM_LANDMARKS or record_size != RECORD_DTYPE.itemsize:
+        raise ValueError(f"Unsupported landmark trace version {version}")
+    return width, height
+
+
+class TraceWriter:
+    """
+    Appends frames to a landmark trace file.
+
+    Records are collected in a preallocated chunk of `chunk_size` frames and written with a single call when the
+    chunk is full, so recording costs one small copy per frame. Opening an existing trace appends to it; a record
+    left incomplete by an interrupted recording is cut off first.
+
+    Args:
+    path (str): The trace file to create or append to.
+    frame_size (tuple): Width and height of the camera frames the landmarks are normalized to.
+    chunk_size (int): Number of frames buffered in memory between writes.
+    """
+
+    def __init__(self, path, frame_size, chunk_size=256):
+        self.frame_size = frame_size
+        if os.path.exists(path) and os.path.getsize(path) >= HEADER_SIZE:
+            with open(path, "rb") as trace_file:
+                width, height = _read_header(trace_file)
+            if (width, height) != tuple(frame_size):
+                raise ValueError(f"Trace {path} was recorded at {width}x{height}, not {frame_size[0]}x{frame_size[1]}")
+            complete = (os.path.getsize(path) - HEADER_SIZE) // RECORD_DTYPE.itemsize
+            self._file = open(path, "r+b")
+            self._file.truncate(HEADER_SIZE + complete * RECORD_DTYPE.itemsize)
+            self._file.seek(0, os.SEEK_END)
+        else:
+            self._file = open(path, "wb")
+            header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, frame_size[0], frame_size[1],
+                                 NUM_LANDMARKS, RECORD_DTYPE.itemsize)
+            self._file.write(header.ljust(HEADER_SIZE, b"\0"))
+
+        self._chunk = np.zeros(chunk_size, dtype=RECORD_DTYPE)
+        self._count = 0
+        self._actions = 0
+        self._move = [0.0, 0.0]
+        self._scroll = 0.0
+
+    def note_action(self, command):
+        """
+        Records an actuator command against the frame currently being built.
+
+        Meant to be installed as the actuator's `observer`.
+
+        Args:
+        command (tuple): The command as queued by the actuator, e.g. `("move", dx, dy)`.
+        """
+        name = command[0]
+        if name == "move":
+            self._actions |= ACTION_MOVE
+            self._move[0] += command[1]
+            self._move[1] += command[2]
+        elif name == "move_to":
+            self._actions |= ACTION_MOVE_TO
+            self._move = [command[1], command[2]]
+        elif name == "scroll":
+            self._actions |= ACTION_SCROLL
+            self._scroll += command[1]
+        elif name == "click":
+            self._actions |= ACTION_LEFT_CLICK if command[1] == "left" else ACTION_RIGHT_CLICK
+        elif name == "hotkey":
+            self._actions |= ACTION_BACK if command[1][-1] == "left" else ACTION_FORWARD
+
+    def write(self, timestamp, landmarks=None, pose=None, mode="MOUSE"):
+        """
+        Adds one frame to the trace together with the actions noted since the previous frame.
+
+        Args:
+        timestamp (float): Time the frame was captured, in seconds since the epoch.
+        landmarks (np.array, optional): The face's (478, 3) landmarks, or None if no face was detected.
+        pose (tuple, optional): The head pose angles (x, y, z) in degrees.
+        mode (str): The interaction mode the frame was processed in.
+        """
+        record = self._chunk[self._count]
+        record["time"] = timestamp
+        record["face"] = landmarks is not None
+        record["mode"] = MODES.index(mode)
+        record["actions"] = self._actions
+        record["pose"] = pose if pose is not None else 0
+        record["move"] = self._move
+        record["scroll"] = self._scroll
+        record["landmarks"] = landmarks if landmarks is not None else 0
+
+        self._actions = 0
+        self._move = [0.0, 0.0]
+        self._scroll = 0.0
+        self._count += 1
+        if self._count == len(self._chunk):
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the buffered frames to the file.
+        """
+        if self._count:
+            self._file.write(self._chunk[:self._count].tobytes())
+            self._file.flush()
+            self._count = 0
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class TraceReader:
+    """
+    Memory-maps a landmark trace file for zero-copy playback.
+
+    `records` is a read-only NumPy structured array backed by the file; slicing it, or iterating over `chunks`,
+    only pages in the frames that are actually touched.
+
+    Args:
+    path (str): The trace file to open.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as trace_file:
+            self.frame_size = _read_header(trace_file)
+        count = (os.path.getsize(path) - HEADER_SIZE) // RECORD_DTYPE.itemsize
+        if count:
+            self.records = np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER_SIZE, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=RECORD_DTYPE)
+
+    def __len__(self):
+        return len(self.records)
+
+    def chunks(self, size=4096):
+        """
+        Yields consecutive slices of at most `size` records.
+        """
+        for start in range(0, len(self.records), size):
+            yield self.records[start:start + size]
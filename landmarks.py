@@ -0,0 +1,83 @@
+from itertools import chain
+
+import numpy as np
+
+# Number of landmarks produced by the face mesh with refined (iris) landmarks enabled
+NUM_LANDMARKS = 478
+
+# Landmarks used for head pose estimation, in mesh order: nose tip, right eye corner, right mouth corner,
+# chin, left eye corner and left mouth corner
+POSE_INDICES = np.array([1, 33, 61, 199, 263, 291])
+NOSE_INDEX = 1
+
+# Six contour points of each eye, in the order used for the eye aspect ratio: outer corner, two points on the
+# upper eyelid, inner corner, two points on the lower eyelid. The "left" eye is the one on the left of the
+# mirrored image, whose eyelids are landmarks 159 and 145.
+LEFT_EYE_INDICES = np.array([33, 160, 158, 133, 153, 144])
+RIGHT_EYE_INDICES = np.array([263, 387, 385, 362, 380, 373])
+EYE_INDICES = np.stack((LEFT_EYE_INDICES, RIGHT_EYE_INDICES))
+
+# Inner upper and lower lip
+LIP_INDICES = np.array([13, 14])
+
+# Top of the forehead and bottom of the chin, which together give the vertical axis of the head
+HEAD_AXIS_INDICES = np.array([10, 152])
+
+# Top of the forehead, bottom of the chin and the two cheek edges, which together bound the face
+FACE_EDGE_INDICES = (10, 152, 234, 454)
+
+
+def mouth_opening(landmarks):
+    """
+    Returns the vertical gap between the inner lips, in normalized image coordinates.
+    """
+    upper_lip_y, lower_lip_y = landmarks[LIP_INDICES, 1]
+    return abs(upper_lip_y - lower_lip_y)
+
+
+def head_roll(landmarks, img_w, img_h):
+    """
+    Returns the roll of the head in degrees: the angle of the forehead-to-chin axis from the vertical.
+
+    The angle is measured in pixels, so it does not depend on the frame's aspect ratio, and it is the same
+    wherever the face is in the frame. It is about 0 when the head is upright, negative when the top of the
+    head leans towards the left of the image and positive when it leans to the right.
+    """
+    (top_x, top_y), (bottom_x, bottom_y) = landmarks[HEAD_AXIS_INDICES, :2] * (img_w, img_h)
+    return float(np.degrees(np.arctan2(top_x - bottom_x, bottom_y - top_y)))
+
+
+class FaceLandmarks:
+    """
+    Holds the landmarks of one face for the current frame as a preallocated `(478, 3)` float32 array.
+
+    The MediaPipe backends return landmarks as lists of protobuf messages or Python objects, which are slow to
+    access one attribute at a time. `update` converts them once per frame into `points` (normalized x, y and z
+    per row), and every gesture handler then reads the subsets it needs from that array instead of from the list.
+    """
+
+    def __init__(self):
+        self.points = np.zeros((NUM_LANDMARKS, 3), dtype=np.float32)
+        self._flat = self.points.reshape(-1)  # Same memory as `points`, filled in a single pass
+
+    def update(self, landmark):
+        """
+        Copies the landmarks of one face found by a MediaPipe backend into `points`.
+
+        Args:
+        landmark (sequence): The face's landmarks, each with normalized x, y and z attributes.
+
+        Returns:
+        np.array: The updated `points` array. Rows past the face's last landmark, such as the iris landmarks of a
+        mesh without them, are zero rather than left over from an earlier face.
+
+        Raises:
+        ValueError: If the face has more than NUM_LANDMARKS landmarks.
+        """
+        if len(landmark) > NUM_LANDMARKS:
+            raise ValueError(f"Expected at most {NUM_LANDMARKS} landmarks, got {len(landmark)}")
+        count = len(landmark) * 3
+        self._flat[:count] = np.fromiter(chain.from_iterable((lm.x, lm.y, lm.z) for lm in landmark),
+                                         dtype=np.float32, count=count)
+        self._flat[count:] = 0
+        return self.points
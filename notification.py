@@ -0,0 +1,78 @@
+import queue
+import threading
+import time
+
+
+class NotificationOverlay(threading.Thread):
+    """
+    A single, long-lived notification window that runs its own Tk event loop on a dedicated thread.
+
+    The window is created once and kept hidden until there is something to show. Other threads hand messages
+    over through a thread-safe queue, so showing a notification costs the caller a single queue put. A message
+    that is already on screen is replaced and its timer restarted; different messages stack, newest last, up
+    to `max_messages` lines. The window hides itself again once every message has expired.
+
+    Args:
+    max_messages (int): Maximum number of messages shown at once.
+    poll_interval (int): How often, in milliseconds, the event loop checks for new messages.
+    """
+
+    def __init__(self, max_messages=3, poll_interval=50):
+        super().__init__(name="notifications", daemon=True)
+        self.max_messages = max_messages
+        self.poll_interval = poll_interval
+        self._queue = queue.Queue()
+        self._messages = []  # (message, expiry time) pairs currently on screen, oldest first
+
+    def show(self, message, duration=3000):
+        """
+        Queues a message to be shown for `duration` milliseconds. Safe to call from any thread.
+        """
+        self._queue.put((message, duration))
+
+    def stop(self):
+        """
+        Closes the window and ends the overlay's event loop.
+        """
+        self._queue.put(None)
+
+    def run(self):
+        import tkinter as tk  # Only loaded once the overlay runs, not by every tool that imports the tracker
+
+        self.root = tk.Tk()
+        self.root.title("Notification")
+        self.label = tk.Label(self.root, font=('Helvetica', 10), justify="left")
+        self.label.pack(side="top", fill="both", expand=True, padx=20, pady=20)
+        self.root.geometry("+{}+{}".format(100, 100))  # Positions the window at screen coordinates (100, 100)
+        self.root.attributes('-topmost', True)  # Keeps the window above all other windows
+        self.root.withdraw()  # Stay hidden until there is a message to show
+        self.root.after(self.poll_interval, self._poll)
+        self.root.mainloop()
+
+    def _poll(self):
+        now = time.monotonic()
+        changed = False
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self.root.destroy()
+                return
+            message, duration = item
+            self._messages = [entry for entry in self._messages if entry[0] != message]
+            self._messages.append((message, now + duration / 1000))
+            changed = True
+
+        active = [entry for entry in self._messages if entry[1] > now][-self.max_messages:]
+        if changed or len(active) != len(self._messages):
+            self._messages = active
+            if active:
+                self.label.config(text="\n".join(message for message, _ in active))
+                self.root.deiconify()
+                self.root.lift()
+            else:
+                self.root.withdraw()
+
+        self.root.after(self.poll_interval, self._poll)
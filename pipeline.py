@@ -0,0 +1,142 @@
+import threading
+import time
+
+from instrumentation import DISABLED
+
+
+class LatestFrameBuffer:
+    """
+    A single-slot, thread-safe buffer in which the newest item always wins.
+
+    Producers overwrite whatever item has not been consumed yet, so a slow consumer only ever sees the most
+    recent frame instead of working through a backlog of stale ones. The number of overwritten items is kept
+    in `dropped` so the caller can tell how far behind the consumer is running.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._item = None
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        """
+        Stores an item, replacing (and counting as dropped) any item that has not been consumed yet.
+
+        Args:
+        item (object): The item to publish. Must not be None.
+        """
+        with self._condition:
+            if self._item is not None:
+                self.dropped += 1
+            self._item = item
+            self._condition.notify_all()
+
+    def get(self, timeout=None):
+        """
+        Takes the newest item out of the buffer, waiting for one to arrive if necessary.
+
+        Args:
+        timeout (float, optional): Maximum number of seconds to wait. Waits forever if None.
+
+        Returns:
+        object: The newest item, or None if the wait timed out or the buffer was closed while empty.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._item is not None or self._closed, timeout)
+            item, self._item = self._item, None
+            return item
+
+    def close(self):
+        """
+        Marks the buffer as closed and wakes up every waiting consumer.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+
+class CaptureThread(threading.Thread):
+    """
+    Reads frames from a video capture device as fast as the device delivers them.
+
+    Each frame is published to a `LatestFrameBuffer` together with its capture timestamp, so the camera is
+    never stalled by inference or by the actions triggered downstream. The output buffer is closed when the
+    device stops delivering frames or the thread is stopped. The time spent waiting for each frame is recorded
+    as the "capture" stage of `metrics`.
+    """
+
+    def __init__(self, capture, output, metrics=DISABLED):
+        super().__init__(name="capture", daemon=True)
+        self.capture = capture
+        self.output = output
+        self.metrics = metrics
+        self._stop_event = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stop_event.is_set():
+                started = self.metrics.start()
+                success, frame = self.capture.read()
+                if not success:
+                    break
+                self.metrics.stop("capture", started)
+                self.output.put((time.monotonic(), frame))
+        finally:
+            self.output.close()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class InferenceThread(threading.Thread):
+    """
+    Runs the landmark inference stage on the newest captured frame.
+
+    Frames that arrive while a previous frame is still being processed are dropped by the input buffer rather
+    than queued, which keeps the delay between capture and action bounded by a single inference. Each result is
+    published as `(capture_time, processed)` where `processed` is whatever `process` returned; frames for which
+    `process` returns None are skipped.
+
+    The same stage also runs the gesture logic on the inference results, under the name "gestures".
+
+    `metrics` receives the time `process` takes under the thread's name, and the age of each frame when `process`
+    has finished with it, from capture onwards, as "capture_to_<name>". The age is recorded for skipped frames too,
+    since a last stage like "gestures" acts on every frame without publishing anything. With `pass_time`,
+    `process` is called as `process(frame, capture_time)` so it can measure the frame's age itself.
+    """
+
+    def __init__(self, source, output, process, name="inference", metrics=DISABLED, pass_time=False):
+        super().__init__(name=name, daemon=True)
+        self.source = source
+        self.output = output
+        self.process = process
+        self.metrics = metrics
+        self.pass_time = pass_time
+        self._stop_event = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stop_event.is_set():
+                item = self.source.get(timeout=0.5)
+                if item is None:
+                    if self.source.closed:
+                        break
+                    continue
+                capture_time, frame = item
+                started = self.metrics.start()
+                processed = self.process(frame, capture_time) if self.pass_time else self.process(frame)
+                self.metrics.stop(self.name, started)
+                if self.metrics.enabled:
+                    self.metrics.record(f"capture_to_{self.name}", time.monotonic() - capture_time)
+                if processed is not None:
+                    self.output.put((capture_time, processed))
+        finally:
+            self.output.close()
+
+    def stop(self):
+        self._stop_event.set()
@@ -0,0 +1,96 @@
+import configparser
+import os
+import sys
+
+# Relative to the application directory, or absolute; None reads no file, so every setting keeps its default
+PREFERENCES_FILE = 'user_preferences.ini'
+
+
+def resource(relative_path):
+    """
+    Resolves the absolute path for a given resource, accommodating both development and deployment environments.
+
+    Args:
+    relative_path (str): The relative path to the resource.
+
+    Returns:
+    str: The absolute path to the resource.
+    """
+    base_path = getattr(
+        sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base_path, relative_path)
+
+
+def read_preferences():
+    """
+    Reads the user preferences file.
+
+    Returns:
+    configparser.ConfigParser: The parsed file; empty if it does not exist or `PREFERENCES_FILE` is None.
+    """
+    config = configparser.ConfigParser()
+    if PREFERENCES_FILE is not None:
+        config.read(resource(PREFERENCES_FILE))
+    return config
+
+
+def load_section(section, defaults):
+    """
+    Loads one section of the user preferences file, applying default values where settings are not found.
+
+    Args:
+    section (str): The name of the section to read, e.g. 'Tracking'.
+    defaults (dict): Setting names mapped to their default values.
+
+    Returns:
+    dict: The settings of the section. Each value is converted to the type of its default value, so a default
+    of `True`, `30` or `0.5` yields a bool, int or float respectively.
+    """
+    return read_section(read_preferences(), section, defaults)
+
+
+def read_section(config, section, defaults):
+    """
+    Reads one section of already parsed preferences, like `load_section` does for the preferences file.
+
+    Args:
+    config (configparser.ConfigParser): The preferences, normally from `read_preferences`.
+    section (str): The exact name of the section to read.
+    defaults (dict): Setting names mapped to their default values.
+
+    Returns:
+    dict: The settings of the section, converted to the types of their default values.
+    """
+    values = {}
+    for key, default in defaults.items():
+        if isinstance(default, bool):
+            values[key] = config.getboolean(section, key, fallback=default)
+        elif isinstance(default, int):
+            values[key] = config.getint(section, key, fallback=default)
+        elif isinstance(default, float):
+            values[key] = config.getfloat(section, key, fallback=default)
+        else:
+            values[key] = config.get(section, key, fallback=default)
+    return values
+
+
+def save_section(section, values):
+    """
+    Saves settings into one section of the user preferences file, keeping every other setting as it is.
+
+    Args:
+    section (str): The name of the section to update.
+    values (dict): Setting names mapped to the values to store.
+    """
+    config = configparser.ConfigParser()
+    config.read(resource(PREFERENCES_FILE))
+
+    # Create a new section if it doesn't exist
+    if not config.has_section(section):
+        config.add_section(section)
+
+    for key, value in values.items():
+        config.set(section, key, str(value))
+
+    with open(resource(PREFERENCES_FILE), 'w') as configfile:
+        config.write(configfile)
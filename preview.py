@@ -0,0 +1,92 @@
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from instrumentation import DISABLED
+from pipeline import LatestFrameBuffer
+
+# What the tracker wants drawn on a frame: the nose direction line as two pixel points, the looking direction
+# text and the head pose angles (x, y, z)
+Annotation = namedtuple("Annotation", ["line", "text", "angles"])
+
+
+def draw_annotation(image, annotation, scale=1.0):
+    """
+    Draws a frame's annotation onto the image.
+
+    Args:
+    image (np.array): The image to draw on, possibly a downscaled copy of the camera frame.
+    annotation (Annotation): What to draw, in camera frame pixel coordinates.
+    scale (float): Size of `image` relative to the camera frame.
+    """
+    p1, p2 = annotation.line
+    cv2.line(image, (int(p1[0] * scale), int(p1[1] * scale)), (int(p2[0] * scale), int(p2[1] * scale)),
+             (255, 255, 0), max(1, int(3 * scale)))
+
+    # Add the text on the image
+    x, y, z = annotation.angles
+    thickness = max(1, int(2 * scale))
+    cv2.putText(image, annotation.text, (int(20 * scale), int(50 * scale)), cv2.FONT_HERSHEY_SIMPLEX, 2 * scale,
+                (0, 255, 0), thickness)
+    for row, (name, angle) in enumerate((("x", x), ("y", y), ("z", z))):
+        cv2.putText(image, f"{name}: {np.round(angle, 2)}", (int(500 * scale), int((50 + 50 * row) * scale)),
+                    cv2.FONT_HERSHEY_SIMPLEX, scale, (0, 0, 255), thickness)
+
+
+class PreviewRenderer:
+    """
+    Shows the camera preview at a limited rate, apart from the tracking path.
+
+    The tracker only publishes each finished frame and its `Annotation` into `frames`, a latest-frame-wins
+    buffer that never blocks, as `(capture_time, (image, annotation))`. `render` takes the newest published
+    frame no more than `fps` times per second, draws the annotation onto an optionally downscaled copy and
+    shows it. A slow display or a
+    window that is being dragged therefore only makes the preview skip frames; gesture detection and cursor
+    movement keep running at full rate on their own threads.
+
+    `render` must be called from the main thread, because GUI toolkits expect their windows to be driven from
+    there.
+
+    Args:
+    fps (float): Maximum number of frames shown per second.
+    scale (float): Size of the shown image relative to the camera frame.
+    window (str): Title of the preview window.
+    metrics (Metrics): Receives the time spent drawing and showing each frame as the "render" stage.
+    """
+
+    def __init__(self, fps=15.0, scale=1.0, window='Head Pose Estimation', metrics=DISABLED):
+        self.interval = 1.0 / fps
+        self.scale = scale
+        self.window = window
+        self.metrics = metrics
+        self.frames = LatestFrameBuffer()
+        self.rendered = 0
+        self._next_time = time.monotonic()
+
+    def render(self):
+        """
+        Waits until the next frame is due, shows the newest published frame and handles window events.
+
+        Returns:
+        bool: False if the user pressed ESC in the preview window, True otherwise.
+        """
+        # Handle window events while waiting, so the window stays responsive between frames
+        wait = self._next_time - time.monotonic()
+        if wait > 0 and cv2.waitKey(max(1, int(wait * 1000))) & 0xFF == 27:
+            return False
+        self._next_time = max(self._next_time + self.interval, time.monotonic())
+
+        item = self.frames.get(timeout=self.interval)
+        if item is not None:
+            started = self.metrics.start()
+            _, (image, annotation) = item
+            if self.scale != 1.0:
+                image = cv2.resize(image, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+            if annotation is not None:
+                draw_annotation(image, annotation, self.scale)
+            cv2.imshow(self.window, image)
+            self.rendered += 1
+            self.metrics.stop("render", started)
+        return cv2.waitKey(1) & 0xFF != 27
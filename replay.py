@@ -0,0 +1,300 @@
+"""
+Offline replay and benchmark harness for the tracker in Scroll.py.
+
+Feeds a recorded video file, or a recorded landmark trace, through the same `process_image` -> `draw_landmarks`
+-> gesture handler path the live tracker uses, without a webcam or a desktop session. pyautogui is replaced by
+a recording stub, so the harness runs headless and reports the actions the tracker would have performed
+together with per-stage latency percentiles and the achieved frame rate.
+
+Usage:
+    python replay.py recording.mp4
+    python replay.py recording.mp4 --save-trace recording.trace
+    python replay.py recording.trace --json report.json
+    python replay.py recording.trace --preferences user_preferences.ini
+
+Every setting has its default value during a replay, so the same recording gives the same actions on every
+machine; `--preferences` replays with the settings of a preferences file instead.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import types
+from collections import Counter
+
+import numpy as np
+
+import preferences
+from actuator import CursorActuator
+from landmark_trace import TraceReader, TraceWriter
+
+
+class ReplayClock:
+    """
+    Virtual clock that follows the timestamps of the replayed frames instead of the wall clock.
+
+    The gesture handlers use time-based cooldowns, so replaying faster than real time against the wall clock
+    would change which gestures fire. The tracker's `time` module is replaced by this clock during a replay.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+
+class RecordingPyAutoGUI(types.ModuleType):
+    """
+    Stand-in for the pyautogui module that records every call instead of performing it.
+
+    The cursor position is tracked internally, so code that reads it back sees the effect of earlier moves.
+    Each recorded action is a tuple of `(timestamp, name, *arguments)`.
+    """
+
+    FAILSAFE = False
+    PAUSE = 0
+
+    def __init__(self, clock, width=1920, height=1080):
+        super().__init__("pyautogui")
+        self.clock = clock
+        self.width = width
+        self.height = height
+        self.x = width // 2
+        self.y = height // 2
+        self.actions = []
+
+    def _record(self, name, *args):
+        self.actions.append((self.clock.time(), name) + args)
+
+    def size(self):
+        return self.width, self.height
+
+    def position(self):
+        return self.x, self.y
+
+    def moveRel(self, dx, dy, duration=0.0):
+        self.x = min(max(self.x + dx, 0), self.width)
+        self.y = min(max(self.y + dy, 0), self.height)
+        self._record("move", dx, dy)
+
+    def moveTo(self, x, y, duration=0.0):
+        self.x, self.y = x, y
+        self._record("move_to", x, y)
+
+    def scroll(self, clicks):
+        self._record("scroll", clicks)
+
+    def click(self, button='left'):
+        self._record("click", button)
+
+    def hotkey(self, *keys):
+        self._record("hotkey", *keys)
+
+
+def load_tracker(stub, clock, preferences_file=None):
+    """
+    Imports Scroll.py against the recording stub and prepares it for a synchronous replay.
+
+    Args:
+    stub (RecordingPyAutoGUI): Installed as the `pyautogui` module before Scroll.py is imported.
+    clock (ReplayClock): Replaces the tracker's `time` module.
+    preferences_file (str, optional): Preferences file the tracker reads its settings from; without it every
+    setting has its default value, whatever the local user_preferences.ini contains.
+
+    Returns:
+    module: The imported tracker module.
+
+    The tracker's actuator is replaced by one that is stepped once per frame on the replay thread with smoothing
+    disabled, so every run of the same input produces the same list of actions. Mode-change notifications are
+    recorded as actions instead of opening a window.
+    """
+    preferences.PREFERENCES_FILE = os.path.abspath(preferences_file) if preferences_file is not None else None
+    sys.modules['pyautogui'] = stub
+    import Scroll as tracker
+
+    tracker.time = clock
+    tracker.actuator = CursorActuator(stub, smoothing=0)
+    tracker.show_notification_async = lambda message, duration=3000: stub._record("notify", message)
+    return tracker
+
+
+class StageTimer:
+    """
+    Collects per-frame durations of the named pipeline stages.
+    """
+
+    def __init__(self):
+        self.samples = {}
+
+    def time(self, stage, function, *args):
+        start = time.perf_counter()
+        result = function(*args)
+        self.samples.setdefault(stage, []).append(time.perf_counter() - start)
+        return result
+
+    def summary(self):
+        """
+        Returns:
+        dict: For every stage, the mean, 50th, 90th and 99th percentile and maximum duration in milliseconds.
+        """
+        summary = {}
+        for stage, samples in self.samples.items():
+            ms = np.asarray(samples) * 1000
+            p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+            summary[stage] = {"mean": float(ms.mean()), "p50": float(p50), "p90": float(p90),
+                              "p99": float(p99), "max": float(ms.max())}
+        return summary
+
+
+def replay_video(tracker, clock, timer, path, save_trace=None):
+    """
+    Replays a video file through face mesh inference and the gesture handlers.
+
+    Args:
+    tracker (module): The tracker module returned by `load_tracker`.
+    clock (ReplayClock): Advanced to each frame's timestamp.
+    timer (StageTimer): Receives the read, process, gestures and actuate timings.
+    path (str): Path of the video file.
+    save_trace (str, optional): If given, every frame is appended to this landmark trace file.
+
+    Returns:
+    int: The number of frames replayed.
+    """
+    import cv2
+
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise IOError(f"Could not open video file {path}")
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    tracker.initialize_face_mesh()
+
+    writer = None
+    if save_trace is not None:
+        frame_size = (int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)), int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        writer = TraceWriter(save_trace, frame_size)
+        tracker.actuator.observer = writer.note_action
+
+    frames = 0
+    while True:
+        success, frame = timer.time("read", capture.read)
+        if not success:
+            break
+        clock.now = frames / fps
+        processed = timer.time("process", tracker.process_image, frame)
+        if processed is None:  # Skipped while the tracker is idle
+            frames += 1
+            continue
+        angles = timer.time("gestures", tracker.draw_landmarks, *processed)
+        timer.time("actuate", tracker.actuator.step)
+
+        if writer is not None:
+            landmarks = tracker.face_landmarks_array.points if angles is not None else None
+            writer.write(clock.now, landmarks, angles, tracker.current_mode)
+        frames += 1
+    capture.release()
+
+    if writer is not None:
+        tracker.actuator.observer = None
+        writer.close()
+    return frames
+
+
+def replay_trace(tracker, clock, timer, path):
+    """
+    Replays a landmark trace through the gesture handlers, skipping capture and inference.
+
+    Args:
+    tracker (module): The tracker module returned by `load_tracker`.
+    clock (ReplayClock): Advanced to each frame's recorded timestamp.
+    timer (StageTimer): Receives the gestures and actuate timings.
+    path (str): Path of a trace file written by `Scroll.py --record` or `--save-trace`.
+
+    Returns:
+    int: The number of frames replayed.
+
+    The trace is memory-mapped and walked in chunks, so arbitrarily long recordings are replayed without being
+    loaded into memory. Frames without a face go through `draw_landmarks` like in the live tracker, so the
+    per-face state is reset the same way when the face is lost.
+    """
+    reader = TraceReader(path)
+    width, height = reader.frame_size
+    canvas = np.zeros((height, width, 3), dtype=np.uint8)
+
+    for chunk in reader.chunks():
+        for record in chunk:
+            clock.now = record["time"]
+            if record["face"]:
+                timer.time("gestures", tracker.handle_landmarks, canvas, record["landmarks"])
+            else:
+                timer.time("gestures", tracker.draw_landmarks, canvas, [])
+            timer.time("actuate", tracker.actuator.step)
+    return len(reader)
+
+
+def format_report(report):
+    """
+    Formats a replay report as a human readable table.
+    """
+    lines = [f"Frames: {report['frames']}  Wall time: {report['seconds']:.2f} s  FPS: {report['fps']:.1f}",
+             "",
+             f"{'stage':<10}{'mean':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}  (ms)"]
+    for stage, stats in report["stages"].items():
+        lines.append(f"{stage:<10}" + "".join(f"{stats[key]:>9.3f}" for key in ("mean", "p50", "p90", "p99", "max")))
+    lines.append("")
+    lines.append("Actions: " + (", ".join(f"{name} x{count}" for name, count in report["action_counts"].items())
+                                or "none"))
+    return "\n".join(lines)
+
+
+def parse_size(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recording through the tracker and report its performance.")
+    parser.add_argument("input", help="Video file, or .trace landmark trace")
+    parser.add_argument("--screen-size", type=parse_size, default=(1920, 1080), help="Simulated screen size")
+    parser.add_argument("--save-trace", help="Append every frame of a replayed video to this landmark trace")
+    parser.add_argument("--json", help="Write the report, including every action, to this JSON file")
+    parser.add_argument("--actions", action="store_true", help="Print every emitted action")
+    parser.add_argument("--preferences", help="Preferences file to replay with instead of the defaults")
+    args = parser.parse_args(argv)
+
+    clock = ReplayClock()
+    stub = RecordingPyAutoGUI(clock, *args.screen_size)
+    tracker = load_tracker(stub, clock, args.preferences)
+    timer = StageTimer()
+
+    start = time.perf_counter()
+    if args.input.endswith(".trace"):
+        frames = replay_trace(tracker, clock, timer, args.input)
+    else:
+        frames = replay_video(tracker, clock, timer, args.input, args.save_trace)
+    seconds = time.perf_counter() - start
+
+    report = {
+        "input": args.input,
+        "frames": frames,
+        "seconds": seconds,
+        "fps": frames / seconds if seconds else 0.0,
+        "stages": timer.summary(),
+        "action_counts": dict(Counter(action[1] for action in stub.actions)),
+        "actions": [list(action) for action in stub.actions],
+    }
+    print(format_report(report))
+    if args.actions:
+        for action in stub.actions:
+            print(f"{action[0]:9.3f}  " + " ".join(str(value) for value in action[1:]))
+    if args.json:
+        with open(args.json, "w") as report_file:
+            json.dump(report, report_file, indent=2, default=float)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import cv2
+
+
+class FaceRegion:
+    """
+    Chooses the part of each camera frame that is handed to the face mesh, and at what resolution.
+
+    While a face is being tracked, only a square region around the previous frame's landmarks (padded by
+    `padding` times the face size on every side) is cropped out and scaled to `target_size` pixels, which is
+    all the mesh needs however large the camera frame is. The landmarks found in the crop are then mapped back
+    to full-frame coordinates with `to_frame`. When the face is lost the next frame is searched as a whole,
+    scaled down so its longer side is at most `detection_size` pixels.
+
+    `switched` tells whether the last `prepare` changed between a full frame and a crop. The landmark models
+    follow the face from one input to the next in the input's own coordinates, which only carries over from crop
+    to crop, since the crop follows the face and keeps it at about the same place and size within it.
+
+    Args:
+    target_size (int): Side length in pixels of the square crop given to the mesh while tracking.
+    padding (float): Margin added around the face on each side, as a fraction of the face's size.
+    detection_size (int): Maximum length of the longer side of a full frame searched for a face.
+    enabled (bool): If False, every frame is processed in full at its original resolution, unless `prepare` is
+    given a `detection_size` for it.
+    """
+
+    def __init__(self, target_size=256, padding=0.3, detection_size=640, enabled=True):
+        self.target_size = target_size
+        self.padding = padding
+        self.detection_size = detection_size
+        self.enabled = enabled
+        self.crop = None  # (x, y, side) of the region to use for the next frame, in pixels
+        self.switched = False  # Whether the last prepared input was a crop where the one before was not, or back
+        self._cropped = False
+
+    def prepare(self, image, detection_size=None):
+        """
+        Produces the mesh input for a frame.
+
+        Args:
+        image (np.array): The full camera frame.
+        detection_size (int, optional): Overrides `detection_size` for this frame if no face is being tracked. It
+        also applies when the region is disabled, so an idle camera is scaled down either way.
+
+        Returns:
+        tuple: The image to run the mesh on, and the crop it was taken from (None for the full frame). The crop
+        must be passed to `to_frame` together with the landmarks found in that image.
+        """
+        crop = self.crop if self.enabled else None  # Read once, the tracking thread may replace it at any time
+        self.switched = (crop is not None) != self._cropped
+        self._cropped = crop is not None
+        if not self.enabled and detection_size is None:
+            return image, None
+
+        if crop is None:
+            img_h, img_w = image.shape[:2]
+            scale = (detection_size or self.detection_size) / max(img_w, img_h)
+            if scale >= 1:
+                return image, None
+            # Uniform scaling leaves normalized landmark coordinates unchanged, so no mapping is needed
+            return cv2.resize(image, (int(img_w * scale), int(img_h * scale)), interpolation=cv2.INTER_AREA), None
+
+        x, y, side = crop
+        region = image[y:y + side, x:x + side]
+        if side > self.target_size:
+            region = cv2.resize(region, (self.target_size, self.target_size), interpolation=cv2.INTER_LINEAR)
+        return region, crop
+
+    @staticmethod
+    def to_frame(landmarks, crop, img_w, img_h):
+        """
+        Maps landmarks found in a crop back to normalized full-frame coordinates, in place.
+
+        Args:
+        landmarks (np.array): The (478, 3) landmarks, normalized to the crop.
+        crop (tuple): The crop returned by `prepare`, or None if the full frame was used.
+        img_w (int): Width of the full frame in pixels.
+        img_h (int): Height of the full frame in pixels.
+        """
+        if crop is None:
+            return
+        x, y, side = crop
+        landmarks[:, 0] = (x + landmarks[:, 0] * side) / img_w
+        landmarks[:, 1] = (y + landmarks[:, 1] * side) / img_h
+        landmarks[:, 2] *= side / img_w  # Depth is scaled like the x axis
+
+    def track(self, landmarks, img_w, img_h):
+        """
+        Centres the crop for the next frame on the face described by this frame's full-frame landmarks.
+        """
+        if not self.enabled:
+            return
+        left, top = landmarks[:, :2].min(axis=0) * (img_w, img_h)
+        right, bottom = landmarks[:, :2].max(axis=0) * (img_w, img_h)
+
+        side = int(max(right - left, bottom - top) * (1 + 2 * self.padding))
+        side = min(max(side, 1), img_w, img_h)
+        # Shift the square to keep it inside the frame instead of shrinking it
+        x = int(min(max((left + right - side) / 2, 0), img_w - side))
+        y = int(min(max((top + bottom - side) / 2, 0), img_h - side))
+        self.crop = (x, y, side)
+
+    def lose(self):
+        """
+        Forgets the face so the next frame is searched as a whole.
+        """
+        self.crop = None
@@ -0,0 +1,171 @@
+import numpy as np
+
+# Defaults of the [Scrolling] section of user_preferences.ini
+SCROLL_DEFAULTS = {
+    'gain': 25.0,  # Scroll amount per degree the head turns up or down during a nod
+    'window': 0.4,  # Seconds of pitch history the nod features are computed over
+    'min_velocity': 15.0,  # Pitch speed in degrees per second below which the head counts as still
+    'min_amplitude': 3.0,  # Pitch range in degrees within the window needed for a nod
+    'max_crossings': 2,  # Direction changes within the window above which the movement is jitter, not a nod
+    'settle_time': 0.3,  # Seconds without movement after which a nod has ended
+    'max_speed': 1500.0,  # Largest scroll amount per second
+    'max_events': 15.0,  # Largest number of scroll events per second
+}
+
+
+class RingBuffer:
+    """
+    Fixed-size history of timestamped samples in preallocated NumPy arrays.
+
+    Appending overwrites the oldest sample once the buffer is full, so every append costs the same and nothing
+    is allocated per frame. `window` returns the recent samples in time order, ready for vectorized maths.
+
+    Args:
+    capacity (int): Number of samples kept.
+    """
+
+    def __init__(self, capacity=64):
+        self.times = np.zeros(capacity)
+        self.values = np.zeros(capacity)
+        self.capacity = capacity
+        self.count = 0  # Number of samples appended since the last reset
+        self._next = 0  # Slot the next sample is written to
+
+    def append(self, now, value):
+        self.times[self._next] = now
+        self.values[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        self.count += 1
+
+    def window(self, seconds):
+        """
+        Returns the times and values of the samples from the last `seconds` seconds, oldest first.
+        """
+        size = min(self.count, self.capacity)
+        order = (self._next - size + np.arange(size)) % self.capacity
+        times = self.times[order]
+        keep = times >= times[-1] - seconds if size else slice(None)
+        return times[keep], self.values[order][keep]
+
+    def reset(self):
+        self.count = 0
+        self._next = 0
+
+
+def nod_features(times, pitches):
+    """
+    Computes the features that tell a nod from a still or jittering head over a window of pitch samples.
+
+    Args:
+    times (np.array): Timestamps in seconds, oldest first.
+    pitches (np.array): Head pitch in degrees at those times.
+
+    Returns:
+    tuple: The current pitch velocity in degrees per second (averaged over the last three intervals), the pitch
+    range within the window in degrees, and the number of times the movement changed direction.
+    """
+    velocities = np.diff(pitches) / np.maximum(np.diff(times), 1e-3)
+    velocity = velocities[-3:].mean()
+    amplitude = np.ptp(pitches)
+    # Direction changes of the movements that are fast enough to matter; noise around zero is ignored
+    signs = np.sign(velocities[np.abs(velocities) >= velocities.std()])
+    crossings = np.count_nonzero(np.diff(signs))
+    return velocity, amplitude, crossings
+
+
+class NodScroller:
+    """
+    Turns nods into scrolling: nodding up scrolls up, nodding down scrolls down, by an amount proportional to
+    how far and fast the head moves.
+
+    Each frame's pitch goes into a ring buffer, and `nod_features` is computed over the last `window` seconds.
+    The head is nodding when it moves faster than `min_velocity` over a range of at least `min_amplitude` without
+    jittering back and forth. The first stroke of a nod scrolls by `gain` times the distance the head moves,
+    so scrolling follows the speed of the nod. The stroke back to the rest position that completes the nod does
+    not scroll; another stroke in the first direction, such as the next nod, does. The nod ends when the head
+    has been still for `settle_time` seconds.
+
+    Scroll amounts are accumulated and only whole units are sent, no more than `max_events` times per second,
+    and the speed is capped at `max_speed`. This sends a few well-sized scroll events per nod instead of a
+    fixed-size event on every frame.
+
+    Args:
+    gain (float): Scroll amount per degree of pitch change during a nod.
+    window (float): Seconds of history the features are computed over.
+    min_velocity (float): Pitch speed in degrees per second below which the head counts as still.
+    min_amplitude (float): Pitch range in degrees within the window needed for a nod.
+    max_crossings (int): Direction changes within the window above which the movement counts as jitter.
+    settle_time (float): Seconds without movement that end a nod.
+    max_speed (float): Largest scroll amount per second.
+    max_events (float): Largest number of scroll events per second.
+    """
+
+    def __init__(self, gain=25.0, window=0.4, min_velocity=15.0, min_amplitude=3.0, max_crossings=2,
+                 settle_time=0.3, max_speed=1500.0, max_events=15.0):
+        self.gain = gain
+        self.window = window
+        self.min_velocity = min_velocity
+        self.min_amplitude = min_amplitude
+        self.max_crossings = max_crossings
+        self.settle_time = settle_time
+        self.max_speed = max_speed
+        self.event_interval = 1.0 / max_events
+        self.history = RingBuffer()
+        self.reset()
+
+    @classmethod
+    def from_settings(cls, settings):
+        """
+        Creates a scroller from the [Scrolling] preferences section.
+        """
+        return cls(**settings)
+
+    def reset(self):
+        self.history.reset()
+        self._direction = 0  # Direction of the current nod's first stroke: 1 up, -1 down, 0 between nods
+        self._returning = False  # Whether the head is on its way back from the first stroke
+        self._last_motion = None
+        self._last_event = None
+        self._pending = 0.0  # Scroll amount accumulated but not sent yet
+
+    def update(self, pitch, now):
+        """
+        Adds one frame's pitch and returns the scroll amount to send now.
+
+        Args:
+        pitch (float): The head pitch in degrees, positive when looking up.
+        now (float): Timestamp of the frame in seconds.
+
+        Returns:
+        int: The scroll amount to send, positive to scroll up; 0 when there is nothing to send this frame.
+        """
+        self.history.append(now, pitch)
+        times, pitches = self.history.window(self.window)
+        if len(times) < 4:
+            return 0
+
+        velocity, amplitude, crossings = nod_features(times, pitches)
+        if (abs(velocity) >= self.min_velocity and amplitude >= self.min_amplitude
+                and crossings <= self.max_crossings):
+            direction = 1 if velocity > 0 else -1
+            if self._direction == 0 or (direction == self._direction and self._returning):
+                self._direction = direction  # A new nod, or the next one in the same direction
+                self._returning = False
+            elif direction != self._direction:
+                self._returning = True
+            if not self._returning:
+                # Velocity times frame time is the distance moved, capped at the maximum scroll speed
+                frame_time = times[-1] - times[-2]
+                speed = min(abs(velocity) * self.gain, self.max_speed)
+                self._pending += direction * speed * frame_time
+            self._last_motion = now
+        elif self._last_motion is None or now - self._last_motion > self.settle_time:
+            self._direction = 0
+            self._returning = False
+
+        amount = int(self._pending)
+        if amount and (self._last_event is None or now - self._last_event >= self.event_interval):
+            self._pending -= amount
+            self._last_event = now
+            return amount
+        return 0
@@ -0,0 +1,260 @@
+import math
+
+import numpy as np
+
+# Defaults of the [Smoothing] section of user_preferences.ini
+SMOOTHING_DEFAULTS = {
+    'filter': 'one_euro',  # "one_euro", "kalman" or "none"
+    'deadband': 0.25,  # Change of the filtered head angles needed before the smoothed angles change
+    'min_move': 2.0,  # Pixels the cursor must move before a move is sent; smaller moves add up until they reach it
+    'min_cutoff': 1.0,  # One Euro: cutoff in Hz while the head is still; lower removes more jitter
+    'beta': 0.01,  # One Euro: cutoff increase per unit of angular speed; higher reduces lag
+    'd_cutoff': 1.0,  # One Euro: cutoff in Hz of the speed estimate
+    'process_noise': 500.0,  # Kalman: variance of head acceleration; higher follows quick moves more closely
+    'measurement_noise': 4.0,  # Kalman: variance of the angle noise; higher smooths more
+}
+
+
+class OneEuroFilter:
+    """
+    One Euro filter: a low-pass filter whose cutoff frequency rises with the speed of the signal.
+
+    While the head is still the cutoff stays at `min_cutoff`, which removes landmark jitter; when the head moves
+    quickly the cutoff grows by `beta` times the speed so the output does not lag behind. Lower `min_cutoff`
+    means less jitter, higher `beta` means less lag. Works element-wise on arrays of values.
+
+    Args:
+    min_cutoff (float): Cutoff frequency in Hz when the signal is not moving.
+    beta (float): How much the cutoff frequency grows per unit of speed.
+    d_cutoff (float): Cutoff frequency in Hz used to smooth the speed estimate.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=0.01, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self._value = None
+        self._speed = None
+        self._time = None
+
+    @staticmethod
+    def _alpha(dt, cutoff):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def __call__(self, value, now):
+        value = np.asarray(value, dtype=np.float64)
+        if self._time is None:
+            self._value, self._speed, self._time = value, np.zeros_like(value), now
+            return value
+        dt = now - self._time
+        if dt <= 0:
+            return self._value
+        self._time = now
+
+        speed = (value - self._value) / dt
+        a_d = self._alpha(dt, self.d_cutoff)
+        self._speed = a_d * speed + (1 - a_d) * self._speed
+
+        cutoff = self.min_cutoff + self.beta * np.abs(self._speed)
+        a = self._alpha(dt, cutoff)
+        self._value = a * value + (1 - a) * self._value
+        return self._value
+
+
+class ConstantVelocityKalman:
+    """
+    Kalman filter that models each value as moving at a constant velocity disturbed by random acceleration.
+
+    A higher `process_noise` follows quick head movements more closely, a higher `measurement_noise` trusts the
+    individual measurements less and smooths more. Each element of the input is filtered independently.
+
+    Args:
+    process_noise (float): Variance of the random acceleration, in units per second squared.
+    measurement_noise (float): Variance of the measurement noise, in squared units.
+    """
+
+    def __init__(self, process_noise=500.0, measurement_noise=4.0):
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.reset()
+
+    def reset(self):
+        self._position = None
+        self._time = None
+
+    def __call__(self, value, now):
+        value = np.asarray(value, dtype=np.float64)
+        if self._time is None:
+            self._position, self._velocity = value.copy(), np.zeros_like(value)
+            # Covariance entries of the (position, velocity) state, one set per element
+            self._p00 = np.full_like(value, self.measurement_noise)
+            self._p01 = np.zeros_like(value)
+            self._p11 = np.full_like(value, 1e3)
+            self._time = now
+            return self._position
+        dt = now - self._time
+        if dt <= 0:
+            return self._position
+        self._time = now
+
+        # Predict
+        q = self.process_noise
+        self._position = self._position + self._velocity * dt
+        self._p00 = self._p00 + dt * (2 * self._p01 + dt * self._p11) + q * dt ** 3 / 3
+        self._p01 = self._p01 + dt * self._p11 + q * dt ** 2 / 2
+        self._p11 = self._p11 + q * dt
+
+        # Update
+        gain_position = self._p00 / (self._p00 + self.measurement_noise)
+        gain_velocity = self._p01 / (self._p00 + self.measurement_noise)
+        residual = value - self._position
+        self._position = self._position + gain_position * residual
+        self._velocity = self._velocity + gain_velocity * residual
+        self._p11 = self._p11 - gain_velocity * self._p01
+        self._p00 = (1 - gain_position) * self._p00
+        self._p01 = (1 - gain_position) * self._p01
+        return self._position
+
+
+class PoseSmoother:
+    """
+    Smooths the head pose angles between pose estimation and the cursor, with a deadband on the output.
+
+    The angles go through the selected filter, and the output only changes once the filtered angles have moved
+    more than `deadband` away from the last value that was passed on, so small remaining wobbles do not change
+    the angles at all. In joystick mode the angles set the cursor speed, so a steady angle still moves the
+    cursor; the moves themselves are thinned out by `CursorDeadband`.
+
+    Args:
+    kind (str): "one_euro", "kalman" or "none".
+    deadband (float): Minimum change of any filtered angle before the output is updated.
+    **params: Passed to the filter, see `OneEuroFilter` and `ConstantVelocityKalman`.
+    """
+
+    def __init__(self, kind="one_euro", deadband=0.0, **params):
+        if kind == "one_euro":
+            self.filter = OneEuroFilter(**params)
+        elif kind == "kalman":
+            self.filter = ConstantVelocityKalman(**params)
+        elif kind == "none":
+            self.filter = None
+        else:
+            raise ValueError(f"Unknown smoothing filter {kind!r}")
+        self.deadband = deadband
+        self._output = None
+
+    @classmethod
+    def from_settings(cls, settings):
+        """
+        Creates a smoother from the [Smoothing] preferences section.
+        """
+        kind = settings['filter']
+        if kind == "one_euro":
+            params = {'min_cutoff': settings['min_cutoff'], 'beta': settings['beta'],
+                      'd_cutoff': settings['d_cutoff']}
+        elif kind == "kalman":
+            params = {'process_noise': settings['process_noise'],
+                      'measurement_noise': settings['measurement_noise']}
+        else:
+            params = {}
+        return cls(kind, settings['deadband'], **params)
+
+    def __call__(self, angles, now):
+        """
+        Filters one frame's angles.
+
+        Args:
+        angles (tuple): The raw angles.
+        now (float): Timestamp of the frame in seconds.
+
+        Returns:
+        tuple: The smoothed angles.
+        """
+        filtered = np.asarray(angles, dtype=np.float64)
+        if self.filter is not None:
+            filtered = self.filter(filtered, now)
+        if self._output is None or np.abs(filtered - self._output).max() > self.deadband:
+            self._output = filtered
+        return tuple(float(angle) for angle in self._output)
+
+    def reset(self):
+        """
+        Forgets the filter state, e.g. when the face is lost.
+        """
+        if self.filter is not None:
+            self.filter.reset()
+        self._output = None
+
+
+class CursorDeadband:
+    """
+    Drops cursor moves that are too small to matter before they reach the actuator.
+
+    In joystick mode the head angle sets the cursor speed, so a turned head sends a move on every frame however
+    steady the angles are. Relative moves shorter than `min_move` pixels are therefore added up and only sent
+    once their sum reaches it, which turns a slow drift into a few whole-pixel moves and holds back the
+    fractions of a pixel that jitter produces. In absolute mode a new target is only sent once it is at least
+    `min_move` pixels away from the last one that was sent.
+
+    Args:
+    min_move (float): Distance in pixels a move must cover before it is sent; 0 sends every move.
+    """
+
+    def __init__(self, min_move=0.0):
+        self.min_move = min_move
+        self._pending = (0.0, 0.0)
+        self._target = None
+
+    @classmethod
+    def from_settings(cls, settings):
+        """
+        Creates a deadband from the [Smoothing] preferences section.
+        """
+        return cls(settings['min_move'])
+
+    def relative(self, dx, dy):
+        """
+        Adds one frame's relative move.
+
+        Args:
+        dx (float): Horizontal move in pixels.
+        dy (float): Vertical move in pixels.
+
+        Returns:
+        tuple: The move to send, including the held back moves, or None if it is still shorter than `min_move`.
+        """
+        dx, dy = self._pending[0] + dx, self._pending[1] + dy
+        if dx == 0 and dy == 0 or math.hypot(dx, dy) < self.min_move:
+            self._pending = (dx, dy)
+            return None
+        self._pending = (0.0, 0.0)
+        return dx, dy
+
+    def absolute(self, x, y):
+        """
+        Checks one frame's absolute target.
+
+        Args:
+        x (float): Horizontal screen position in pixels.
+        y (float): Vertical screen position in pixels.
+
+        Returns:
+        tuple: The target to send, or None if it is closer than `min_move` to the last target sent.
+        """
+        if self._target is not None:
+            distance = math.hypot(x - self._target[0], y - self._target[1])
+            if distance == 0 or distance < self.min_move:
+                return None
+        self._target = (x, y)
+        return x, y
+
+    def reset(self):
+        """
+        Forgets the held back move and the last target, e.g. when the face is lost.
+        """
+        self._pending = (0.0, 0.0)
+        self._target = None
@@ -0,0 +1,126 @@
+"""
+Live status channel from the tracker to the launcher.
+
+The tracker sends a small JSON datagram over a UDP socket on the loopback interface a few times per second, and
+the launcher reads whatever has arrived without ever waiting. UDP keeps both sides independent: sending never
+blocks the tracker, even when nobody is listening, and a lost datagram only means the dashboard skips one
+update.
+"""
+import json
+import socket
+import time
+
+HOST = "127.0.0.1"
+
+
+class StatusPublisher:
+    """
+    Collects usage statistics in the tracker and sends them to the launcher every `interval` seconds.
+
+    Each message holds the frame rate, mean end-to-end latency (from capture to the end of the gesture logic)
+    and share of frames with a face over the last interval, plus the clicks and mode toggles since the start
+    and the current mode.
+
+    Args:
+    port (int): The UDP port the launcher listens on.
+    interval (float): Seconds between messages.
+    """
+
+    def __init__(self, port, interval=0.5):
+        self.address = (HOST, port)
+        self.interval = interval
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+        self.clicks = 0
+        self.toggles = 0
+        self.mode = "MOUSE"
+        self._window_start = time.monotonic()
+        self._frames = 0
+        self._faces = 0
+        self._latency = 0.0
+
+    def click(self):
+        self.clicks += 1
+
+    def toggle(self, mode):
+        self.toggles += 1
+        self.mode = mode
+
+    def frame(self, face_found, latency, now):
+        """
+        Counts one processed frame, and sends a message if the interval is over.
+
+        Args:
+        face_found (bool): Whether a face was detected in the frame.
+        latency (float): Seconds from the frame's capture until its gestures were handled.
+        now (float): The current `time.monotonic()`.
+        """
+        self._frames += 1
+        self._faces += face_found
+        self._latency += latency
+        elapsed = now - self._window_start
+        if elapsed >= self.interval:
+            self._send({
+                "fps": self._frames / elapsed,
+                "latency_ms": self._latency / self._frames * 1000,
+                "face_ratio": self._faces / self._frames,
+                "clicks": self.clicks,
+                "toggles": self.toggles,
+                "mode": self.mode,
+            })
+            self._window_start = now
+            self._frames = self._faces = 0
+            self._latency = 0.0
+
+    def _send(self, message):
+        try:
+            self._socket.sendto(json.dumps(message).encode(), self.address)
+        except OSError:
+            pass  # Nobody listening or the socket buffer is full; the next message will do
+
+    def close(self):
+        self._socket.close()
+
+
+class StatusListener:
+    """
+    Receives the tracker's status messages in the launcher.
+
+    The socket is bound to a free port on the loopback interface, which is passed to the tracker on its command
+    line. `poll` never blocks, so it can be called from a Tk `after` callback.
+    """
+
+    def __init__(self):
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.bind((HOST, 0))
+        self._socket.setblocking(False)
+        self.port = self._socket.getsockname()[1]
+        self.last_message = None
+        self.last_time = None
+
+    def poll(self):
+        """
+        Reads every message that has arrived since the last call.
+
+        Returns:
+        dict: The newest message, or None if nothing has arrived.
+        """
+        message = None
+        while True:
+            try:
+                data = self._socket.recv(4096)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                break  # E.g. a connection reset reported for an earlier datagram on Windows
+            try:
+                message = json.loads(data)
+            except ValueError:
+                continue
+        if message is not None:
+            self.last_message = message
+            self.last_time = time.monotonic()
+        return message
+
+    def close(self):
+        self._socket.close()
@@ -0,0 +1,247 @@
+"""
+Keeps one tracker process ready in the background so the launcher can start and stop tracking instantly.
+
+The launcher starts Scroll.py once with `--paused`. The worker imports its libraries, loads the face mesh model
+and then waits for commands, one per line on its standard input:
+- start: open the camera and start tracking.
+- stop: stop tracking and release the camera, but keep the model loaded.
+- quit: exit.
+
+The worker reports on its standard output when a session has started and when it has ended and released the
+camera, one line each, so the launcher knows a session that ended inside the worker (ESC in the preview, no
+camera) is over. Its other output is passed through.
+
+Start and Stop therefore only cost opening or closing the camera instead of a Python start-up, the imports and
+the model load. The worker also exits when its standard input is closed, so it never outlives the launcher.
+"""
+import subprocess
+import sys
+import threading
+import time
+
+START = "start"
+STOP = "stop"
+QUIT = "quit"
+
+# Reported by the worker
+STARTED = "started"
+STOPPED = "stopped"
+
+
+class TrackerSupervisor:
+    """
+    Runs a single paused tracker worker for the launcher and restarts it if it crashes.
+
+    Call `supervise` regularly, e.g. from a Tk `after` callback: a worker that has died is started again, and
+    put back into tracking if it was tracking before. A worker that exits cleanly, e.g. from its tray icon, is
+    not restarted; the next `start` starts a new one. If it crashes more than `max_restarts` times within
+    `restart_window` seconds the supervisor gives up, so a broken setup does not spin forever.
+
+    Args:
+    script (str): Path of the tracker script.
+    args (list): Extra command line arguments for the tracker.
+    max_restarts (int): Crashes tolerated within `restart_window`.
+    restart_window (float): Seconds over which crashes are counted.
+    """
+
+    def __init__(self, script, args=(), max_restarts=5, restart_window=60.0):
+        self.script = script
+        self.args = list(args)
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self.process = None
+        self.tracking = False  # Whether the tracker is running, or has been asked to
+        self.gave_up = False
+        self._crashes = []
+        self._stopped = threading.Event()  # Set while no session is running, i.e. the camera is free
+        self._stopped.set()
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def _spawn(self):
+        self._stopped.set()
+        # The interpreter running the launcher, so the worker gets the same environment and packages; unbuffered
+        # so its reports and output arrive as they are written
+        self.process = subprocess.Popen([sys.executable, "-u", self.script, "--paused"] + self.args,
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+                                        start_new_session=True)
+        threading.Thread(target=self._read_reports, args=(self.process,), name="tracker-output",
+                         daemon=True).start()
+
+    def _read_reports(self, process):
+        for line in process.stdout:
+            report = line.strip()
+            if process is not self.process:
+                continue  # A replaced worker's last words
+            if report == STARTED:
+                self.tracking = True
+            elif report == STOPPED:
+                self.tracking = False
+                self._stopped.set()
+            else:
+                print(line, end="")
+
+    def _send(self, command):
+        try:
+            self.process.stdin.write(command + "\n")
+            self.process.stdin.flush()
+            return True
+        except (OSError, ValueError):
+            return False  # The worker has died; `supervise` will restart it
+
+    def prewarm(self):
+        """
+        Starts the paused worker if it is not running yet.
+        """
+        if not self.alive:
+            self.gave_up = False
+            self._crashes = []
+            self._spawn()
+
+    def start(self):
+        """
+        Starts tracking, starting the worker first if needed.
+
+        Does nothing while the worker is tracking. A session that ended inside the worker has been reported, so
+        `tracking` is False again and a new session is started.
+        """
+        if self.tracking and self.alive:
+            return
+        self.tracking = True
+        self.prewarm()
+        self._stopped.clear()
+        self._send(START)
+
+    def stop(self, timeout=None):
+        """
+        Stops tracking and leaves the worker paused.
+
+        Args:
+        timeout (float, optional): If given, wait up to this many seconds for the worker to report that the
+        session has ended and the camera is released.
+
+        Returns:
+        bool: True if no session is running any more, False if the worker did not confirm in time. Without a
+        timeout the STOP is only sent, and the result says whether the session had already ended.
+        """
+        if self.tracking and self.alive:
+            self._send(STOP)
+        self.tracking = False
+        if timeout is not None and self.alive:
+            return self._stopped.wait(timeout)
+        return self._stopped.is_set() or not self.alive
+
+    def reload(self):
+        """
+        Replaces the worker with a fresh one, for settings the worker only reads when it starts, and resumes
+        tracking if it was tracking.
+        """
+        tracking = self.tracking
+        self.stop()
+        self.shutdown()
+        self.prewarm()
+        if tracking:
+            self.start()
+
+    def supervise(self):
+        """
+        Restarts the worker if it has exited unexpectedly.
+
+        Returns:
+        bool: True if the worker is running.
+        """
+        if self.process is None or self.alive:
+            return self.process is not None
+        if self.gave_up:
+            return False
+        if self.process.returncode == 0:
+            self.process = None  # Quit on purpose; started again by the next `start`
+            self.tracking = False
+            return False
+
+        now = time.monotonic()
+        self._crashes = [crash for crash in self._crashes if now - crash < self.restart_window] + [now]
+        if len(self._crashes) > self.max_restarts:
+            print(f"Tracker exited {len(self._crashes)} times within {self.restart_window:.0f} s, not restarting")
+            self.gave_up = True
+            return False
+
+        print(f"Tracker exited with code {self.process.returncode}, restarting")
+        self._spawn()
+        if self.tracking:
+            self._send(START)
+        return True
+
+    def shutdown(self, timeout=3.0):
+        """
+        Asks the worker to exit, and kills it if it does not within `timeout` seconds.
+        """
+        if self.alive:
+            self._send(QUIT)
+            try:
+                self.process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+
+
+class WorkerControl(threading.Thread):
+    """
+    Reads the supervisor's commands from the worker's standard input.
+
+    A "stop" sets `session_stop`, which ends the running session. The worker's main thread waits for the next
+    "start" with `wait_for_start`, which returns False once a "quit" has arrived or standard input was closed,
+    and tells the supervisor about each session with `report`.
+
+    Args:
+    stream (file): The stream the commands arrive on, normally `sys.stdin`.
+    session_stop (threading.Event): Set to end the running session.
+    reports (file): The stream reports go to, normally `sys.stdout`.
+    """
+
+    def __init__(self, stream, session_stop, reports):
+        super().__init__(name="control", daemon=True)
+        self.stream = stream
+        self.session_stop = session_stop
+        self.reports = reports
+        self.quitting = False
+        self._start_requested = threading.Event()
+
+    def run(self):
+        for line in self.stream:
+            command = line.strip()
+            if command == START:
+                self._start_requested.set()
+            elif command == STOP:
+                self.session_stop.set()
+            elif command == QUIT:
+                break
+        self.quit()
+
+    def quit(self):
+        """
+        Ends the running session and makes `wait_for_start` return False.
+        """
+        self.quitting = True
+        self.session_stop.set()
+        self._start_requested.set()
+
+    def wait_for_start(self):
+        """
+        Blocks until the next "start".
+
+        Returns:
+        bool: True to start a session, False if the worker should exit.
+        """
+        self._start_requested.wait()
+        self._start_requested.clear()
+        return not self.quitting
+
+    def report(self, message):
+        """
+        Tells the supervisor that a session has started (STARTED) or ended (STOPPED).
+        """
+        self.reports.write(message + "\n")
+        self.reports.flush()
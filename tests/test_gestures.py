@@ -0,0 +1,42 @@
+import preferences
+from gestures import DEFAULT_RULES, EYE_FEATURES, FEATURES, GestureEngine
+
+
+def build_engine(tmp_path, monkeypatch, text):
+    path = tmp_path / "user_preferences.ini"
+    path.write_text(text)
+    monkeypatch.setattr(preferences, "PREFERENCES_FILE", str(path))
+    features = dict(FEATURES, left_wink=None, right_wink=None, tilt_left=None, tilt_right=None)
+    actions = {rule['action'] for rule in DEFAULT_RULES.values()}
+    return GestureEngine.from_settings({'mouth_open_threshold': 0.1}, features, actions, lambda action: None)
+
+
+def test_malformed_value_disables_only_its_rule(tmp_path, monkeypatch, capsys):
+    engine = build_engine(tmp_path, monkeypatch, "[Gesture: left_click]\nhold = 0.3s\n")
+
+    names = [rule.name for rule in engine.rules]
+    assert "left_click" not in names
+    assert "right_click" in names
+    assert "Ignoring gesture rule 'left_click'" in capsys.readouterr().out
+
+
+def test_section_name_without_space(tmp_path, monkeypatch):
+    engine = build_engine(tmp_path, monkeypatch, "[Gesture:look_up]\nwhen = pitch > 10\naction = back\n")
+
+    assert "look_up" in [rule.name for rule in engine.rules]
+
+
+def test_unknown_mode_disables_rule(tmp_path, monkeypatch):
+    engine = build_engine(tmp_path, monkeypatch, "[Gesture: back]\nmodes = MOUSE, SCROL\n")
+
+    assert "back" not in [rule.name for rule in engine.rules]
+
+
+def test_disabled_eye_features_leave_out_eye_rules(tmp_path, monkeypatch):
+    engine = build_engine(tmp_path, monkeypatch, "")
+    engine.disable_features(EYE_FEATURES, "no eyelids")
+
+    for rules in [engine.rules, *engine.active.values()]:
+        for rule in rules:
+            assert not any(feature in EYE_FEATURES for feature, _, _ in rule.conditions)
+    assert "back" in [rule.name for rule in engine.rules]
@@ -0,0 +1,31 @@
+import numpy as np
+
+from idle import IdleMonitor
+
+
+def idle_monitor(frame):
+    monitor = IdleMonitor(timeout=1.0, probe_interval=0.5)
+    monitor.should_process(0.0, frame)
+    monitor.update(False, 1.0)
+    assert monitor.idle
+    return monitor
+
+
+def test_still_frames_wait_for_the_probe_interval():
+    empty = np.full((480, 640, 3), 100, dtype=np.uint8)
+    monitor = idle_monitor(empty)
+
+    assert monitor.should_process(1.1, empty)
+    assert not monitor.should_process(1.2, empty)
+    assert monitor.should_process(1.6, empty)
+
+
+def test_movement_is_probed_on_the_frame_it_appears_in():
+    empty = np.full((480, 640, 3), 100, dtype=np.uint8)
+    person = empty.copy()
+    person[100:400, 200:450] = 200
+    monitor = idle_monitor(empty)
+
+    assert monitor.should_process(1.1, empty)
+    assert monitor.should_process(1.2, person)
+    assert not monitor.should_process(1.3, person)
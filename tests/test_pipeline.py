@@ -0,0 +1,16 @@
+import time
+
+from instrumentation import Metrics
+from pipeline import InferenceThread, LatestFrameBuffer
+
+
+def test_frame_age_recorded_when_stage_returns_none():
+    source, output, metrics = LatestFrameBuffer(), LatestFrameBuffer(), Metrics()
+    stage = InferenceThread(source, output, lambda frame: None, name="gestures", metrics=metrics)
+    stage.start()
+    source.put((time.monotonic(), "frame"))
+    source.close()
+    stage.join(timeout=5)
+
+    assert metrics.histograms["capture_to_gestures"].count == 1
+    assert output.get(timeout=0) is None
@@ -0,0 +1,68 @@
+import numpy as np
+
+from scrolling import RingBuffer
+
+
+class TiltDetector:
+    """
+    Recognises deliberate sideways head tilts from the head roll, for the back / forward gesture.
+
+    The roll of each frame goes into a short ring buffer, and its median over the last `window` seconds is
+    compared with the user's upright roll, `neutral`. The median ignores single frames with misplaced landmarks.
+    A tilt is recognised once that deviation has stayed beyond `angle` degrees for `hold_time` seconds, and it is
+    reported once. The detector re-arms only when the deviation falls back below `release_angle`, so a head held
+    near the threshold does not fire repeatedly (hysteresis). The roll comes from the forehead-to-chin axis, so
+    where the face sits in the frame does not matter.
+
+    Args:
+    angle (float): Roll away from upright, in degrees, that counts as a tilt.
+    release_angle (float): Roll away from upright, in degrees, below which the head counts as upright again.
+    hold_time (float): Seconds the tilt must be held before it is reported.
+    window (float): Seconds of roll history the median is taken over.
+    neutral (float): The user's roll in degrees when holding their head upright.
+    """
+
+    def __init__(self, angle=10.0, release_angle=5.0, hold_time=0.1, window=0.15, neutral=0.0):
+        self.angle = angle
+        self.release_angle = release_angle
+        self.hold_time = hold_time
+        self.window = window
+        self.neutral = neutral
+        self.history = RingBuffer(32)
+        self.reset()
+
+    def reset(self):
+        self.history.reset()
+        self._side = 0  # Side of the tilt that was reported and has not been released yet
+        self._candidate = 0  # Side the head is tilted to while the hold time runs
+        self._since = None
+
+    def update(self, roll, now):
+        """
+        Adds one frame's roll.
+
+        Args:
+        roll (float): The head roll in degrees, see `landmarks.head_roll`.
+        now (float): Timestamp of the frame in seconds.
+
+        Returns:
+        int: -1 if a tilt to the left was recognised in this frame, 1 for a tilt to the right, 0 otherwise.
+        """
+        self.history.append(now, roll)
+        _, rolls = self.history.window(self.window)
+        deviation = float(np.median(rolls)) - self.neutral
+
+        if self._side:
+            if deviation * self._side < self.release_angle:
+                self._side = 0
+            return 0
+
+        side = 0 if abs(deviation) < self.angle else (1 if deviation > 0 else -1)
+        if side != self._candidate:
+            self._candidate = side
+            self._since = now
+        if side and now - self._since >= self.hold_time:
+            self._side = side
+            self._candidate = 0
+            return side
+        return 0
@@ -0,0 +1,46 @@
+from preferences import resource
+
+
+class TrayControl:
+    """
+    System tray icon that lets the user control the tracker while it runs without a preview window.
+
+    Without the preview there is no window to press ESC in, so the tray menu offers "Toggle Mode" and "Quit"
+    instead. The icon runs on pystray's own thread. pystray and Pillow are optional: if they are not installed,
+    `start` returns False and the tracker can only be stopped with Ctrl+C or a termination signal.
+
+    Args:
+    on_quit (callable): Called when "Quit" is chosen.
+    on_toggle (callable, optional): Called when "Toggle Mode" is chosen.
+    """
+
+    def __init__(self, on_quit, on_toggle=None):
+        self.on_quit = on_quit
+        self.on_toggle = on_toggle
+        self._icon = None
+
+    def start(self):
+        """
+        Shows the tray icon.
+
+        Returns:
+        bool: True if the icon is shown, False if pystray is not available.
+        """
+        try:
+            import pystray
+            from PIL import Image
+        except ImportError:
+            return False
+
+        items = []
+        if self.on_toggle is not None:
+            items.append(pystray.MenuItem("Toggle Mode", lambda: self.on_toggle()))
+        items.append(pystray.MenuItem("Quit", lambda: self.on_quit()))
+        self._icon = pystray.Icon("EyeClick", Image.open(resource('logo.ico')), "EyeClick", pystray.Menu(*items))
+        self._icon.run_detached()
+        return True
+
+    def stop(self):
+        if self._icon is not None:
+            self._icon.stop()
+            self._icon = None